@@ -1,7 +1,9 @@
-from flask import Flask, request, jsonify, send_from_directory
+from flask import Flask, Response, request, jsonify, send_from_directory, stream_with_context
+from flask_compress import Compress
 from dotenv import load_dotenv
 import os
 import base64
+from werkzeug.exceptions import HTTPException
 from werkzeug.utils import secure_filename
 from datetime import datetime
 import requests
@@ -10,9 +12,34 @@ from flask_cors import CORS
 from datetime import datetime
 from openai import OpenAI
 import uuid
+from fastjson import OrjsonProvider
+import uploads
+from interaction_index import InteractionIndex
+import context_budget
+import image_jobs
+import profiling
 
 app = Flask(__name__)
 
+# orjson for jsonify() responses and request.get_json() bodies
+app.json = OrjsonProvider(app)
+
+# Opt-in request profiling and span timing (PROFILING=1, see profiling.py)
+profiling.install(app)
+
+# Negotiated response compression: brotli preferred, gzip fallback. Small bodies
+# are not worth the CPU; streamed bodies (proxied Supabase lists) are compressed
+# chunk by chunk. PNGs served from /static/images are already compressed and skipped.
+app.config.update(
+    COMPRESS_ALGORITHM=["br", "gzip"],
+    COMPRESS_ALGORITHM_STREAMING=["br", "deflate"],
+    COMPRESS_MIN_SIZE=1024,
+    COMPRESS_BR_LEVEL=4,
+    COMPRESS_LEVEL=6,
+    COMPRESS_STREAMS=True,
+)
+Compress(app)
+
 # Updated CORS configuration - more specific and explicit
 CORS(app, 
      origins=["https://alizark.github.io", "http://localhost:3000", "http://localhost:5173"],
@@ -21,7 +48,7 @@ CORS(app,
      supports_credentials=False,
      expose_headers=["Content-Type"])
 
-load_dotenv(override=True)
+load_dotenv(os.getenv("DOTENV_PATH"), override=True)
 SUPABASE_URL = os.getenv("SUPABASE_URL")
 SUPABASE_KEY = os.getenv("SUPABASE_SERVICE_ROLE_KEY")
 SUPABASE_TABLE = "participant"
@@ -36,12 +63,32 @@ if OPENAI_API_KEY:
         print(f"Warning: Failed to initialize OpenAI client: {e}")
 
 
-UPLOAD_FOLDER = '/home/ubuntu/static/images'
+# Supabase calls go through requests; each one is a span in request profiles
+supabase = profiling.Traced(requests, "supabase")
+
+UPLOAD_FOLDER = os.getenv("UPLOAD_FOLDER", '/home/ubuntu/static/images')
 ALLOWED_EXTENSIONS = {'png', 'jpg', 'jpeg', 'gif'}
 
 # Ensure upload directory exists
 os.makedirs(UPLOAD_FOLDER, exist_ok=True)
 
+# (participant_id, task_id) -> interaction_id for rows this worker created
+interaction_index = InteractionIndex()
+
+# Multipart image parts are spooled straight into UPLOAD_FOLDER (hashed, size-capped)
+uploads.StreamingUploadRequest.upload_folder = UPLOAD_FOLDER
+app.request_class = uploads.StreamingUploadRequest
+
+# Background image generation (/openai-image/jobs); IMAGE_BACKEND=fake needs no API key
+if os.getenv("IMAGE_BACKEND") == "fake":
+    image_backend = image_jobs.fake_backend()
+elif openai_client:
+    image_backend = image_jobs.openai_backend(openai_client)
+else:
+    image_backend = None
+IMAGE_JOB_DIR = os.getenv("IMAGE_JOB_DIR", os.path.join(os.path.dirname(UPLOAD_FOLDER.rstrip("/")), "image_jobs"))
+image_job_queue = image_jobs.ImageJobQueue(image_backend, UPLOAD_FOLDER, IMAGE_JOB_DIR)
+
 @app.route("/participants", methods=["GET"])
 def get_participants():
     supabase_endpoint = f"{SUPABASE_URL}/rest/v1/{SUPABASE_TABLE}"
@@ -52,7 +99,7 @@ def get_participants():
     }
 
     # Fetch all participants
-    response = requests.get(supabase_endpoint, headers=headers)
+    response = supabase.get(supabase_endpoint, headers=headers, stream=True)
 
     if response.status_code >= 400:
         return jsonify({
@@ -60,7 +107,7 @@ def get_participants():
             "details": response.json()
         }), response.status_code
 
-    return jsonify(response.json()), 200 
+    return proxy_json(response)
 
 @app.route("/register", methods=["POST"])
 def register():
@@ -76,7 +123,8 @@ def register():
 
     # Hash the password
     raw_password = form_data["password"]
-    hashed_pw = bcrypt.hashpw(raw_password.encode("utf-8"), bcrypt.gensalt())
+    with profiling.span("bcrypt.hashpw"):
+        hashed_pw = bcrypt.hashpw(raw_password.encode("utf-8"), bcrypt.gensalt())
     form_data["password"] = hashed_pw.decode("utf-8")  # Store as string
 
     # Insert into Supabase
@@ -88,7 +136,7 @@ def register():
         "Prefer": "return=representation"
     }
 
-    response = requests.post(supabase_endpoint, headers=headers, json=[form_data])
+    response = supabase.post(supabase_endpoint, headers=headers, json=[form_data])
 
     if response.status_code >= 400:
         return jsonify({
@@ -125,7 +173,7 @@ def login():
         "Authorization": f"Bearer {SUPABASE_KEY}",
     }
 
-    response = requests.get(query_url, headers=headers)
+    response = supabase.get(query_url, headers=headers)
 
     if response.status_code != 200 or not response.json():
         return jsonify({"error": "Invalid email or password"}), 401
@@ -134,7 +182,9 @@ def login():
     stored_hash = user.get("password")
 
     # Compare passwords
-    if not bcrypt.checkpw(input_password.encode("utf-8"), stored_hash.encode("utf-8")):
+    with profiling.span("bcrypt.checkpw"):
+        password_ok = bcrypt.checkpw(input_password.encode("utf-8"), stored_hash.encode("utf-8"))
+    if not password_ok:
         return jsonify({"error": "Invalid email or password"}), 401
 
     # Login successful
@@ -166,12 +216,20 @@ def openai_chat():
         if not openai_client:
             return jsonify({"error": "OpenAI client not initialized"}), 500
 
-        response = openai_client.chat.completions.create(
-            model=model,
-            messages=messages,
-            temperature=0.7,
-            # max_completion_tokens=100000
-        )
+        # With CHAT_CONTEXT_BUDGET set, keep long refinement sessions within it (pinned task
+        # prompt, sliding window, optional summary); otherwise only the offline estimate is logged
+        messages, budget_report = context_budget.fit_messages(messages)
+        print("[/openai-chat] estimated prompt tokens:", budget_report["tokens_before"],
+              "->", budget_report["tokens_after"], "| messages:", budget_report["messages_before"],
+              "->", budget_report["messages_after"], "| saved:", budget_report["saved"])
+
+        with profiling.span("openai.chat"):
+            response = openai_client.chat.completions.create(
+                model=model,
+                messages=messages,
+                temperature=0.7,
+                # max_completion_tokens=100000
+            )
         
         print("[/openai-chat] requested:", model, "| used:", getattr(response, "model", None))
         # print("[/openai-chat]:", response)
@@ -183,6 +241,11 @@ def openai_chat():
                 "prompt_tokens": response.usage.prompt_tokens,
                 "completion_tokens": response.usage.completion_tokens,
                 "total_tokens": response.usage.total_tokens
+            },
+            "context": {
+                "estimated_prompt_tokens": budget_report["tokens_after"],
+                "messages_sent": budget_report["messages_after"],
+                "messages_received": budget_report["messages_before"]
             }
         }), 200
         
@@ -206,13 +269,14 @@ def openai_image():
         if not openai_client:
             return jsonify({"error": "OpenAI client not initialized"}), 500
 
-        response = openai_client.images.generate(
-            model=model,
-            prompt=prompt,
-            size="1024x1024",
-            quality="low",
-            n=1,
-        )
+        with profiling.span("openai.image"):
+            response = openai_client.images.generate(
+                model=model,
+                prompt=prompt,
+                size="1024x1024",
+                quality="low",
+                n=1,
+            )
 
         item = response.data[0]
         b64 = getattr(item, "b64_json", None)
@@ -226,7 +290,65 @@ def openai_image():
         
     except Exception as e:
         return jsonify({"error": f"OpenAI Image API error: {str(e)}"}), 500
-    
+
+def image_job_response(job):
+    return {
+        "job_id": job["id"],
+        "status": job["status"],
+        "image_url": job["image_url"],
+        "error": job["error"],
+        "prompt": job["prompt"],
+        "status_url": f"/openai-image/jobs/{job['id']}",
+        "events_url": f"/openai-image/jobs/{job['id']}/events",
+    }
+
+@app.route("/openai-image/jobs", methods=["POST"])
+def submit_image_job():
+    data = request.get_json(silent=True)
+    if not data:
+        return jsonify({"error": "Missing JSON body"}), 400
+
+    prompt = data.get("prompt", "")
+    participant_id = data.get("participant_id")
+    if not prompt or participant_id is None:
+        return jsonify({"error": "prompt and participant_id are required"}), 400
+    if image_backend is None:
+        return jsonify({"error": "OpenAI client not initialized"}), 500
+
+    try:
+        job = image_job_queue.submit(prompt, participant_id)
+    except image_jobs.TooManyJobs as e:
+        return jsonify({"error": str(e)}), 429
+
+    print("[/openai-image/jobs] queued", job["id"], "for participant", participant_id)
+    return jsonify(image_job_response(job)), 202
+
+@app.route("/openai-image/jobs/<job_id>", methods=["GET"])
+def get_image_job(job_id):
+    job = image_job_queue.status(job_id)
+    if job is None:
+        return jsonify({"error": "Job not found"}), 404
+    return jsonify(image_job_response(job)), 200
+
+@app.route("/openai-image/jobs/<job_id>/events", methods=["GET"])
+def image_job_events(job_id):
+    """Server-sent events: a heartbeat comment every 15s, then one "done" or "failed" event"""
+    job = image_job_queue.status(job_id)
+    if job is None:
+        return jsonify({"error": "Job not found"}), 404
+
+    def events(job):
+        while job is not None and job["status"] in image_jobs.ACTIVE:
+            yield ": waiting\n\n"
+            job = image_job_queue.wait(job_id, timeout=15)
+        if job is None:
+            yield "event: failed\ndata: {\"error\": \"Job expired\"}\n\n"
+            return
+        yield f"event: {job['status']}\ndata: {app.json.dumps(image_job_response(job))}\n\n"
+
+    return Response(stream_with_context(events(job)), mimetype="text/event-stream",
+                    headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
 # TASKS API
 @app.route("/tasks", methods=["GET"])
 def get_tasks():
@@ -236,7 +358,7 @@ def get_tasks():
         "Authorization": f"Bearer {SUPABASE_KEY}",
     }
     
-    response = requests.get(supabase_endpoint, headers=headers)
+    response = supabase.get(supabase_endpoint, headers=headers, stream=True)
 
     if response.status_code >= 400:
         return jsonify({
@@ -244,7 +366,7 @@ def get_tasks():
             "details": response.json()
         }), response.status_code
 
-    return jsonify(response.json()), 200 
+    return proxy_json(response)
 
 @app.route("/submit-task", methods=["POST"])
 def submit_task():
@@ -263,30 +385,38 @@ def submit_task():
         "Prefer": "return=representation"
     }
 
-    # Step 1: Find the existing interaction
-    query_params = f"?participant_id=eq.{participant_id}&task_id=eq.{task_id}"
-    get_resp = requests.get(
-        f"{SUPABASE_URL}/rest/v1/participant_task_interaction{query_params}",
-        headers=headers
-    )
-
-    if get_resp.status_code != 200 or not get_resp.json():
-        return jsonify({"error": "Interaction not found"}), 404
-
-    interaction = get_resp.json()[0]
-    interaction_id = interaction["id"]
+    ended_at = datetime.utcnow().isoformat()
 
-    # Step 2: Update ended_at
-    patch_resp = requests.patch(
-        f"{SUPABASE_URL}/rest/v1/participant_task_interaction?id=eq.{interaction_id}",
+    # Earliest interaction already confirmed by the database: one PATCH by primary key
+    interaction_id = interaction_index.get(participant_id, task_id)
+    if interaction_id is not None:
+        patch_resp = supabase.patch(
+            f"{SUPABASE_URL}/rest/v1/participant_task_interaction?id=eq.{interaction_id}",
+            headers=headers,
+            json={"ended_at": ended_at}
+        )
+        if patch_resp.status_code >= 400:
+            return jsonify({"error": "Failed to update ended_at", "details": patch_resp.json()}), 500
+        if patch_resp.json():
+            return jsonify({"message": "Task submitted", "ended_at": ended_at}), 200
+        # Row no longer exists: forget it and fall back to the filtered update
+        interaction_index.discard(participant_id, task_id)
+
+    # Unknown here: one filtered PATCH of the earliest matching interaction (no lookup GET)
+    query_params = f"?participant_id=eq.{participant_id}&task_id=eq.{task_id}&order=id.asc&limit=1"
+    patch_resp = supabase.patch(
+        f"{SUPABASE_URL}/rest/v1/participant_task_interaction{query_params}",
         headers=headers,
-        json={"ended_at": datetime.utcnow().isoformat()}
+        json={"ended_at": ended_at}
     )
 
     if patch_resp.status_code >= 400:
         return jsonify({"error": "Failed to update ended_at", "details": patch_resp.json()}), 500
+    if not patch_resp.json():
+        return jsonify({"error": "Interaction not found"}), 404
 
-    return jsonify({"message": "Task submitted", "ended_at": datetime.utcnow().isoformat()}), 200
+    interaction_index.add(participant_id, task_id, patch_resp.json()[0]["id"])
+    return jsonify({"message": "Task submitted", "ended_at": ended_at}), 200
 
 @app.route("/submit-personality-test", methods=["POST"])
 def submit_personality_test():
@@ -335,7 +465,7 @@ def submit_personality_test():
         "Prefer": "return=representation"
     }
 
-    response = requests.post(supabase_endpoint, headers=headers, json=[personality_test_payload])
+    response = supabase.post(supabase_endpoint, headers=headers, json=[personality_test_payload])
 
     if response.status_code >= 400:
         return jsonify({
@@ -391,7 +521,7 @@ def submit_post_study_questionnaire():
         "Prefer": "return=representation"
     }
 
-    response = requests.post(supabase_endpoint, headers=headers, json=[questionnaire_payload])
+    response = supabase.post(supabase_endpoint, headers=headers, json=[questionnaire_payload])
 
     if response.status_code >= 400:
         return jsonify({
@@ -414,11 +544,30 @@ def submit_post_study_questionnaire():
         }
     }), 200
 
+@app.route("/upload-image", methods=["POST"])
+def upload_image():
+    """Store one image sent as a raw body (image/*) or a multipart part named "image"."""
+    request.max_content_length = uploads.MAX_IMAGE_BYTES + 64 * 1024
+    try:
+        if request.mimetype == "multipart/form-data":
+            image = request.files.get("image")
+            if image is None:
+                return jsonify({"error": "Missing 'image' part"}), 400
+            stored = image.stream.finish(UPLOAD_FOLDER)
+        else:
+            if (request.content_length or 0) > uploads.MAX_IMAGE_BYTES:
+                return jsonify({"error": f"Image larger than {uploads.MAX_IMAGE_BYTES} bytes"}), 413
+            stored = uploads.save_stream(request.stream, UPLOAD_FOLDER)
+    except HTTPException as e:
+        return jsonify({"error": e.description}), e.code
+
+    return jsonify(stored), 200
+
 @app.route("/store-interaction", methods=["POST"])
 def store_interaction():
-    data = request.get_json()
-    if not data:
-        return jsonify({"error": "Missing JSON body"}), 400
+    data, files, error = read_interaction_body()
+    if error:
+        return error
 
     participant_id = data.get("participant_id")
     task_id = data.get("task_id")
@@ -429,6 +578,10 @@ def store_interaction():
     if not participant_id or not task_id or not ai_tool or not messages:
         return jsonify({"error": "Missing required fields"}), 400
 
+    stored_parts, error = store_uploaded_parts(messages, files)
+    if error:
+        return error
+
     # 1. Insert into participant_task_interaction
     interaction_payload = {
         "participant_id": participant_id,
@@ -443,7 +596,7 @@ def store_interaction():
         "Prefer": "return=representation"
     }
 
-    interaction_resp = requests.post(
+    interaction_resp = supabase.post(
         f"{SUPABASE_URL}/rest/v1/participant_task_interaction",
         headers=headers,
         json=[interaction_payload]
@@ -459,13 +612,13 @@ def store_interaction():
         {
             "interaction_id": interaction_id,
             "sender": msg["sender"],
-            "content": save_base64_image(msg["content"]) if message_type == "image" and msg["sender"] == "ai" else msg["content"],
+            "content": message_content(msg, message_type, stored_parts),
             "created_at": msg.get("timestamp") or datetime.utcnow().isoformat()
         }
         for msg in messages
     ]
 
-    message_resp = requests.post(
+    message_resp = supabase.post(
         f"{SUPABASE_URL}/rest/v1/message",
         headers=headers,
         json=message_payload
@@ -476,6 +629,176 @@ def store_interaction():
 
     return jsonify({"message": "Interaction and messages stored successfully"}), 200
 
+@app.route("/append-messages", methods=["POST"])
+def append_messages():
+    """Append-only sync of one conversation.
+
+    Each message carries a client sequence number "seq" (0, 1, 2, ... within the
+    interaction). Every message in the payload is inserted unless that seq is already
+    stored; the (interaction_id, client_seq) unique key with ignore-duplicates makes
+    retries, out-of-order resends and racing requests idempotent. Without
+    "interaction_id" a new interaction is created first (at least one message needed).
+    The response returns "interaction_id", "high_water_mark" (the highest n such that
+    seqs 0..n are all stored on the server, -1 if seq 0 is missing) and "missing" (the
+    seqs below the highest stored one that are not stored), so a client resuming from
+    the high-water mark re-sends every gap.
+    """
+    data, files, error = read_interaction_body()
+    if error:
+        return error
+
+    interaction_id = data.get("interaction_id")
+    message_type = data.get("message_type")
+    messages = data.get("messages") or []
+
+    if not interaction_id and not messages:
+        return jsonify({"error": "messages required to create an interaction"}), 400
+    if not all(isinstance(msg, dict) for msg in messages):
+        return jsonify({"error": "Every message must be an object"}), 400
+    if not all(msg.get("sender") in ("user", "ai") for msg in messages):
+        return jsonify({"error": "Every message needs a 'sender' of 'user' or 'ai'"}), 400
+    if not all(isinstance(msg.get("content"), str) or msg.get("file") for msg in messages):
+        return jsonify({"error": "Every message needs a string 'content' or a 'file' part"}), 400
+    seqs = [msg.get("seq") for msg in messages]
+    if not all(isinstance(seq, int) and not isinstance(seq, bool) and seq >= 0 for seq in seqs):
+        return jsonify({"error": "Every message needs a non-negative integer 'seq'"}), 400
+    if len(set(seqs)) != len(seqs):
+        return jsonify({"error": "Duplicate 'seq' values in request"}), 400
+
+    headers = {
+        "apikey": SUPABASE_KEY,
+        "Authorization": f"Bearer {SUPABASE_KEY}",
+        "Content-Type": "application/json",
+        "Prefer": "return=representation"
+    }
+
+    if interaction_id:
+        # Seqs of this payload already stored: skipped up front so retried images are not saved again
+        stored = set()
+        if seqs:
+            stored_resp = supabase.get(
+                f"{SUPABASE_URL}/rest/v1/message?interaction_id=eq.{interaction_id}"
+                f"&client_seq=in.({','.join(map(str, seqs))})&select=client_seq",
+                headers=headers
+            )
+            if stored_resp.status_code >= 400:
+                return jsonify({"error": "Failed to read stored messages", "details": stored_resp.json()}), 500
+            stored = {row["client_seq"] for row in stored_resp.json()}
+    else:
+        participant_id = data.get("participant_id")
+        task_id = data.get("task_id")
+        ai_tool = data.get("ai_tool")
+        if not participant_id or not task_id or not ai_tool:
+            return jsonify({"error": "interaction_id or participant_id, task_id and ai_tool required"}), 400
+
+        interaction_resp = supabase.post(
+            f"{SUPABASE_URL}/rest/v1/participant_task_interaction",
+            headers=headers,
+            json=[{"participant_id": participant_id, "task_id": task_id, "ai_tool": ai_tool}]
+        )
+        if interaction_resp.status_code >= 400:
+            return jsonify({"error": "Failed to insert interaction", "details": interaction_resp.json()}), 500
+        interaction_id = interaction_resp.json()[0]["id"]
+        stored = set()
+
+    new_messages = sorted((msg for msg in messages if msg["seq"] not in stored), key=lambda m: m["seq"])
+    inserted = 0
+    if new_messages:
+        stored_parts, error = store_uploaded_parts(new_messages, files)
+        if error:
+            return error
+
+        message_payload = [
+            {
+                "interaction_id": interaction_id,
+                "client_seq": msg["seq"],
+                "sender": msg["sender"],
+                "content": message_content(msg, message_type, stored_parts),
+                "created_at": msg.get("timestamp") or datetime.utcnow().isoformat()
+            }
+            for msg in new_messages
+        ]
+
+        # A concurrent request may have stored some of these since the check: the conflict clause drops them
+        message_resp = supabase.post(
+            f"{SUPABASE_URL}/rest/v1/message?on_conflict=interaction_id,client_seq",
+            headers={**headers, "Prefer": "return=representation,resolution=ignore-duplicates"},
+            json=message_payload
+        )
+        if message_resp.status_code >= 400:
+            return jsonify({"error": "Failed to insert messages", "details": message_resp.json()}), 500
+        inserted = len(message_resp.json())
+
+    # Gap-free high-water mark as stored on the server, after this and any concurrent insert
+    hwm_resp = supabase.get(
+        f"{SUPABASE_URL}/rest/v1/message?interaction_id=eq.{interaction_id}"
+        "&client_seq=not.is.null&select=client_seq&order=client_seq.asc",
+        headers=headers
+    )
+    if hwm_resp.status_code >= 400:
+        return jsonify({"error": "Failed to read high-water mark", "details": hwm_resp.json()}), 500
+    stored_seqs = {row["client_seq"] for row in hwm_resp.json()}
+    high_water_mark = -1
+    while high_water_mark + 1 in stored_seqs:
+        high_water_mark += 1
+    missing = [seq for seq in range(high_water_mark + 1, max(stored_seqs, default=-1)) if seq not in stored_seqs]
+
+    return jsonify({
+        "interaction_id": interaction_id,
+        "high_water_mark": high_water_mark,
+        "missing": missing,
+        "inserted": inserted
+    }), 200
+
+def read_interaction_body():
+    """(data, files, error_response) for a JSON body, or multipart with the JSON in a
+    "payload" field and images as file parts that messages name with "file"."""
+    files = {}
+    if request.mimetype == "multipart/form-data":
+        request.max_content_length = 8 * uploads.MAX_IMAGE_BYTES
+        try:
+            data = app.json.loads(request.form.get("payload") or "null")
+            files = request.files
+        except HTTPException as e:
+            return None, None, (jsonify({"error": e.description}), e.code)
+        except ValueError:
+            return None, None, (jsonify({"error": "Invalid JSON in payload field"}), 400)
+    else:
+        data = request.get_json()
+    if not data:
+        return None, None, (jsonify({"error": "Missing JSON body"}), 400)
+    return data, files, None
+
+def store_uploaded_parts(messages, files):
+    """Check and move uploaded parts into place (before anything is inserted)"""
+    missing_parts = [msg["file"] for msg in messages if msg.get("file") and msg["file"] not in files]
+    if missing_parts:
+        return None, (jsonify({"error": f"Missing file parts: {missing_parts}"}), 400)
+    try:
+        return {msg["file"]: files[msg["file"]].stream.finish(UPLOAD_FOLDER)["path"]
+                for msg in messages if msg.get("file")}, None
+    except HTTPException as e:
+        return None, (jsonify({"error": e.description}), e.code)
+
+def message_content(msg, message_type, stored_parts):
+    """Stored content for one message: uploaded part, already-stored path, or decoded base64 image"""
+    if msg.get("file"):
+        return stored_parts[msg["file"]]
+    content = msg.get("content")
+    if message_type == "image" and msg["sender"] == "ai" and not (content or "").startswith("/static/images/"):
+        return save_base64_image(content)
+    return content
+
+def proxy_json(upstream, chunk_size=64 * 1024):
+    """Stream an upstream PostgREST JSON body to the client as-is (no decode/re-encode)"""
+    def generate():
+        try:
+            yield from upstream.iter_content(chunk_size=chunk_size)
+        finally:
+            upstream.close()
+
+    return Response(stream_with_context(generate()), status=200, mimetype="application/json")
+
 @app.route('/static/images/<filename>')
 def serve_image(filename):
     """Serve uploaded images"""
@@ -484,6 +807,7 @@ def serve_image(filename):
     except Exception as e:
         return jsonify({"error": "Image not found"}), 404
 
+@profiling.traced("save_base64_image")
 def save_base64_image(base64_data, filename_prefix="image"):
     """Save base64 image data to local file and return the file path"""
     try:
@@ -524,4 +848,5 @@ def save_base64_image(base64_data, filename_prefix="image"):
 
 
 if __name__ == "__main__":
-    app.run(debug=True)
\ No newline at end of file
+    # Development server only; production runs under gunicorn (see gunicorn.conf.py)
+    app.run(debug=True, port=int(os.getenv("PORT", 5000)))
\ No newline at end of file
@@ -0,0 +1,112 @@
+"""Serialisation CPU and bytes on the wire for the large backend payloads.
+
+Each route gets a synthetic payload of realistic size and shape. The script
+reports encode (responses) or decode (request bodies) CPU time for Flask's
+stdlib provider and the orjson provider, then the response size raw, gzip
+and brotli at the levels configured in app.py, plus the CPU spent
+compressing.
+
+    python bench_json.py
+    python bench_json.py --participants 2000 --image-kb 2000 --repeat 50
+"""
+import argparse
+import base64
+import gzip
+import os
+import random
+import time
+
+import brotli
+from flask import Flask
+from flask.json.provider import DefaultJSONProvider
+
+from fastjson import OrjsonProvider
+
+WORDS = ("the a to and of please write story image with about make more can you help me "
+         "describe happy family trip plan room light short formal idea thank").split()
+
+
+def text(rng, n_words):
+    return " ".join(rng.choice(WORDS) for _ in range(n_words))
+
+
+def payloads(n_participants, image_kb, rng):
+    # Generated PNGs barely compress, so random bytes are a fair stand-in
+    image_b64 = base64.b64encode(os.urandom(image_kb * 1024)).decode()
+    participants = [{
+        "id": i, "created_at": "2025-08-11T16:00:00+00:00", "name": f"Participant {i}",
+        "email": f"participant{i}@example.com", "password": "$2b$12$" + "x" * 53,
+        "age": rng.randint(18, 60), "gender": rng.choice(["female", "male"]),
+        "education": "university", "occupation": "technical", "nationality": "germany",
+        "frequency_usage": "daily", "english_fluency": "fluent-c1",
+        "ai_usage": "[{'label': 'Writing', 'value': 'writing'}]", "consent": True, "familiarity": "{}",
+    } for i in range(n_participants)]
+    chat = {"content": text(rng, 1500), "model": "gpt-4o-mini",
+            "usage": {"prompt_tokens": 900, "completion_tokens": 2000, "total_tokens": 2900}}
+    image = {"image_url": f"data:image/png;base64,{image_b64}", "prompt": text(rng, 30), "model": "gpt-image-1"}
+    conversation = {
+        "participant_id": 1, "task_id": 1, "ai_tool": "GPT-4o", "message_type": "image",
+        "messages": [{"sender": "user" if i % 2 == 0 else "ai",
+                      "content": text(rng, 40) if i % 2 == 0 else f"data:image/png;base64,{image_b64}",
+                      "timestamp": "2025-08-11T16:00:00"} for i in range(6)],
+    }
+    return {
+        "GET /participants": ("proxied", participants),
+        "POST /openai-chat": ("response", chat),
+        "POST /openai-image": ("response", image),
+        "POST /store-interaction": ("request", conversation),
+    }
+
+
+def cpu_ms(func, repeat):
+    start = time.process_time()
+    for _ in range(repeat):
+        func()
+    return 1000 * (time.process_time() - start) / repeat
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark JSON providers and response compression per route")
+    parser.add_argument("--participants", type=int, default=500)
+    parser.add_argument("--image-kb", type=int, default=1100, help="Decoded PNG size (1024x1024 low quality)")
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args(argv)
+
+    # Same compression settings as app.py
+    import app as backend
+    gzip_level = backend.app.config["COMPRESS_LEVEL"]
+    br_level = backend.app.config["COMPRESS_BR_LEVEL"]
+
+    flask_app = Flask(__name__)
+    stdlib, fast = DefaultJSONProvider(flask_app), OrjsonProvider(flask_app)
+    rng = random.Random(42)
+
+    print(f"{'route':<24} {'dir':<8} {'stdlib ms':>10} {'orjson ms':>10} {'speedup':>8} "
+          f"{'raw KB':>9} {'gzip KB':>9} {'br KB':>9} {'gzip ms':>8} {'br ms':>8}")
+    for route, (direction, obj) in payloads(args.participants, args.image_kb, rng).items():
+        body = fast.dumps(obj).encode()
+        if direction == "proxied":
+            # Before: decode the Supabase body, then jsonify it again. Now: bytes are passed through
+            with flask_app.app_context():
+                old = cpu_ms(lambda: stdlib.response(stdlib.loads(body)).get_data(), args.repeat)
+            new = 0.0
+        elif direction == "response":
+            with flask_app.app_context():
+                old = cpu_ms(lambda: stdlib.response(obj).get_data(), args.repeat)
+                new = cpu_ms(lambda: fast.response(obj).get_data(), args.repeat)
+        else:
+            old = cpu_ms(lambda: stdlib.loads(body), args.repeat)
+            new = cpu_ms(lambda: fast.loads(body), args.repeat)
+        gz = gzip.compress(body, gzip_level)
+        br = brotli.compress(body, quality=br_level)
+        gz_ms = cpu_ms(lambda: gzip.compress(body, gzip_level), max(args.repeat // 4, 1))
+        br_ms = cpu_ms(lambda: brotli.compress(body, quality=br_level), max(args.repeat // 4, 1))
+        speedup = f"{old / new:.1f}x" if new else "-"
+        print(f"{route:<24} {direction:<8} {old:>10.2f} {new:>10.2f} {speedup:>8} "
+              f"{len(body) / 1024:>9.1f} {len(gz) / 1024:>9.1f} {len(br) / 1024:>9.1f} {gz_ms:>8.2f} {br_ms:>8.2f}")
+    print("\nproxied: GET /participants and /tasks now stream Supabase's body through unchanged; "
+          "the stdlib column is what decoding + jsonify used to cost.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,166 @@
+"""Offline token estimates and a context budget for /openai-chat.
+
+Long refinement sessions resend the whole conversation on every turn. Nothing
+is trimmed unless ``CHAT_CONTEXT_BUDGET`` is set (the model's own context is
+far larger than a study session); with a budget, ``fit_messages`` applies
+three policies in order before a request goes to OpenAI:
+
+1. pin: system messages and the first user message (the task prompt) are
+   always kept;
+2. sliding window: the most recent turns are kept while they fit the budget;
+3. summary (off unless ``CHAT_CONTEXT_SUMMARIZE=1``): the turns that fell out
+   of the window are replaced by one short extractive system note, so the
+   model still sees what was asked.
+
+Token counts come from a local approximation of OpenAI's BPE: about one token
+per short word or punctuation mark and one per ~4 characters of longer words,
+plus the chat format's per-message overhead. It needs no network or
+vocabulary files; it is meant for budgeting, not billing (the real count is
+in the response's ``usage``).
+
+    python context_budget.py   # prints the savings on a synthetic 40-turn session
+"""
+import os
+import re
+
+TOKEN_RE = re.compile(r"\w+|[^\w\s]", re.UNICODE)
+MESSAGE_OVERHEAD = 3   # <|start|>role ... <|end|> per message
+REPLY_PRIMING = 3      # <|start|>assistant<|message|> for the reply
+IMAGE_PART_TOKENS = 85  # low-detail image input
+
+# None (no trimming, estimates only) unless CHAT_CONTEXT_BUDGET is set
+DEFAULT_BUDGET = int(os.getenv("CHAT_CONTEXT_BUDGET")) if os.getenv("CHAT_CONTEXT_BUDGET") else None
+DEFAULT_SUMMARIZE = os.getenv("CHAT_CONTEXT_SUMMARIZE", "0") == "1"
+SUMMARY_CHARS = 160
+SUMMARY_MAX_REQUESTS = 8
+
+
+def count_text_tokens(text):
+    """Approximate BPE token count of a string"""
+    if not text:
+        return 0
+    return sum(1 + (len(token) - 1) // 4 if len(token) > 4 else 1 for token in TOKEN_RE.findall(text))
+
+
+def message_text(message):
+    """Text of a chat message whose content is a string or a list of content parts"""
+    content = message.get("content")
+    if isinstance(content, list):
+        return " ".join(part.get("text", "") for part in content if isinstance(part, dict))
+    return content or ""
+
+
+def count_message_tokens(message):
+    tokens = MESSAGE_OVERHEAD + count_text_tokens(message.get("role", "")) + count_text_tokens(message_text(message))
+    content = message.get("content")
+    if isinstance(content, list):
+        tokens += IMAGE_PART_TOKENS * sum(1 for part in content
+                                          if isinstance(part, dict) and part.get("type") == "image_url")
+    if message.get("name"):
+        tokens += 1
+    return tokens
+
+
+def count_tokens(messages):
+    """Estimated prompt tokens for a chat request"""
+    return sum(count_message_tokens(m) for m in messages) + REPLY_PRIMING
+
+
+def summarize_turns(messages):
+    """Extractive note for dropped turns: the opening of the latest earlier user requests"""
+    requests = []
+    for message in messages:
+        if message.get("role") != "user":
+            continue
+        text = " ".join(message_text(message).split())
+        if text:
+            requests.append(text if len(text) <= SUMMARY_CHARS else text[:SUMMARY_CHARS].rstrip() + "...")
+    if not requests:
+        return None
+    lines = "\n".join(f"- {r}" for r in requests[-SUMMARY_MAX_REQUESTS:])
+    return {"role": "system",
+            "content": f"Earlier in this conversation (older turns omitted), the user asked:\n{lines}"}
+
+
+def fit_messages(messages, budget=DEFAULT_BUDGET, summarize=DEFAULT_SUMMARIZE, pin_first_user=True):
+    """Trim a chat history to ``budget`` estimated tokens (``None``: keep everything).
+
+    Returns ``(messages, report)``; ``report`` holds the token estimate before
+    and after and what each policy saved. The newest message is always sent.
+    """
+    costs = [count_message_tokens(m) for m in messages]
+    before = sum(costs) + REPLY_PRIMING
+    report = {"budget": budget, "tokens_before": before, "tokens_after": before,
+              "messages_before": len(messages), "messages_after": len(messages),
+              "saved": {"window": 0, "summary": 0}, "summarized": 0}
+    if budget is None or before <= budget or len(messages) <= 1:
+        return list(messages), report
+
+    # 1. Pin system messages and the task prompt
+    pinned = {i for i, m in enumerate(messages) if m.get("role") == "system"}
+    if pin_first_user:
+        first_user = next((i for i, m in enumerate(messages) if m.get("role") == "user"), None)
+        if first_user is not None:
+            pinned.add(first_user)
+    last = len(messages) - 1
+    pinned.add(last)
+    used = REPLY_PRIMING + sum(costs[i] for i in pinned)
+
+    # 2. Sliding window over the remaining turns, newest first
+    kept = set(pinned)
+    for i in range(last - 1, -1, -1):
+        if i in kept:
+            continue
+        if used + costs[i] > budget:
+            break
+        kept.add(i)
+        used += costs[i]
+    window = sorted(kept - pinned)
+    report["saved"]["window"] = sum(cost for i, cost in enumerate(costs) if i not in kept)
+
+    # 3. Summarise what the window dropped; the note may push out more of the oldest turns
+    note = None
+    if summarize and len(kept) < len(messages):
+        while True:
+            note = summarize_turns([m for i, m in enumerate(messages) if i not in kept])
+            if note is None or used + count_message_tokens(note) <= budget:
+                break
+            if not window:
+                note = None
+                break
+            oldest = window.pop(0)
+            kept.discard(oldest)
+            used -= costs[oldest]
+            report["saved"]["window"] += costs[oldest]
+
+    result = [m for i, m in enumerate(messages) if i in kept]
+    if note is not None:
+        first_dropped = min(i for i in range(len(messages)) if i not in kept)
+        result.insert(sum(1 for i in kept if i < first_dropped), note)
+        note_cost = count_message_tokens(note)
+        used += note_cost
+        report["saved"]["summary"] = -note_cost
+        report["summarized"] = len(messages) - len(kept)
+
+    report["tokens_after"] = used
+    report["messages_after"] = len(result)
+    return result, report
+
+
+def _demo(turns=40):
+    conversation = [{"role": "system", "content": "You are a helpful writing assistant."},
+                    {"role": "user", "content": "Write a short story about a family holiday by the sea."}]
+    for turn in range(turns):
+        conversation.append({"role": "assistant", "content": "Here is a revised version. " + "The waves rolled in "
+                             "while the children built castles and their parents watched the light fade. " * 12})
+        conversation.append({"role": "user", "content": f"Revision {turn + 1}: make it warmer and mention the dog."})
+    for budget in (2000, 6000):
+        for summarize in (False, True):
+            trimmed, report = fit_messages(conversation, budget=budget, summarize=summarize)
+            print(f"budget={budget:<5} summarize={summarize!s:<5} tokens {report['tokens_before']} -> "
+                  f"{report['tokens_after']}  messages {report['messages_before']} -> {report['messages_after']}  "
+                  f"saved {report['saved']}")
+
+
+if __name__ == "__main__":
+    _demo()
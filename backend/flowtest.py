@@ -0,0 +1,287 @@
+"""End-to-end load test of the participant flow against local Supabase and OpenAI stubs.
+
+Each simulated participant walks the same route sequence as the frontend:
+
+    /register -> /submit-personality-test -> /tasks
+    -> per task: several /openai-chat (or /openai-image) turns -> /store-interaction -> /submit-task
+    -> /submit-post-study-questionnaire
+
+app.py runs as a subprocess (dev server or gunicorn, see loadtest.py) and talks
+to an in-process stub PostgREST and a stub OpenAI API. Their latencies are
+drawn from configurable distributions:
+
+    fixed:MS | uniform:LOW:HIGH | exp:MEAN | lognormal:MEDIAN:SIGMA   (milliseconds)
+
+The report lists per-endpoint count, errors, throughput and p50/p95/p99
+latency. Nothing leaves the machine.
+
+    python flowtest.py
+    python flowtest.py --participants 50 --server gunicorn-gevent --openai-latency lognormal:1500:0.6
+"""
+import argparse
+import base64
+import itertools
+import json
+import math
+import random
+import tempfile
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qsl, urlsplit
+
+import requests
+
+from image_jobs import fake_backend
+from loadtest import SERVERS, free_port, start_app, stop_app
+
+FLOW = ["/register", "/submit-personality-test", "/tasks", "/openai-chat", "/openai-image",
+        "/store-interaction", "/submit-task", "/submit-post-study-questionnaire"]
+
+
+def parse_latency(spec):
+    """Latency spec (see module docstring) -> function returning a delay in seconds"""
+    kind, _, args = spec.partition(":")
+    try:
+        values = [float(v) for v in args.split(":")] if args else []
+    except ValueError:
+        values = []
+    if kind == "fixed" and len(values) == 1:
+        return lambda: values[0] / 1000
+    if kind == "uniform" and len(values) == 2:
+        return lambda: random.uniform(*values) / 1000
+    if kind == "exp" and len(values) == 1:
+        return lambda: random.expovariate(1 / values[0]) / 1000
+    if kind == "lognormal" and len(values) == 2:
+        median, sigma = values
+        return lambda: random.lognormvariate(math.log(median), sigma) / 1000
+    raise argparse.ArgumentTypeError(f"Bad latency spec {spec!r}")
+
+
+def percentile(sorted_values, q):
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return float("nan")
+    return sorted_values[min(len(sorted_values) - 1, max(0, math.ceil(q / 100 * len(sorted_values)) - 1))]
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    latency = staticmethod(lambda: 0.0)
+
+    def send_json(self, status, body):
+        body = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def read_json(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        return json.loads(self.rfile.read(length)) if length else None
+
+    def log_message(self, *args):
+        pass
+
+
+def start_stub(handler, latency):
+    handler.latency = staticmethod(latency)
+    server = ThreadingHTTPServer(("127.0.0.1", free_port()), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+class PostgrestStub(StubHandler):
+    """Just enough PostgREST: inserts with return=representation, GET /task, filtered PATCH"""
+
+    tables = defaultdict(list)
+    ids = itertools.count(1)
+    lock = threading.Lock()
+    tasks = [{"id": i, "title": f"Task {i}", "type": "image" if i % 3 == 0 else "text"} for i in range(1, 12)]
+
+    def route(self):
+        url = urlsplit(self.path)
+        table = url.path.rpartition("/")[2]
+        filters = {k: v.partition(".")[2] for k, v in parse_qsl(url.query) if v.startswith("eq.")}
+        return table, filters
+
+    def do_GET(self):
+        time.sleep(self.latency())
+        table, _ = self.route()
+        self.send_json(200, self.tasks if table == "task" else [])
+
+    def do_POST(self):
+        time.sleep(self.latency())
+        table, _ = self.route()
+        rows = self.read_json()
+        with self.lock:
+            for row in rows:
+                row["id"] = next(self.ids)
+                self.tables[table].append(row)
+        self.send_json(201, rows)
+
+    def do_PATCH(self):
+        time.sleep(self.latency())
+        table, filters = self.route()
+        update = self.read_json()
+        with self.lock:
+            matched = [row for row in self.tables[table]
+                       if all(str(row.get(k)) == v for k, v in filters.items())][:1]
+            for row in matched:
+                row.update(update)
+        self.send_json(200, matched)
+
+
+class OpenAIStub(StubHandler):
+    """/v1/chat/completions and /v1/images/generations with canned answers"""
+
+    png_b64 = None
+    reply = "Here is a draft. " + "The quick brown fox jumps over the lazy dog. " * 20
+
+    def do_POST(self):
+        body = self.read_json() or {}
+        time.sleep(self.latency())
+        if self.path.endswith("/chat/completions"):
+            self.send_json(200, {
+                "id": "chatcmpl-stub", "object": "chat.completion", "created": int(time.time()),
+                "model": body.get("model", "stub"),
+                "choices": [{"index": 0, "finish_reason": "stop",
+                             "message": {"role": "assistant", "content": self.reply}}],
+                "usage": {"prompt_tokens": 200, "completion_tokens": 180, "total_tokens": 380},
+            })
+        elif self.path.endswith("/images/generations"):
+            self.send_json(200, {"created": int(time.time()), "data": [{"b64_json": self.png_b64}]})
+        else:
+            self.send_json(404, {"error": {"message": f"No stub for {self.path}"}})
+
+
+class Recorder:
+    def __init__(self):
+        self.latencies = defaultdict(list)
+        self.errors = defaultdict(int)
+        self.lock = threading.Lock()
+
+    def call(self, session, base_url, method, path, payload=None):
+        start = time.perf_counter()
+        try:
+            response = session.request(method, base_url + path, json=payload, timeout=300)
+            ok = response.status_code < 400
+            body = response.json() if ok else None
+        except (requests.RequestException, ValueError):
+            ok, body = False, None
+        elapsed = time.perf_counter() - start
+        with self.lock:
+            self.latencies[path].append(elapsed)
+            if not ok:
+                self.errors[path] += 1
+        return body
+
+
+def participant_flow(n, base_url, recorder, args, rng):
+    """One participant's session; returns True if every step succeeded"""
+    session = requests.Session()
+    call = lambda method, path, payload=None: recorder.call(session, base_url, method, path, payload)
+    think = lambda: time.sleep(rng.uniform(0, 2 * args.think_time / 1000)) if args.think_time else None
+
+    user = call("post", "/register", {"email": f"p{n}-{rng.getrandbits(32)}@load.test", "password": "load-test",
+                                      "name": f"Participant {n}", "age": 30, "consent": True})
+    if not user:
+        return False
+    pid = user["user"]["participant_id"]
+    responses = {str(i): rng.randint(1, 7) for i in range(1, 11)}
+    dimensions = {d: rng.uniform(1, 7) for d in
+                  ("extraversion", "agreeableness", "conscientiousness", "neuroticism", "openness")}
+    ok = call("post", "/submit-personality-test",
+              {"participant_id": pid, "responses": responses, "dimensions": dimensions}) is not None
+    tasks = call("get", "/tasks") or []
+    ok = ok and bool(tasks)
+
+    for task in rng.sample(tasks, min(args.tasks, len(tasks))):
+        image = rng.random() < args.image_ratio
+        chat, messages = [], []
+        for turn in range(args.turns):
+            think()
+            prompt = f"Turn {turn + 1}: please improve the {'picture' if image else 'text'} for task {task['id']}."
+            messages.append({"sender": "user", "content": prompt, "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S")})
+            if image:
+                answer = call("post", "/openai-image", {"prompt": prompt})
+                content = answer and answer["image_url"]
+            else:
+                chat.append({"role": "user", "content": prompt})
+                answer = call("post", "/openai-chat", {"messages": chat})
+                content = answer and answer["content"]
+                chat.append({"role": "assistant", "content": content or ""})
+            ok = ok and answer is not None
+            messages.append({"sender": "ai", "content": content or "", "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S")})
+        ok = call("post", "/store-interaction", {
+            "participant_id": pid, "task_id": task["id"], "ai_tool": "GPT-4o",
+            "message_type": "image" if image else "text", "messages": messages}) is not None and ok
+        ok = call("post", "/submit-task", {"participant_id": pid, "task_id": task["id"]}) is not None and ok
+
+    answers = {k: rng.randint(1, 5) for k in ("ai_responses_helpful", "satisfied_response_quality",
+                                              "responses_matched_intent", "trust_ai_accuracy",
+                                              "would_use_future", "ai_importance_increased")}
+    return call("post", "/submit-post-study-questionnaire", {"participant_id": pid, "responses": answers}) is not None and ok
+
+
+def report(recorder, wall, completed, participants):
+    print(f"\n{participants} participants in {wall:.1f}s, {completed} completed the flow without errors\n")
+    print(f"{'endpoint':<34} {'count':>6} {'errors':>6} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} "
+          f"{'p99 ms':>8} {'max ms':>8}")
+    for path in FLOW:
+        values = sorted(recorder.latencies.get(path, []))
+        if not values:
+            continue
+        ms = [1000 * percentile(values, q) for q in (50, 95, 99)]
+        print(f"{path:<34} {len(values):>6} {recorder.errors[path]:>6} {len(values) / wall:>8.1f} "
+              f"{ms[0]:>8.1f} {ms[1]:>8.1f} {ms[2]:>8.1f} {1000 * values[-1]:>8.1f}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Load-test the full participant flow against local stubs")
+    parser.add_argument("--participants", type=int, default=20)
+    parser.add_argument("--concurrency", type=int, default=None, help="Participants active at once (default: all)")
+    parser.add_argument("--tasks", type=int, default=3, help="Tasks per participant")
+    parser.add_argument("--turns", type=int, default=3, help="AI turns per task")
+    parser.add_argument("--image-ratio", type=float, default=0.3, help="Share of tasks that use /openai-image")
+    parser.add_argument("--think-time", type=float, default=0, help="Mean pause before each turn (ms)")
+    parser.add_argument("--supabase-latency", type=parse_latency, default="lognormal:40:0.4")
+    parser.add_argument("--openai-latency", type=parse_latency, default="lognormal:800:0.5")
+    parser.add_argument("--server", choices=list(SERVERS), default="gunicorn-gthread")
+    parser.add_argument("--workers", type=int, default=2)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args(argv)
+
+    OpenAIStub.png_b64 = base64.b64encode(fake_backend(delay=0)("stub")).decode()
+    supabase = start_stub(PostgrestStub, args.supabase_latency)
+    openai = start_stub(OpenAIStub, args.openai_latency)
+    upload_dir = tempfile.TemporaryDirectory(prefix="flowtest-images-")
+    port = free_port()
+    proc = start_app(args.server, port, f"http://127.0.0.1:{supabase.server_port}", args.workers, extra_env={
+        "OPENAI_API_KEY": "stub", "OPENAI_BASE_URL": f"http://127.0.0.1:{openai.server_port}/v1",
+        "UPLOAD_FOLDER": upload_dir.name})
+    print(f"{args.server} ({args.workers} workers) on :{port}, stub Supabase :{supabase.server_port}, "
+          f"stub OpenAI :{openai.server_port}")
+
+    recorder = Recorder()
+    try:
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=args.concurrency or args.participants) as pool:
+            results = list(pool.map(
+                lambda n: participant_flow(n, f"http://127.0.0.1:{port}", recorder, args,
+                                           random.Random(args.seed * 100003 + n)),
+                range(args.participants)))
+        wall = time.perf_counter() - start
+    finally:
+        stop_app(proc)
+        supabase.shutdown()
+        openai.shutdown()
+        upload_dir.cleanup()
+    report(recorder, wall, sum(results), args.participants)
+
+
+if __name__ == "__main__":
+    main()
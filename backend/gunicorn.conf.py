@@ -0,0 +1,77 @@
+"""Gunicorn settings for running app.py in production.
+
+    gunicorn -c gunicorn.conf.py app:app
+
+Everything is configurable through environment variables (or .env), so the
+same file serves the VM and local load tests:
+
+    WEB_CONCURRENCY          worker processes        (default: 2 * CPUs + 1)
+    GUNICORN_WORKER_CLASS    gthread | gevent | sync (default: gthread)
+    GUNICORN_THREADS         threads per gthread worker (default: 32)
+    GUNICORN_CONNECTIONS     greenlets per gevent worker (default: 200)
+    GUNICORN_MAX_REQUESTS    recycle a worker after N requests (default: 1000, 0 = never)
+    GUNICORN_TIMEOUT         kill a worker stuck this long, seconds (default: 180)
+    GUNICORN_GRACEFUL_TIMEOUT  time to drain in-flight requests on shutdown/reload (default: 150)
+    PORT / GUNICORN_BIND     listen address (default: 0.0.0.0:5000)
+    DOTENV_PATH              .env file to load (default: nearest .env)
+
+Most request time is spent waiting on OpenAI and Supabase, so the default
+gthread workers (or gevent) serve many requests per
+process instead of one.
+"""
+import multiprocessing
+import os
+import sys
+
+from dotenv import load_dotenv
+
+load_dotenv(os.getenv("DOTENV_PATH"), override=True)
+
+
+def _int_env(name, default):
+    value = os.getenv(name)
+    return int(value) if value else default
+
+
+worker_class = os.getenv("GUNICORN_WORKER_CLASS", "gthread")
+if worker_class == "gevent":
+    # Patch before app.py is preloaded so requests/ssl/OpenAI use cooperative sockets
+    from gevent import monkey
+    monkey.patch_all()
+
+bind = os.getenv("GUNICORN_BIND", f"0.0.0.0:{os.getenv('PORT', '5000')}")
+workers = _int_env("WEB_CONCURRENCY", multiprocessing.cpu_count() * 2 + 1)
+threads = _int_env("GUNICORN_THREADS", 32)
+worker_connections = _int_env("GUNICORN_CONNECTIONS", 200)
+
+# Import app.py once in the master; forked workers share the loaded modules copy-on-write
+preload_app = True
+
+# Recycle workers periodically (jitter keeps them from restarting together)
+max_requests = _int_env("GUNICORN_MAX_REQUESTS", 1000)
+max_requests_jitter = _int_env("GUNICORN_MAX_REQUESTS_JITTER", max(max_requests // 10, 1))
+
+# Image generation can take over a minute: the timeouts must outlast one OpenAI call,
+# and on SIGTERM/SIGHUP workers get graceful_timeout to finish in-flight requests
+timeout = _int_env("GUNICORN_TIMEOUT", 180)
+graceful_timeout = _int_env("GUNICORN_GRACEFUL_TIMEOUT", 150)
+keepalive = _int_env("GUNICORN_KEEPALIVE", 5)
+
+accesslog = os.getenv("GUNICORN_ACCESS_LOG", "-") or None
+errorlog = "-"
+loglevel = os.getenv("GUNICORN_LOG_LEVEL", "info")
+
+
+def when_ready(server):
+    server.log.info("Serving with %s %s worker(s), threads=%s, max_requests=%s",
+                    workers, worker_class, threads if worker_class == "gthread" else "-", max_requests)
+
+
+def worker_exit(server, worker):
+    server.log.info("Worker %s exited", worker.pid)
+    # Runs in the exiting worker: fail the image jobs it queued but will never start
+    queue = getattr(sys.modules.get("app"), "image_job_queue", None)
+    if queue is not None:
+        failed = queue.abandon()
+        if failed:
+            server.log.warning("Worker %s failed %s queued image job(s) on exit", worker.pid, failed)
@@ -0,0 +1,222 @@
+"""Background image generation jobs.
+
+``POST /openai-image/jobs`` returns a job id immediately; a bounded thread
+pool runs the generation and stores the PNG through the normal
+``/static/images`` storage (content-addressed, see ``uploads.py``). Job state
+lives in small JSON files, so a status poll or SSE stream served by a
+different gunicorn worker sees the same job.
+
+Each job records the PID of the worker that runs it. A job that is still
+queued or running when that process is gone (worker recycled by
+``max_requests``, SIGTERM past the graceful timeout, crash) is marked failed
+as soon as its state is read, and at startup, instead of staying "running"
+until the TTL prune. The gunicorn ``worker_exit`` hook also fails the jobs an
+exiting worker had not started.
+
+The thread pool (``IMAGE_JOB_WORKERS``) is per process, and so is the lock
+around the per-participant check: concurrent submits landing on different
+workers can each pass it, so the cap is effectively
+``WEB_CONCURRENCY x IMAGE_JOBS_PER_PARTICIPANT``.
+
+Backends are callables ``prompt -> PNG bytes``: ``openai_backend`` for the
+real API and ``fake_backend`` (``IMAGE_BACKEND=fake``) for local testing
+without network or cost.
+"""
+import base64
+import hashlib
+import io
+import json
+import os
+import re
+import struct
+import threading
+import time
+import uuid
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+
+import uploads
+
+ACTIVE = ("queued", "running")
+JOB_ID_RE = re.compile(r"^[0-9a-f]{32}$")
+ORPHANED = "the server worker running this job exited"
+
+MAX_WORKERS = int(os.getenv("IMAGE_JOB_WORKERS", 4))
+PER_PARTICIPANT = int(os.getenv("IMAGE_JOBS_PER_PARTICIPANT", 2))
+JOB_TTL = int(os.getenv("IMAGE_JOB_TTL", 3600))
+
+
+class TooManyJobs(Exception):
+    pass
+
+
+def _alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def openai_backend(client, model="gpt-image-1"):
+    """Same call /openai-image makes, returning decoded PNG bytes"""
+    def generate(prompt):
+        response = client.images.generate(model=model, prompt=prompt, size="1024x1024", quality="low", n=1)
+        return base64.b64decode(response.data[0].b64_json)
+    return generate
+
+
+def fake_backend(delay=float(os.getenv("FAKE_IMAGE_DELAY", 2.0)), size=64):
+    """Offline stand-in: a solid-colour PNG derived from the prompt, after ``delay`` seconds"""
+    def chunk(kind, data):
+        return struct.pack(">I", len(data)) + kind + data + struct.pack(">I", zlib.crc32(kind + data))
+
+    def generate(prompt):
+        time.sleep(delay)
+        rgb = hashlib.sha256(prompt.encode("utf-8")).digest()[:3]
+        raw = b"".join(b"\x00" + rgb * size for _ in range(size))
+        return (b"\x89PNG\r\n\x1a\n"
+                + chunk(b"IHDR", struct.pack(">IIBBBBB", size, size, 8, 2, 0, 0, 0))
+                + chunk(b"IDAT", zlib.compress(raw))
+                + chunk(b"IEND", b""))
+    return generate
+
+
+class ImageJobQueue:
+    def __init__(self, generate, upload_folder, job_dir, max_workers=MAX_WORKERS,
+                 per_participant=PER_PARTICIPANT, ttl=JOB_TTL):
+        self.generate = generate
+        self.upload_folder = upload_folder
+        self.job_dir = job_dir
+        self.per_participant = per_participant
+        self.ttl = ttl
+        os.makedirs(job_dir, exist_ok=True)
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="image-job")
+        self._lock = threading.Lock()
+        self._done = {}  # job_id -> Event, for jobs run by this process
+        self.fail_orphaned()
+
+    # ---- state files ----
+    def _path(self, job_id):
+        return os.path.join(self.job_dir, f"{job_id}.json")
+
+    def _write(self, job):
+        tmp = self._path(job["id"]) + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(job, f)
+        os.replace(tmp, self._path(job["id"]))
+
+    def _read(self, job_id):
+        try:
+            with open(self._path(job_id), encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def status(self, job_id):
+        if not JOB_ID_RE.match(job_id or ""):
+            return None
+        job = self._read(job_id)
+        if job is not None and self._orphaned(job):
+            job = self._fail(job, ORPHANED)
+        return job
+
+    @staticmethod
+    def _orphaned(job):
+        return job["status"] in ACTIVE and job.get("pid") is not None and not _alive(job["pid"])
+
+    def _fail(self, job, error):
+        job.update(status="failed", error=error, finished_at=time.time())
+        self._write(job)
+        return job
+
+    def _jobs(self):
+        for name in os.listdir(self.job_dir):
+            if name.endswith(".json"):
+                job = self.status(name[:-5])
+                if job is not None:
+                    yield job
+
+    def _prune(self, now):
+        # Finished jobs expire after ttl; active ones that old belonged to a worker that died
+        for job in self._jobs():
+            if now - (job["finished_at"] or job["created_at"]) > self.ttl:
+                try:
+                    os.remove(self._path(job["id"]))
+                except OSError:
+                    pass
+
+    # ---- lifecycle ----
+    def submit(self, prompt, participant_id):
+        now = time.time()
+        with self._lock:
+            self._prune(now)
+            active = sum(1 for job in self._jobs()
+                         if job["participant_id"] == participant_id and job["status"] in ACTIVE)
+            if active >= self.per_participant:
+                raise TooManyJobs(f"At most {self.per_participant} image jobs may run per participant")
+            job = {"id": uuid.uuid4().hex, "participant_id": participant_id, "prompt": prompt, "pid": os.getpid(),
+                   "status": "queued", "image_url": None, "error": None,
+                   "created_at": now, "started_at": None, "finished_at": None}
+            self._write(job)
+            self._done[job["id"]] = threading.Event()
+        self._pool.submit(self._run, job)
+        return job
+
+    def _run(self, job):
+        job.update(status="running", started_at=time.time())
+        self._write(job)
+        try:
+            png = self.generate(job["prompt"])
+            stored = uploads.save_stream(io.BytesIO(png), self.upload_folder)
+            job.update(status="done", image_url=stored["path"])
+        except Exception as e:
+            job.update(status="failed", error=str(e))
+        job["finished_at"] = time.time()
+        self._write(job)
+        self._done.pop(job["id"]).set()
+
+    def wait(self, job_id, timeout, poll=0.5):
+        """Block until the job finishes or ``timeout`` passes; returns its latest state"""
+        deadline = time.monotonic() + timeout
+        event = self._done.get(job_id)
+        while True:
+            job = self.status(job_id)
+            remaining = deadline - time.monotonic()
+            if job is None or job["status"] not in ACTIVE or remaining <= 0:
+                return job
+            # Same process: wake on completion; other worker's job: poll its state file
+            if event is not None:
+                event.wait(min(remaining, poll * 20))
+            else:
+                time.sleep(min(remaining, poll))
+
+    def fail_orphaned(self):
+        """Fail the active jobs of processes that no longer exist; returns how many"""
+        failed = 0
+        for name in os.listdir(self.job_dir):
+            job = self._read(name[:-5]) if name.endswith(".json") else None
+            if job is not None and self._orphaned(job):
+                self._fail(job, ORPHANED)
+                failed += 1
+        return failed
+
+    def abandon(self):
+        """On worker exit: cancel this process's queued jobs and mark them failed.
+
+        Running jobs may still finish during the graceful timeout; if the process
+        is killed first, their state fails on the next read.
+        """
+        self._pool.shutdown(wait=False, cancel_futures=True)
+        pid, failed = os.getpid(), 0
+        for job in self._jobs():
+            if job.get("pid") == pid and job["status"] == "queued":
+                self._fail(job, "the server worker exited before the job started")
+                self._done.pop(job["id"], threading.Event()).set()
+                failed += 1
+        return failed
+
+    def shutdown(self, wait=True):
+        self._pool.shutdown(wait=wait)
@@ -0,0 +1,59 @@
+"""Bounded in-process index of (participant_id, task_id) -> interaction_id.
+
+/submit-task always updates the earliest interaction (lowest id) of a pair.
+Only ids the database returned as that earliest row (the filtered
+``order=id.asc&limit=1`` PATCH) are recorded, never ids of interactions a
+worker just created, since another worker or an earlier run may have created
+an older one. Ids only grow, so a recorded earliest id stays the earliest
+until its row is deleted. Each gunicorn worker has its own index; a miss
+(other worker, restart, eviction) just means the caller falls back to the
+filtered PATCH.
+"""
+import os
+import threading
+from collections import OrderedDict
+
+DEFAULT_SIZE = int(os.getenv("INTERACTION_INDEX_SIZE", 10000))
+
+
+class InteractionIndex:
+    """Thread-safe LRU map; the lowest interaction id recorded for a pair is kept"""
+
+    def __init__(self, max_size=DEFAULT_SIZE):
+        self.max_size = max_size
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def _key(participant_id, task_id):
+        return str(participant_id), str(task_id)
+
+    def get(self, participant_id, task_id):
+        key = self._key(participant_id, task_id)
+        with self._lock:
+            interaction_id = self._entries.get(key)
+            if interaction_id is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+                self._entries.move_to_end(key)
+            return interaction_id
+
+    def add(self, participant_id, task_id, interaction_id):
+        key = self._key(participant_id, task_id)
+        with self._lock:
+            current = self._entries.get(key)
+            if current is None or interaction_id < current:
+                self._entries[key] = interaction_id
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def discard(self, participant_id, task_id):
+        with self._lock:
+            self._entries.pop(self._key(participant_id, task_id), None)
+
+    def __len__(self):
+        return len(self._entries)
@@ -0,0 +1,177 @@
+"""Local load test: Werkzeug dev server vs gunicorn, against a stub Supabase.
+
+Starts a stub PostgREST that answers after a fixed delay (standing in for the
+Supabase round trip), runs app.py under each server in turn and fires
+concurrent requests at an I/O-bound route (/tasks) and a CPU-bound one
+(/login, bcrypt). Nothing leaves the machine.
+
+Servers: ``dev-single`` is the baseline launcher (``app.run(debug=True)``,
+one process, one request at a time); ``dev`` is ``python app.py`` with
+Flask's threaded dev server; ``gunicorn-*`` use gunicorn.conf.py.
+
+    python loadtest.py
+    python loadtest.py --requests 400 --concurrency 32 --servers gunicorn-gthread gunicorn-gevent
+
+Observed with the defaults on a 1-CPU VM (3 gunicorn workers, 64 concurrent
+clients, 50 ms upstream delay):
+
+    server             route            req/s   mean ms
+    dev-single         GET /tasks        15.0    3810.9
+    dev                GET /tasks       150.2     354.2
+    gunicorn-gthread   GET /tasks       155.7     278.6
+    gunicorn-gevent    GET /tasks       100.4     456.1
+    dev-single         POST /login        2.6   12357.7
+    gunicorn-gthread   POST /login        2.8   22501.1
+
+/tasks gains 10x over one-at-a-time serving because requests overlap their
+upstream wait. On one core, the load generator, stub and server share that
+core, so threaded dev and gthread end up level. /login is bcrypt-bound: it
+only scales with worker processes on more than one core, so re-run with
+``--workers`` on the target VM to see that part.
+"""
+import argparse
+import json
+import os
+import signal
+import socket
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+import bcrypt
+import requests
+
+BACKEND_DIR = Path(__file__).resolve().parent
+LOGIN = {"email": "load@test.local", "password": "load-test"}
+# The baseline launcher: app.run(debug=True) on one process and, as before Flask's threaded
+# default, one request at a time (the reloader is off so the process group stays simple)
+DEV_SINGLE = ("import os, app; "
+              "app.app.run(debug=True, threaded=False, use_reloader=False, port=int(os.environ['PORT']))")
+SERVERS = {
+    "dev-single": [sys.executable, "-c", DEV_SINGLE],
+    "dev": [sys.executable, "app.py"],
+    "gunicorn-gthread": [sys.executable, "-m", "gunicorn", "-c", "gunicorn.conf.py", "app:app"],
+    "gunicorn-gevent": [sys.executable, "-m", "gunicorn", "-c", "gunicorn.conf.py", "app:app"],
+}
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def start_stub_supabase(port, delay):
+    """PostgREST stand-in: /task and /participant?email=eq.* after ``delay`` seconds"""
+    tasks = json.dumps([{"id": i, "title": f"Task {i}"} for i in range(1, 12)]).encode()
+    user = json.dumps([{
+        "id": 1, "email": LOGIN["email"], "name": "Load Test",
+        "password": bcrypt.hashpw(LOGIN["password"].encode(), bcrypt.gensalt()).decode(),
+    }]).encode()
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            time.sleep(delay)
+            body = user if self.path.startswith("/rest/v1/participant") else tasks
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", port), Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def start_app(name, port, supabase_url, workers, extra_env=None):
+    env = dict(os.environ, PORT=str(port), GUNICORN_BIND=f"127.0.0.1:{port}", DOTENV_PATH=os.devnull,
+               SUPABASE_URL=supabase_url, SUPABASE_SERVICE_ROLE_KEY="stub", GUNICORN_ACCESS_LOG="",
+               WEB_CONCURRENCY=str(workers), GUNICORN_WORKER_CLASS=name.rpartition("-")[2], **(extra_env or {}))
+    proc = subprocess.Popen(SERVERS[name], cwd=BACKEND_DIR, env=env, start_new_session=True,
+                            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    deadline = time.time() + 30
+    while time.time() < deadline:
+        try:
+            requests.get(f"http://127.0.0.1:{port}/tasks", timeout=5)
+            return proc
+        except requests.ConnectionError:
+            time.sleep(0.2)
+    stop_app(proc)
+    raise RuntimeError(f"{name} did not start on port {port}")
+
+
+def stop_app(proc):
+    # The dev server's reloader forks a child: signal the whole process group
+    os.killpg(proc.pid, signal.SIGTERM)
+    try:
+        proc.wait(timeout=30)
+    except subprocess.TimeoutExpired:
+        os.killpg(proc.pid, signal.SIGKILL)
+
+
+def hammer(url, method, n_requests, concurrency, payload=None):
+    """Fire ``n_requests`` at ``url``; returns (requests/s, mean latency ms, errors)"""
+    session_local = threading.local()
+
+    def one(_):
+        session = getattr(session_local, "session", None) or requests.Session()
+        session_local.session = session
+        start = time.perf_counter()
+        try:
+            ok = session.request(method, url, json=payload, timeout=60).status_code < 400
+        except requests.RequestException:
+            ok = False
+        return time.perf_counter() - start, ok
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        results = list(pool.map(one, range(n_requests)))
+    wall = time.perf_counter() - start
+    latencies = [t for t, _ in results]
+    return n_requests / wall, 1000 * sum(latencies) / len(latencies), sum(not ok for _, ok in results)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compare dev server and gunicorn throughput locally")
+    parser.add_argument("--servers", nargs="+", choices=list(SERVERS),
+                        default=["dev-single", "dev", "gunicorn-gthread"])
+    parser.add_argument("--requests", type=int, default=300)
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--workers", type=int, default=2 * (os.cpu_count() or 1) + 1,
+                        help="gunicorn workers (default: gunicorn.conf.py's 2 * CPUs + 1)")
+    parser.add_argument("--upstream-delay", type=float, default=0.05, help="Stub Supabase latency (s)")
+    args = parser.parse_args(argv)
+
+    stub_port = free_port()
+    stub = start_stub_supabase(stub_port, args.upstream_delay)
+    # bcrypt makes /login ~100x more expensive, so it gets a tenth of the requests
+    routes = [("GET /tasks", "get", "/tasks", None, args.requests),
+              ("POST /login", "post", "/login", LOGIN, max(args.requests // 10, args.concurrency))]
+
+    print(f"{'server':<18} {'route':<12} {'req/s':>9} {'mean ms':>9} {'errors':>7}")
+    try:
+        for name in args.servers:
+            port = free_port()
+            proc = start_app(name, port, f"http://127.0.0.1:{stub_port}", args.workers)
+            try:
+                for label, method, path, payload, n_requests in routes:
+                    rps, mean_ms, errors = hammer(f"http://127.0.0.1:{port}{path}", method,
+                                                  n_requests, args.concurrency, payload)
+                    print(f"{name:<18} {label:<12} {rps:>9.1f} {mean_ms:>9.1f} {errors:>7}", flush=True)
+            finally:
+                stop_app(proc)
+    finally:
+        stub.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,233 @@
+"""Opt-in request profiling for app.py: stack sampling, spans and slow-request capture.
+
+Nothing is installed unless ``PROFILING=1``. Then:
+
+* spans: ``with span("supabase.get"):`` times a block of the current request;
+  upstream calls (Supabase, OpenAI, bcrypt, JSON, image decoding) are wrapped in
+  app.py. Profiled responses carry a ``Server-Timing`` header, so the spans show
+  up in the browser's network panel.
+* sampling: one background thread reads the stacks of the threads serving
+  profiled requests every ``PROFILE_INTERVAL_MS`` and counts them.
+* triggers: a request is profiled when it sends ``X-Profile: 1`` (or the value
+  of ``PROFILE_TOKEN`` when set), when it is picked by ``PROFILE_SAMPLE_RATE``,
+  or, with ``PROFILE_SLOW_MS`` set, when it turns out slower than that.
+
+Overhead: a sample costs roughly 70 us per profiled thread (reading and
+folding a ~40-frame stack), about 1.5% of a core per thread at the default
+5 ms, plus the GIL it holds meanwhile. Requested and rate-sampled requests are
+sampled from their start. For slow-request capture the sampler is only armed
+once a request has been running for ``PROFILE_SLOW_MS``: faster requests just
+register and unregister their thread (a dict update under a lock) and are
+never sampled, and a slow request's stacks cover the time past the threshold.
+
+Profiles go to ``PROFILE_DIR`` as ``<id>.folded`` (collapsed stacks, for
+flamegraph.pl, speedscope or inferno) plus ``<id>.json`` (route, timing,
+spans); only the newest ``PROFILE_KEEP`` profiles are kept.
+
+Stacks are per OS thread, so sampling needs the gthread (or sync) worker; under
+gevent the spans are still accurate but the stacks are not.
+"""
+import functools
+import json
+import os
+import random
+import sys
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from datetime import datetime
+
+from flask import g, has_request_context, request
+
+ENABLED = os.getenv("PROFILING") == "1"
+PROFILE_DIR = os.getenv("PROFILE_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "profiles"))
+PROFILE_TOKEN = os.getenv("PROFILE_TOKEN")
+SAMPLE_RATE = float(os.getenv("PROFILE_SAMPLE_RATE", 0))
+SLOW_MS = float(os.getenv("PROFILE_SLOW_MS", 0))
+INTERVAL_MS = float(os.getenv("PROFILE_INTERVAL_MS", 5))
+KEEP = int(os.getenv("PROFILE_KEEP", 200))
+MAX_DEPTH = 128
+
+
+class StackSampler:
+    """Single daemon thread that samples the registered threads' stacks once they are armed"""
+
+    def __init__(self, interval=INTERVAL_MS / 1000):
+        self.interval = interval
+        self._stacks = {}    # thread id -> {folded stack: count}
+        self._armed_at = {}  # thread id -> monotonic time from which it is sampled
+        self._cond = threading.Condition()
+        self._thread = None
+
+    def start(self, thread_id, delay=0.0):
+        """Register a thread; it is sampled from ``delay`` seconds on"""
+        armed_at = time.monotonic() + delay
+        with self._cond:
+            earliest = min(self._armed_at.values(), default=None)
+            self._stacks[thread_id] = {}
+            self._armed_at[thread_id] = armed_at
+            if self._thread is None or not self._thread.is_alive():
+                # Started lazily, so it is created in the gunicorn worker rather than the preloading master
+                self._thread = threading.Thread(target=self._run, name="profile-sampler", daemon=True)
+                self._thread.start()
+            elif earliest is None or armed_at < earliest:
+                self._cond.notify()
+
+    def stop(self, thread_id):
+        with self._cond:
+            self._armed_at.pop(thread_id, None)
+            return self._stacks.pop(thread_id, {})
+
+    def _run(self):
+        with self._cond:
+            while True:
+                if not self._armed_at:
+                    self._cond.wait()
+                    continue
+                # Sleep until the next thread is armed, then one interval between samples
+                self._cond.wait(max(min(self._armed_at.values()) - time.monotonic(), self.interval))
+                now = time.monotonic()
+                due = [thread_id for thread_id, armed_at in self._armed_at.items() if armed_at <= now]
+                if not due:
+                    continue
+                frames = sys._current_frames()
+                for thread_id in due:
+                    frame = frames.get(thread_id)
+                    if frame is not None:
+                        counts = self._stacks[thread_id]
+                        stack = fold(frame)
+                        counts[stack] = counts.get(stack, 0) + 1
+                del frames
+
+
+def fold(frame):
+    """Collapsed-stack line for a frame: root first, frames separated by ';'"""
+    names = []
+    while frame is not None and len(names) < MAX_DEPTH:
+        code = frame.f_code
+        names.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+        frame = frame.f_back
+    return ";".join(reversed(names))
+
+
+sampler = StackSampler()
+
+
+@contextmanager
+def span(name):
+    """Time a block of the current request; a no-op outside requests or with profiling off"""
+    profile = g.get("profile") if ENABLED and has_request_context() else None
+    if profile is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        end = time.perf_counter()
+        profile["spans"].append({"name": name, "start_ms": round(1000 * (start - profile["t0"]), 2),
+                                 "duration_ms": round(1000 * (end - start), 2)})
+
+
+def traced(name, func=None):
+    """``func`` wrapped in ``span(name)``; also usable as ``@traced(name)``"""
+    if func is None:
+        return functools.partial(traced, name)
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        with span(name):
+            return func(*args, **kwargs)
+    return wrapper
+
+
+class Traced:
+    """Proxy whose functions run in spans, e.g. ``Traced(requests, "supabase").get(...)``"""
+
+    def __init__(self, target, name):
+        self._target = target
+        self._name = name
+
+    def __getattr__(self, attr):
+        value = getattr(self._target, attr)
+        return traced(f"{self._name}.{attr}", value) if callable(value) else value
+
+
+def _requested():
+    header = request.headers.get("X-Profile")
+    if header and header == (PROFILE_TOKEN or "1"):
+        return True
+    return SAMPLE_RATE > 0 and random.random() < SAMPLE_RATE
+
+
+def _start():
+    forced = _requested()
+    g.profile = {"id": uuid.uuid4().hex[:12], "t0": time.perf_counter(), "spans": [],
+                 "forced": forced, "thread": threading.get_ident(), "sampled": forced or SLOW_MS > 0}
+    if g.profile["sampled"]:
+        # Slow-request capture only samples what runs past the threshold
+        sampler.start(g.profile["thread"], 0.0 if forced else SLOW_MS / 1000)
+
+
+def _headers(response):
+    profile = g.get("profile")
+    if profile is not None and profile["forced"]:
+        response.headers["X-Profile-Id"] = profile["id"]
+        response.headers["Server-Timing"] = ", ".join(
+            f'{s["name"]};dur={s["duration_ms"]}' for s in profile["spans"])
+    return response
+
+
+def _finish(exc=None):
+    profile = g.pop("profile", None)
+    if profile is None:
+        return
+    elapsed_ms = 1000 * (time.perf_counter() - profile["t0"])
+    stacks = sampler.stop(profile["thread"]) if profile["sampled"] else {}
+    if profile["forced"] or (SLOW_MS > 0 and elapsed_ms >= SLOW_MS):
+        try:
+            write_profile(profile, stacks, elapsed_ms, exc)
+        except OSError as e:
+            print(f"Warning: could not write profile {profile['id']}: {e}")
+
+
+def write_profile(profile, stacks, elapsed_ms, exc=None):
+    os.makedirs(PROFILE_DIR, exist_ok=True)
+    # Timestamp first (to the microsecond) so names sort oldest to newest for pruning
+    name = f"{datetime.now().strftime('%Y%m%dT%H%M%S%f')}-{profile['id']}"
+    base = os.path.join(PROFILE_DIR, name)
+    with open(base + ".folded", "w", encoding="utf-8") as f:
+        for stack, count in sorted(stacks.items()):
+            f.write(f"{stack} {count}\n")
+    with open(base + ".json", "w", encoding="utf-8") as f:
+        json.dump({"id": profile["id"], "method": request.method, "path": request.path,
+                   "elapsed_ms": round(elapsed_ms, 2), "trigger": "request" if profile["forced"] else "slow",
+                   "samples": sum(stacks.values()), "interval_ms": INTERVAL_MS,
+                   "error": repr(exc) if exc else None, "spans": profile["spans"]}, f, indent=2)
+    print(f"[profile] {request.method} {request.path} {elapsed_ms:.0f} ms -> {base}.folded")
+    prune()
+
+
+def prune(keep=KEEP):
+    """Delete all but the newest ``keep`` profiles"""
+    names = sorted(n[:-5] for n in os.listdir(PROFILE_DIR) if n.endswith(".json"))
+    for name in names[:-keep] if keep > 0 else names:
+        for ext in (".json", ".folded"):
+            try:
+                os.remove(os.path.join(PROFILE_DIR, name + ext))
+            except OSError:
+                pass
+
+
+def install(app):
+    """Register the profiling hooks on ``app`` when PROFILING=1"""
+    if not ENABLED:
+        return
+    app.before_request(_start)
+    app.after_request(_headers)
+    # teardown runs after a streamed body is finished, so the whole response is profiled
+    app.teardown_request(_finish)
+    app.json.loads = traced("json.loads", app.json.loads)
+    app.json.response = traced("json.response", app.json.response)
+    print(f"Profiling on: sample rate {SAMPLE_RATE}, slow threshold {SLOW_MS or '-'} ms, writing to {PROFILE_DIR}")
@@ -0,0 +1,7 @@
+-- Client sequence numbers for append-only sync (/append-messages).
+-- Rows written by /store-interaction keep client_seq NULL; NULLs never collide
+-- in a unique index, so existing data is unaffected.
+alter table public.message add column if not exists client_seq integer;
+
+create unique index if not exists message_interaction_client_seq_key
+    on public.message (interaction_id, client_seq);
@@ -0,0 +1,105 @@
+"""Streaming image uploads: request bytes go to disk in chunks, hashed on the way.
+
+Images arrive either as a raw body (``Content-Type: image/png``) or as
+multipart parts. Neither path holds a whole image in memory. The upload is
+written to a temp file in the upload folder while its SHA-256 and size are
+updated, then renamed to ``<sha256>.<ext>``, so the same image stored twice is
+kept once.
+"""
+import hashlib
+import os
+import tempfile
+
+from flask import Request
+from werkzeug.exceptions import RequestEntityTooLarge, UnsupportedMediaType
+
+CHUNK_SIZE = 64 * 1024
+MAX_IMAGE_BYTES = int(os.getenv("MAX_IMAGE_BYTES", 10 * 1024 * 1024))
+IMAGE_SIGNATURES = {
+    b"\x89PNG\r\n\x1a\n": "png",
+    b"\xff\xd8\xff": "jpg",
+    b"GIF87a": "gif",
+    b"GIF89a": "gif",
+}
+
+
+class HashingSpool:
+    """Write-only temp file in ``folder`` that tracks SHA-256 and size and enforces a cap"""
+
+    def __init__(self, folder, max_bytes=MAX_IMAGE_BYTES):
+        self.max_bytes = max_bytes
+        self.sha256 = hashlib.sha256()
+        self.size = 0
+        self.head = b""
+        self.finished = False
+        self.result = None
+        fd, self.path = tempfile.mkstemp(dir=folder, suffix=".part")
+        self.file = os.fdopen(fd, "wb")
+
+    def write(self, chunk):
+        self.size += len(chunk)
+        if self.size > self.max_bytes:
+            self.discard()
+            raise RequestEntityTooLarge(f"Image larger than {self.max_bytes} bytes")
+        if len(self.head) < 8:
+            self.head += chunk[:8 - len(self.head)]
+        self.sha256.update(chunk)
+        return self.file.write(chunk)
+
+    # Werkzeug's multipart parser rewinds the part stream once it is complete
+    def seek(self, *args):
+        return 0
+
+    def flush(self):
+        self.file.flush()
+
+    def close(self):
+        # Called by Request.close() at teardown: parts nobody claimed are removed
+        if not self.finished:
+            self.discard()
+
+    def discard(self):
+        self.file.close()
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+    def finish(self, folder):
+        """Move the spooled bytes to their content-addressed name; returns upload metadata"""
+        if self.finished:
+            return self.result
+        self.file.close()
+        extension = next((ext for sig, ext in IMAGE_SIGNATURES.items() if self.head.startswith(sig)), None)
+        if extension is None:
+            self.discard()
+            raise UnsupportedMediaType("Only PNG, JPEG and GIF images are accepted")
+        self.finished = True
+        digest = self.sha256.hexdigest()
+        filename = f"{digest}.{extension}"
+        target = os.path.join(folder, filename)
+        if os.path.exists(target):
+            os.remove(self.path)
+        else:
+            os.replace(self.path, target)
+        self.result = {"path": f"/static/images/{filename}", "sha256": digest, "size": self.size}
+        return self.result
+
+
+def save_stream(stream, folder, max_bytes=MAX_IMAGE_BYTES):
+    """Copy a raw request stream to the upload folder in chunks"""
+    spool = HashingSpool(folder, max_bytes)
+    try:
+        for chunk in iter(lambda: stream.read(CHUNK_SIZE), b""):
+            spool.write(chunk)
+    except BaseException:
+        spool.discard()
+        raise
+    return spool.finish(folder)
+
+
+class StreamingUploadRequest(Request):
+    """Request whose multipart file parts are spooled straight into the upload folder"""
+
+    upload_folder = tempfile.gettempdir()
+
+    def _get_file_stream(self, total_content_length, content_type, filename=None, content_length=None):
+        return HashingSpool(self.upload_folder)
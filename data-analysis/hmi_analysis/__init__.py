@@ -0,0 +1,9 @@
+"""Shared analysis library for the HMI AI-prompting study."""
+from .features import (
+    FeatureAccumulator,
+    conversation_features,
+    extract_features,
+    load_nrc_lexicon,
+    split_sentences,
+    tokenize,
+)
@@ -0,0 +1,519 @@
+"""Command-line entry point: ``python -m hmi_analysis <command>``.
+
+Each subcommand imports only the modules it needs when it runs, so ``--help``
+and the lightweight commands do not pay for pandas/scipy/matplotlib/NLTK.
+
+    python -m hmi_analysis lexical --data-dir data [--exclude-copies]
+    python -m hmi_analysis sentiment supabase_dump_20250823_040945 [--streaming | --pipeline] [--no-plots] [--exclude-copies]
+    python -m hmi_analysis dedup --data-dir data --threshold 0.8 --output near_duplicates.csv
+    python -m hmi_analysis index --data-dir data
+    python -m hmi_analysis search '"natural light" OR cosy*' --by gender
+    python -m hmi_analysis images --image-dir /home/ubuntu/static/images --n-jobs 4 [--duplicates] [--near 1234]
+    python -m hmi_analysis terms --by gender --top 15
+    python -m hmi_analysis participants --output data/participant_map.csv
+    python -m hmi_analysis models --n-jobs 4 [--pca 5] [--sweep] [--dedupe]
+    python -m hmi_analysis subsample --draws 500 --n-jobs 4 [--dedupe]
+    python -m hmi_analysis correlations --permutations 5000 --n-jobs 4 [--dedupe]
+    python -m hmi_analysis online --jsonl-dir supabase_dump_20250823_040945
+    python -m hmi_analysis bench --sizes 10000
+    python -m hmi_analysis fetch-nltk stopwords
+"""
+import argparse
+import os
+import sys
+from pathlib import Path
+
+
+# Same as terms.PERSONALITY_TRAITS; kept here so building the parser imports nothing heavy
+PERSONALITY_TRAITS = ('extraversion', 'agreeableness', 'conscientiousness', 'neuroticism', 'openness')
+
+
+def run_lexical(args):
+    from .lexical import main
+
+    main(args.data_dir, exclude_copies=args.exclude_copies, dup_threshold=args.dup_threshold)
+
+
+def run_sentiment(args):
+    from .sentiment_analysis import SentimentAnalyzer
+
+    dump = Path(args.dump_dir)
+    analyzer = SentimentAnalyzer(exclude_copies=args.exclude_copies, dup_threshold=args.dup_threshold,
+                                 sentence_memo=args.sentence_memo)
+    interactions = dump / 'participant_task_interaction.jsonl'
+    interactions = interactions if interactions.exists() else None
+    if args.streaming:
+        _, report = analyzer.run_streaming_analysis(
+            dump / 'message.jsonl', dump / 'participant.jsonl', interactions,
+            output_file=args.output or 'sentiment_analysis_results.parquet',
+            chunk_size=args.chunk_size
+        )
+    else:
+        tasks = dump / 'task.jsonl' if (dump / 'task.jsonl').exists() else dump / 'tasks.jsonl'
+        if args.pipeline:
+            _, _, report = analyzer.run_pipeline_analysis(
+                dump / 'message.jsonl', dump / 'participant.jsonl', tasks, interactions,
+                plots=not args.no_plots, jobs=args.jobs
+            )
+        else:
+            _, _, report = analyzer.run_complete_analysis(
+                dump / 'message.jsonl', dump / 'participant.jsonl', tasks, interactions,
+                plots=not args.no_plots
+            )
+    print(report)
+
+
+def run_dedup(args):
+    import time
+
+    from .dedup import find_pairs, flag_copies
+    from .lexical import load_tables, merge_tables, read_csv_safe
+
+    messages, participants, pti = load_tables(args.data_dir)
+    user_msgs = merge_tables(messages, participants, pti).sort_values('id_msg')
+    start = time.perf_counter()
+    pairs = find_pairs(user_msgs['content'], user_msgs['id_msg'], user_msgs['participant_id'], args.threshold)
+    tasks_path = Path(args.data_dir) / 'tasks.csv'
+    references = None
+    if tasks_path.exists():
+        tasks = read_csv_safe(tasks_path)
+        references = dict(zip(tasks['id'], tasks['description']))
+    flags = flag_copies(user_msgs['content'], user_msgs['id_msg'], user_msgs['participant_id'], references,
+                        args.threshold, args.scope)
+    elapsed = time.perf_counter() - start
+
+    print(f"{len(user_msgs)} user messages, Jaccard >= {args.threshold} ({elapsed:.2f}s)")
+    print(f"near-duplicate pairs: {len(pairs)} ({int(pairs['same_group'].sum())} within a participant, "
+          f"{int((~pairs['same_group']).sum())} across participants)")
+    print(f"copies: {int(flags['is_copy'].sum())} "
+          f"({int(flags['dup_of'].notna().sum())} re-sent, {int(flags['copies_reference'].notna().sum())} task text)")
+    if args.output:
+        pairs.to_csv(args.output, index=False)
+        print(f"pairs written to {args.output}")
+
+
+def run_index(args):
+    import time
+
+    from .search import MessageIndex
+
+    start = time.perf_counter()
+    with MessageIndex(args.db) as index:
+        added = index.update(args.data_dir)
+        print(f"{added} new messages indexed ({len(index)} total) in {time.perf_counter() - start:.2f}s -> {args.db}")
+
+
+def run_search(args):
+    import time
+
+    from .search import MessageIndex
+
+    with MessageIndex(args.db) as index:
+        sender = None if args.sender == 'all' else args.sender
+        start = time.perf_counter()
+        try:
+            counts = index.counts(args.query, by=args.by, sender=sender)
+            hits = index.search(args.query, sender=sender, limit=args.limit)
+        except ValueError as e:
+            sys.exit(str(e))
+        elapsed_ms = 1000 * (time.perf_counter() - start)
+
+    print(f"{sum(c[0] for c in counts.values())} matching messages ({elapsed_ms:.1f} ms)\n")
+    print(f"{args.by:<40} {'hits':>6} {'of':>6} {'share':>7}")
+    for group, (n_hits, total, share) in sorted(counts.items(), key=lambda kv: -kv[1][0]):
+        print(f"{str(group):<40} {n_hits:>6} {total:>6} {share:>7.1%}")
+    if hits:
+        print()
+        for hit in hits:
+            print(f"#{hit['id']} (participant {hit['participant_id']}, {hit['gender']}): {hit['snippet']}")
+
+
+def run_images(args):
+    import time
+
+    import pandas as pd
+
+    from .images import ImageIndex, with_prompts
+    from .lexical import load_tables
+
+    with ImageIndex(args.db) as index:
+        start = time.perf_counter()
+        added, missing = index.update(args.data_dir, args.image_dir, n_jobs=args.n_jobs)
+        print(f"{added} images described ({len(index)} indexed, {missing} files missing from {args.image_dir}) "
+              f"in {time.perf_counter() - start:.2f}s -> {args.db}")
+        if args.near is not None:
+            try:
+                hits = index.near(args.near, max_distance=args.max_distance, limit=args.limit)
+            except KeyError as e:
+                sys.exit(str(e.args[0]))
+            print(f"\nimages within {args.max_distance} bits of message {args.near}:")
+            for message_id, distance in hits:
+                print(f"  #{message_id}: {distance}")
+        if args.duplicates:
+            pairs = index.duplicates(args.max_distance)
+            print(f"\n{len(pairs)} near-duplicate image pairs (pHash distance <= {args.max_distance})")
+            for a, b, distance in pairs[:args.limit]:
+                print(f"  #{a} ~ #{b}: {distance}")
+        if args.output:
+            messages, participants, pti = load_tables(args.data_dir)
+            table = with_prompts(index.table(), messages, participants, pti)
+            for column in ('phash', 'dhash'):
+                table[column] = table[column].map(lambda v: None if pd.isna(v) else f"{int(v) & (1 << 64) - 1:016x}")
+            table.to_csv(args.output, index=False)
+            print(f"\nimage table with prompts and participants written to {args.output}")
+
+
+def run_terms(args):
+    import time
+
+    import pandas as pd
+
+    from .lexical import load_tables, merge_tables, read_csv_safe
+    from .terms import build_matrix, distinctive_terms, personality_groups
+
+    data_dir = Path(args.data_dir)
+    messages, participants, pti = load_tables(data_dir)
+    user_msgs = merge_tables(messages, participants, pti).reset_index(drop=True)
+    if args.by in ('task', 'task_type'):
+        tasks = read_csv_safe(data_dir / 'tasks.csv').set_index('id')
+        labels = user_msgs['task_id'].map(tasks['title' if args.by == 'task' else 'task_type'])
+    elif args.by == 'gender':
+        labels = user_msgs['gender']
+    else:
+        personality = read_csv_safe(data_dir / 'personality_test.csv')
+        labels = personality_groups(user_msgs['participant_id'], personality, args.by, args.quantiles)
+
+    start = time.perf_counter()
+    term_matrix = build_matrix(user_msgs['content'], min_df=args.min_df, max_df=args.max_df)
+    built = time.perf_counter()
+    table = distinctive_terms(term_matrix, labels, top=args.top)
+    done = time.perf_counter()
+
+    print(f"{term_matrix.shape[0]} messages x {term_matrix.shape[1]} terms "
+          f"(matrix {1000 * (built - start):.0f} ms, statistics {1000 * (done - built):.0f} ms)")
+    with pd.option_context('display.width', 120, 'display.max_rows', None):
+        for group, rows in table.groupby('group', sort=False):
+            print(f"\n=== {args.by} = {group} ===")
+            print(rows.drop(columns='group').round({'z_log_odds': 2, 'chi2': 2, 'p_chi2': 4}).to_string(index=False))
+    if args.output:
+        table.to_csv(args.output, index=False)
+        print(f"\nwritten to {args.output}")
+
+
+def run_participants(args):
+    import time
+
+    from .lexical import read_csv_safe
+    from .participants import canonical_ids
+
+    participants = read_csv_safe(Path(args.data_dir) / 'participant.csv')
+    start = time.perf_counter()
+    mapping, pairs = canonical_ids(participants, max_block=args.max_block)
+    elapsed = time.perf_counter() - start
+
+    merged = mapping[mapping['participant_id'] != mapping['canonical_id']]
+    emails = participants['email'].str.strip().str.lower().nunique()
+    print(f"{len(mapping)} registrations -> {mapping['canonical_id'].nunique()} participants "
+          f"({emails} distinct emails); {len(pairs)} candidate pairs scored in {elapsed:.2f}s")
+    print(f"matches: {pairs.loc[pairs['match'], 'reason'].value_counts().to_dict()}")
+    if args.show:
+        names = participants.set_index('id')['name']
+        for canonical, group in merged.groupby('canonical_id'):
+            print(f"  {canonical} {names[canonical]!r} <- "
+                  + ", ".join(f"{pid} {names[pid]!r}" for pid in group['participant_id']))
+    if args.output:
+        mapping.to_csv(args.output, index=False)
+        print(f"mapping written to {args.output}")
+
+
+def dedupe_map(args):
+    if not args.dedupe:
+        return None
+    from .participants import participant_map
+
+    return participant_map(args.data_dir)
+
+
+def run_models(args):
+    import time
+
+    import pandas as pd
+
+    from .conversations import ML_FEATURES, load_feature_matrix
+    from .models import DEFAULT_PARAMS, evaluate, pca_summary, summarize, sweep_grid
+
+    start = time.perf_counter()
+    data = load_feature_matrix(args.data_dir, refresh=args.refresh, participant_map=dedupe_map(args))
+    data = data[data['gender'].isin(['male', 'female'])].dropna(subset=ML_FEATURES)
+    X, y, groups = data[ML_FEATURES].to_numpy(float), data['gender'].to_numpy(), data['participant_id'].to_numpy()
+    loaded = time.perf_counter()
+
+    param_sets = sweep_grid() if args.sweep else [{}]
+    param_sets = [{**DEFAULT_PARAMS, 'n_estimators': args.n_estimators, 'pca_components': args.pca, **p}
+                  for p in param_sets]
+    scores, importances = evaluate(X, y, groups, ML_FEATURES, param_sets, n_splits=args.n_splits,
+                                   n_repeats=args.n_repeats, seed=args.seed, n_jobs=args.n_jobs,
+                                   n_permutations=args.n_permutations)
+    done = time.perf_counter()
+
+    print(f"{len(data)} conversations from {len(set(groups))} participants "
+          f"({', '.join(f'{g}: {n}' for g, n in data['gender'].value_counts().items())}); "
+          f"features {loaded - start:.2f}s, {len(scores)} folds {done - loaded:.2f}s")
+    summary = summarize(scores, param_sets)
+    with pd.option_context('display.width', 160, 'display.max_columns', None):
+        print(f"\n{args.n_repeats}x{args.n_splits}-fold CV grouped by participant (majority baseline "
+              f"{data['gender'].value_counts(normalize=True).max():.3f})")
+        print(summary.round(3).to_string())
+        best = summary.index[0]
+        print(f"\npermutation importance (balanced accuracy drop, param set {best})")
+        print(importances.loc[best].sort_values(ascending=False).round(4).to_string())
+        if args.pca:
+            variance, loadings = pca_summary(X, ML_FEATURES, args.pca)
+            print(f"\nPCA explained variance\n{variance.round(3).to_string()}")
+            print(f"\nloadings\n{loadings.round(3).to_string()}")
+    if args.output:
+        scores.to_csv(args.output, index=False)
+        print(f"\nper-fold scores written to {args.output}")
+
+
+def run_subsample(args):
+    import time
+
+    import pandas as pd
+
+    from .conversations import load_feature_matrix
+    from .sensitivity import run, stability
+
+    start = time.perf_counter()
+    data = load_feature_matrix(args.data_dir, refresh=args.refresh, participant_map=dedupe_map(args))
+    loaded = time.perf_counter()
+    full, draws = run(data, n_draws=args.draws, seed=args.seed, n_jobs=args.n_jobs)
+    done = time.perf_counter()
+
+    summary = stability(full, draws, args.alpha)
+    print(f"{args.draws} balanced subsamples of {full['female_n'].iloc[0]} female vs. "
+          f"{full['male_n'].iloc[0]} male conversations "
+          f"(features {loaded - start:.2f}s, tests {done - loaded:.2f}s)")
+    with pd.option_context('display.width', 200, 'display.max_columns', None):
+        print(summary.round(3).to_string())
+    if args.output:
+        draws.to_csv(args.output, index=False)
+        print(f"\nper-draw results written to {args.output}")
+
+
+def run_correlations(args):
+    import time
+
+    import pandas as pd
+
+    from .conversations import load_feature_matrix
+    from .correlations import correlate, prepare
+    from .lexical import read_csv_safe
+
+    start = time.perf_counter()
+    mapping = dedupe_map(args)
+    data = load_feature_matrix(args.data_dir, refresh=args.refresh, participant_map=mapping)
+    personality = read_csv_safe(Path(args.data_dir) / 'personality_test.csv')
+    merged, traits, features = prepare(data, personality, participant_map=mapping)
+    loaded = time.perf_counter()
+    results = correlate(merged, traits, features, n_permutations=args.permutations, seed=args.seed,
+                        n_jobs=args.n_jobs)
+    done = time.perf_counter()
+
+    print(f"{len(traits)} traits x {len(features)} features on {len(merged)} conversations from "
+          f"{merged['participant_id'].nunique()} participants "
+          f"(features {loaded - start:.2f}s, correlations + {args.permutations} permutations {done - loaded:.2f}s)")
+    significant = results['p_fdr'] < args.alpha
+    if 'p_perm' in results:
+        significant |= results['p_perm'] < args.alpha
+    significant = results[significant]
+    with pd.option_context('display.width', 200, 'display.max_columns', None):
+        if len(significant):
+            print(f"\npairs with p_fdr or p_perm < {args.alpha}")
+            print(significant.sort_values('p_value').drop(columns=['n', 'n_participants']).round(4)
+                  .to_string(index=False))
+        else:
+            print(f"\nno pair with p_fdr or p_perm < {args.alpha}")
+    if args.output:
+        results.to_csv(args.output, index=False)
+        print(f"\nall pairs written to {args.output}")
+
+
+def run_online(args):
+    from .online import main
+
+    main(args.passthrough)
+
+
+def run_bench(args):
+    from .bench import main
+
+    main(args.passthrough)
+
+
+def run_fetch_nltk(args):
+    from .resources import NLTK_DATA_DIR, RESOURCES, fetch
+
+    results = fetch(args.resources or tuple(RESOURCES))
+    for name, ok in results.items():
+        print(f"{name}: {'ok' if ok else 'FAILED'}")
+    print(f"NLTK cache: {NLTK_DATA_DIR}")
+    if not all(results.values()):
+        sys.exit(1)
+
+
+def add_copy_options(parser):
+    parser.add_argument('--exclude-copies', action='store_true',
+                        help='Drop prompts that near-duplicate the task text or an earlier prompt')
+    parser.add_argument('--dup-threshold', type=float, help='Jaccard threshold for --exclude-copies (default 0.8)')
+
+
+def add_dedupe_option(parser):
+    parser.add_argument('--dedupe', action='store_true',
+                        help='Merge repeat registrations of the same person (see: participants)')
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog='python -m hmi_analysis', description='HMI AI-prompting study analyses')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    lexical = commands.add_parser('lexical', help='Lexical features and significance tests by gender (CSV export)')
+    lexical.add_argument('--data-dir', default=str(Path(__file__).resolve().parent.parent / 'data'))
+    lexical.set_defaults(func=run_lexical)
+    add_copy_options(lexical)
+
+    sentiment = commands.add_parser('sentiment', help='Sentiment + linguistic analysis of a Supabase JSONL dump')
+    sentiment.add_argument('dump_dir', help='Directory with message/participant/... .jsonl files')
+    sentiment.add_argument('--streaming', action='store_true', help='Bounded-memory chunked mode')
+    sentiment.add_argument('--output', help='Streaming result file (.parquet or .csv)')
+    sentiment.add_argument('--chunk-size', type=int, default=5000)
+    sentiment.add_argument('--no-plots', action='store_true')
+    sentiment.add_argument('--pipeline', action='store_true',
+                           help='Memoised stage DAG: re-run only stages whose inputs changed')
+    sentiment.add_argument('--jobs', type=int, default=2, help='Concurrent stages with --pipeline')
+    sentiment.add_argument('--sentence-memo', action='store_true',
+                           help='Batch scoring with a per-sentence memo (faster, not bit-identical to per-message)')
+    sentiment.set_defaults(func=run_sentiment)
+    add_copy_options(sentiment)
+
+    dedup = commands.add_parser('dedup', help='Near-duplicate prompts (MinHash/LSH) within and across participants')
+    dedup.add_argument('--data-dir', default=str(Path(__file__).resolve().parent.parent / 'data'))
+    dedup.add_argument('--threshold', type=float, default=0.8, help='Jaccard similarity of character 5-grams')
+    dedup.add_argument('--scope', choices=['group', 'any'], default='group',
+                       help='Copies of earlier prompts by the same participant only, or by anyone')
+    dedup.add_argument('--output', help='CSV file for the pair list')
+    dedup.set_defaults(func=run_dedup)
+
+    default_db = str(Path(__file__).resolve().parent.parent / 'data' / 'messages.sqlite')
+    index = commands.add_parser('index', help='Build or update the full-text message index (SQLite FTS5)')
+    index.add_argument('--data-dir', default=str(Path(__file__).resolve().parent.parent / 'data'),
+                       help='CSV export directory or Supabase JSONL dump')
+    index.add_argument('--db', default=default_db)
+    index.set_defaults(func=run_index)
+
+    search = commands.add_parser('search', help='Full-text query with counts by group (see: index)')
+    search.add_argument('query', help='FTS5 query: words, "phrases", prefix*, AND/OR/NOT, NEAR(a b, 5)')
+    search.add_argument('--by', choices=['gender', 'participant', 'task', 'task_id', 'task_type', 'sender'],
+                        default='gender')
+    search.add_argument('--sender', choices=['user', 'ai', 'all'], default='user')
+    search.add_argument('--limit', type=int, default=10, help='Example messages to show')
+    search.add_argument('--db', default=default_db)
+    search.set_defaults(func=run_search)
+
+    images = commands.add_parser('images', help='Descriptors and perceptual-hash index of the image-task outputs')
+    data_dir = Path(__file__).resolve().parent.parent / 'data'
+    images.add_argument('--data-dir', default=str(data_dir))
+    images.add_argument('--image-dir', default=os.getenv('UPLOAD_FOLDER', str(data_dir / 'images')),
+                        help='Folder of the stored PNGs (default: $UPLOAD_FOLDER)')
+    images.add_argument('--db', default=str(data_dir / 'images.sqlite'))
+    images.add_argument('--n-jobs', type=int, default=1, help='Worker processes (-1: all CPUs)')
+    images.add_argument('--near', type=int, metavar='MESSAGE_ID', help='Images similar to this message\'s image')
+    images.add_argument('--duplicates', action='store_true', help='List near-duplicate image pairs')
+    images.add_argument('--max-distance', type=int, default=3, help='pHash Hamming distance (bits of 64)')
+    images.add_argument('--limit', type=int, default=20)
+    images.add_argument('--output', help='CSV of all images joined to prompts and participants')
+    images.set_defaults(func=run_images)
+
+    terms = commands.add_parser('terms', help='Distinctive terms by group (log-odds with Dirichlet prior, chi-square)')
+    terms.add_argument('--data-dir', default=str(Path(__file__).resolve().parent.parent / 'data'))
+    terms.add_argument('--by', choices=['gender', 'task', 'task_type', *PERSONALITY_TRAITS], default='gender',
+                       help='Grouping; personality traits are split into quantiles of the trait score')
+    terms.add_argument('--quantiles', type=int, default=3)
+    terms.add_argument('--top', type=int, default=15)
+    terms.add_argument('--min-df', type=int, default=2, help='Drop terms in fewer messages')
+    terms.add_argument('--max-df', type=float, default=0.5, help='Drop terms in a larger share of messages')
+    terms.add_argument('--output', help='CSV file for the full table')
+    terms.set_defaults(func=run_terms)
+
+    participants = commands.add_parser('participants',
+                                       help='Canonical participant ids for repeat registrations (fuzzy matching)')
+    participants.add_argument('--data-dir', default=str(Path(__file__).resolve().parent.parent / 'data'))
+    participants.add_argument('--max-block', type=int, default=50, help='Skip blocking keys shared by more rows')
+    participants.add_argument('--show', action='store_true', help='List the merged registrations')
+    participants.add_argument('--output', help='CSV file for the participant_id -> canonical_id mapping')
+    participants.set_defaults(func=run_participants)
+
+    models = commands.add_parser('models', help='Gender classifier: repeated grouped CV, permutation importance, PCA')
+    models.add_argument('--data-dir', default=str(Path(__file__).resolve().parent.parent / 'data'))
+    models.add_argument('--n-splits', type=int, default=5)
+    models.add_argument('--n-repeats', type=int, default=5)
+    models.add_argument('--n-jobs', type=int, default=1, help='Worker processes for the folds (-1: all CPUs)')
+    models.add_argument('--n-estimators', type=int, default=100)
+    models.add_argument('--n-permutations', type=int, default=10, help='Permutation importance repeats per fold')
+    models.add_argument('--pca', type=int, default=0, help='Classify on this many principal components')
+    models.add_argument('--sweep', action='store_true', help='Evaluate the hyperparameter grid in models.SWEEP_GRID')
+    models.add_argument('--seed', type=int, default=42)
+    models.add_argument('--refresh', action='store_true', help='Recompute the cached feature matrix')
+    add_dedupe_option(models)
+    models.add_argument('--output', help='CSV file for the per-fold scores')
+    models.set_defaults(func=run_models)
+
+    subsample = commands.add_parser('subsample',
+                                    help='Stability of the gender tests across many balanced participant subsamples')
+    subsample.add_argument('--data-dir', default=str(Path(__file__).resolve().parent.parent / 'data'))
+    subsample.add_argument('--draws', type=int, default=500)
+    subsample.add_argument('--seed', type=int, default=42)
+    subsample.add_argument('--n-jobs', type=int, default=1, help='Worker processes (-1: all CPUs)')
+    subsample.add_argument('--alpha', type=float, default=0.05)
+    subsample.add_argument('--refresh', action='store_true', help='Recompute the cached feature matrix')
+    add_dedupe_option(subsample)
+    subsample.add_argument('--output', help='CSV file for the per-draw results')
+    subsample.set_defaults(func=run_subsample)
+
+    correlations = commands.add_parser('correlations',
+                                       help='Big Five traits x linguistic features (Pearson/Spearman, FDR, permutations)')
+    correlations.add_argument('--data-dir', default=str(Path(__file__).resolve().parent.parent / 'data'))
+    correlations.add_argument('--permutations', type=int, default=1000,
+                              help='Participant-level permutations (0: parametric p-values only)')
+    correlations.add_argument('--seed', type=int, default=42)
+    correlations.add_argument('--n-jobs', type=int, default=1, help='Worker processes (-1: all CPUs)')
+    correlations.add_argument('--alpha', type=float, default=0.05)
+    correlations.add_argument('--refresh', action='store_true', help='Recompute the cached feature matrix')
+    add_dedupe_option(correlations)
+    correlations.add_argument('--output', help='CSV file for all trait x feature pairs')
+    correlations.set_defaults(func=run_correlations)
+
+    # online / bench keep their own option parsers; everything after the command is passed through
+    for name, func, help_text in (('online', run_online, 'Live study monitor (see: online --help)'),
+                                  ('bench', run_bench, 'Benchmark suite on synthetic data (see: bench --help)')):
+        sub = commands.add_parser(name, help=help_text, add_help=False)
+        sub.set_defaults(func=func, passthrough=True)
+
+    fetch = commands.add_parser('fetch-nltk', help='Download NLTK resources into the local offline cache (run once before first use)')
+    fetch.add_argument('resources', nargs='*', help='Resource names (default: stopwords punkt punkt_tab)')
+    fetch.set_defaults(func=run_fetch_nltk)
+    return parser
+
+
+def main(argv=None):
+    parser = build_parser()
+    args, extra = parser.parse_known_args(argv)
+    if getattr(args, 'passthrough', False):
+        args.passthrough = extra
+    elif extra:
+        parser.error(f"unrecognized arguments: {' '.join(extra)}")
+    args.func(args)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,242 @@
+"""Reproducible benchmark suite for the analysis pipeline.
+
+Generates seeded synthetic datasets (see ``synthetic.py``) and times
+``SentimentAnalyzer.run_complete_analysis`` itself, step by step (plus the
+opt-in ``--sentence-memo`` scoring as its own stage), and
+``hmi_analysis.lexical``, recording wall time, peak RSS and throughput per
+stage. Throughput is the number of messages the stage processed (all rows
+while loading, user messages afterwards) per second. Each dataset size runs
+in a fresh process so peak RSS is not inherited between sizes. Results are written as JSON tagged with the git commit, and a previous
+result file can be compared against to spot regressions.
+
+Usage:
+    python -m hmi_analysis.bench --sizes 10000 100000 1000000
+    python -m hmi_analysis.bench --sizes 10000 --compare bench_results/bench_<commit>.json
+"""
+import argparse
+import functools
+import json
+import multiprocessing
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from pathlib import Path
+
+from .synthetic import generate_dataset
+
+ANALYSIS_DIR = Path(__file__).resolve().parent.parent
+DEFAULT_SIZES = (10_000, 100_000, 1_000_000)
+
+
+def peak_rss_mb():
+    """Peak resident set size of this process so far, in MiB (NaN where unsupported)"""
+    try:
+        import resource
+    except ImportError:
+        return float("nan")
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports KiB, macOS bytes
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+class StageTimer:
+    """Collects wall time / peak RSS / throughput per named stage"""
+
+    def __init__(self, n_messages):
+        self.n_messages = n_messages
+        self.stages = {}
+
+    @contextmanager
+    def stage(self, name, n_messages=None):
+        """Time a block; throughput counts ``n_messages`` (a number or a callable read
+        after the block, default: the dataset size) as the messages it processed"""
+        start = time.perf_counter()
+        yield
+        wall = time.perf_counter() - start
+        n = n_messages() if callable(n_messages) else n_messages
+        n = self.n_messages if n is None else n
+        self.stages[name] = {
+            "wall_s": round(wall, 4),
+            "peak_rss_mb": round(peak_rss_mb(), 1),
+            "n_messages": n,
+            "msgs_per_s": round(n / wall, 1) if wall > 0 else None,
+        }
+
+    def wrap(self, name, func, n_messages=None):
+        """``func`` timed as stage ``name`` whenever it is called"""
+        @functools.wraps(func)
+        def timed(*args, **kwargs):
+            with self.stage(name, n_messages):
+                return func(*args, **kwargs)
+        return timed
+
+
+# Methods run_complete_analysis calls, in order, and the stage each is reported as
+SENTIMENT_STAGES = (("load", "load_data"), ("score", "analyze_all_messages"),
+                    ("merge", "merge_with_participant_data"), ("stats", "generate_gender_comparison"),
+                    ("plots", "create_visualizations"), ("report", "generate_report"))
+
+
+def bench_sentiment(data_dir, n_messages, plot_dpi=100, skip_plots=False):
+    """Time SentimentAnalyzer.run_complete_analysis as users run it, step by step.
+
+    The analyzer's own methods are wrapped in timers, so the stages add up to
+    the ``total`` stage. Loading counts every message row, the later steps the
+    user messages they process. The opt-in ``--sentence-memo`` scoring is timed
+    afterwards as ``memo_scoring`` on the same loaded data.
+    """
+    import io
+    from contextlib import redirect_stdout
+
+    from .sentiment_analysis import SentimentAnalyzer
+
+    analyzer = SentimentAnalyzer()
+    timer = StageTimer(n_messages)
+    n_user = lambda: int((analyzer.messages_df["sender"] == "user").sum())  # noqa: E731
+    for stage, method in SENTIMENT_STAGES:
+        func = getattr(analyzer, method)
+        if method == "create_visualizations":
+            func = functools.partial(func, dpi=plot_dpi)
+        setattr(analyzer, method, timer.wrap(stage, func, None if stage == "load" else n_user))
+
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as out_dir, redirect_stdout(io.StringIO()):
+        # run_complete_analysis writes its CSV, report and plots into the working directory
+        os.chdir(out_dir)
+        try:
+            with timer.stage("total", n_user):
+                analyzer.run_complete_analysis(data_dir / "message.jsonl", data_dir / "participant.jsonl",
+                                               data_dir / "tasks.jsonl", data_dir / "participant_task_interaction.jsonl",
+                                               plots=not skip_plots)
+        finally:
+            os.chdir(cwd)
+
+        memo = SentimentAnalyzer(sentence_memo=True)
+        memo.messages_df = analyzer.messages_df
+        with timer.stage("memo_scoring", n_user):
+            memo.analyze_all_messages()
+    return timer.stages
+
+
+def bench_lexical(data_dir, n_messages):
+    """Time the stages of the lexical analysis"""
+    from . import lexical as module
+
+    timer = StageTimer(n_messages)
+
+    with timer.stage("load"):
+        messages, participants, pti = module.load_tables(data_dir)
+    with timer.stage("merge"):
+        user_msgs = module.merge_tables(messages, participants, pti)
+    with timer.stage("features", len(user_msgs)):
+        per_msg = module.compute_features(user_msgs)
+    with timer.stage("summary", len(user_msgs)):
+        module.summarize_groups(per_msg)
+    with timer.stage("stats", len(user_msgs)):
+        module.run_all_tests(per_msg)
+    return timer.stages
+
+
+def run_size(n_messages, data_root, seed, pipelines, plot_dpi, skip_plots):
+    """Benchmark one dataset size (meant to run in its own process)"""
+    timer = StageTimer(n_messages)
+    with timer.stage("generate"):
+        data_dir = generate_dataset(n_messages, data_root, seed=seed)
+    result = {"dataset": timer.stages}
+    if "sentiment" in pipelines:
+        result["sentiment"] = bench_sentiment(data_dir, n_messages, plot_dpi, skip_plots)
+    if "lexical" in pipelines:
+        result["lexical"] = bench_lexical(data_dir, n_messages)
+    return result
+
+
+def git_revision():
+    try:
+        commit = subprocess.run(["git", "rev-parse", "HEAD"], cwd=ANALYSIS_DIR,
+                                capture_output=True, text=True, check=True).stdout.strip()
+        dirty = bool(subprocess.run(["git", "status", "--porcelain"], cwd=ANALYSIS_DIR,
+                                    capture_output=True, text=True).stdout.strip())
+        return commit, dirty
+    except (OSError, subprocess.CalledProcessError):
+        return None, None
+
+
+def compare(new, old, threshold=0.10):
+    """Print per-stage wall-time ratios new/old; returns stages slower than 1 + threshold"""
+    regressions = []
+    print(f"\n=== Compared with {old['meta'].get('commit')} ===")
+    print(f"{'size':>9} {'pipeline':<10} {'stage':<12} {'old_s':>9} {'new_s':>9} {'ratio':>7}")
+    for size, pipelines in new["results"].items():
+        for pipeline, stages in pipelines.items():
+            old_stages = old["results"].get(size, {}).get(pipeline, {})
+            for stage, metrics in stages.items():
+                if stage not in old_stages:
+                    continue
+                old_s, new_s = old_stages[stage]["wall_s"], metrics["wall_s"]
+                ratio = new_s / old_s if old_s else float("inf")
+                flag = "  <-- slower" if ratio > 1 + threshold else ""
+                if flag:
+                    regressions.append((size, pipeline, stage, ratio))
+                print(f"{size:>9} {pipeline:<10} {stage:<12} {old_s:>9.3f} {new_s:>9.3f} {ratio:>7.2f}{flag}")
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the analysis pipeline on synthetic data")
+    parser.add_argument("--sizes", type=int, nargs="+", default=list(DEFAULT_SIZES))
+    parser.add_argument("--pipelines", nargs="+", choices=["sentiment", "lexical"], default=["sentiment", "lexical"])
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--data-dir", default=os.path.join(tempfile.gettempdir(), "hmi_bench_data"),
+                        help="Where synthetic datasets are generated (and reused)")
+    parser.add_argument("--output", help="Result JSON path (default: bench_results/bench_<commit>.json)")
+    parser.add_argument("--plot-dpi", type=int, default=100)
+    parser.add_argument("--skip-plots", action="store_true")
+    parser.add_argument("--compare", help="Previous result JSON to compare against")
+    parser.add_argument("--threshold", type=float, default=0.10, help="Relative slowdown flagged as regression")
+    args = parser.parse_args(argv)
+
+    commit, dirty = git_revision()
+    report = {
+        "meta": {
+            "commit": commit,
+            "dirty": dirty,
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "python": sys.version.split()[0],
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "seed": args.seed,
+        },
+        "results": {},
+    }
+
+    context = multiprocessing.get_context("spawn")
+    for size in args.sizes:
+        print(f"Benchmarking {size} messages...", flush=True)
+        with ProcessPoolExecutor(max_workers=1, mp_context=context) as pool:
+            result = pool.submit(run_size, size, args.data_dir, args.seed, args.pipelines,
+                                 args.plot_dpi, args.skip_plots).result()
+        report["results"][str(size)] = result
+        for pipeline, stages in result.items():
+            for stage, m in stages.items():
+                print(f"  {pipeline:<10} {stage:<12} {m['wall_s']:>9.3f}s "
+                      f"{m['peak_rss_mb']:>9.1f} MiB {m['msgs_per_s'] or 0:>12.1f} msg/s")
+
+    output = Path(args.output or f"bench_results/bench_{(commit or 'nogit')[:10]}.json")
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(report, indent=2))
+    print(f"\nResults written to {output}")
+
+    if args.compare:
+        old = json.loads(Path(args.compare).read_text())
+        if compare(report, old, args.threshold):
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
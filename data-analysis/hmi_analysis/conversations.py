@@ -0,0 +1,117 @@
+"""Per-conversation feature matrix (one row per participant x task), cached on disk.
+
+This is the notebook's ``grouped_full`` table: the user prompts of each
+conversation go through the single-pass lexical kernel once, plus VADER
+compound (``sentiment``), TextBlob subjectivity (``opinion_score``), first
+prompt length and iteration count. With ``sentence_memo`` the sentiment
+scores are combined from per-prompt parts of a ``scoring.SentenceScorer``
+(each distinct sentence scored once, not bit-identical to scoring the joined
+text). The result is cached under ``CACHE_DIR``
+keyed by the SHA-256 of the input CSVs and ``FEATURE_VERSION``, so model
+evaluation and sensitivity runs load it instead of recomputing features.
+"""
+import hashlib
+import os
+import re
+from pathlib import Path
+
+import pandas as pd
+
+from .features import conversation_features
+
+DATA_DIR = Path(__file__).resolve().parent.parent / "data"
+CACHE_DIR = Path(os.getenv("HMI_CACHE_DIR", Path(__file__).resolve().parent.parent / ".cache"))
+# Bump when a definition in features.py changes (2: baseline tokens, pronouns and
+# sentences; word_count and marker counts differ from the sentiment script, see features)
+FEATURE_VERSION = 2
+INPUT_FILES = ("message.csv", "participant.csv", "participant_task_interaction.csv")
+
+# Same exclusion as lexical_analysis.py: image links / URLs are not prompts
+LINK_RE = re.compile(r"http|/static/")
+
+ML_FEATURES = [
+    "prompt_length", "ttr", "sentence_count", "avg_sentence_length", "opinion_score", "sentiment",
+    "iteration_count", "first_person_pronouns", "second_person_pronouns", "third_person_pronouns",
+    "emo_anger", "emo_anticipation", "emo_disgust", "emo_fear", "emo_joy", "emo_sadness",
+    "emo_surprise", "emo_trust",
+]
+
+
+def input_hash(data_dir=DATA_DIR, files=INPUT_FILES):
+    digest = hashlib.sha256(f"v{FEATURE_VERSION}".encode())
+    for name in files:
+        with open(Path(data_dir) / name, "rb") as f:
+            for block in iter(lambda: f.read(1 << 20), b""):
+                digest.update(block)
+    return digest.hexdigest()
+
+
+def build_conversation_features(data_dir=DATA_DIR, participant_map=None, sentence_memo=False):
+    """Feature rows per (participant_id, task_id) conversation of user prompts.
+
+    ``participant_map`` optionally maps raw participant ids to canonical ones
+    (repeat attempts by the same person) before grouping.
+    """
+    from .lexical import read_csv_safe
+
+    data_dir = Path(data_dir)
+    messages = read_csv_safe(data_dir / "message.csv")
+    participants = read_csv_safe(data_dir / "participant.csv")
+    pti = read_csv_safe(data_dir / "participant_task_interaction.csv")
+    if participant_map is not None:
+        pti["participant_id"] = pti["participant_id"].map(participant_map).fillna(pti["participant_id"])
+
+    prompts = messages[(messages["sender"] == "user") & ~messages["content"].str.contains(LINK_RE, na=False)]
+    prompts = prompts.merge(pti[["id", "participant_id", "task_id"]], left_on="interaction_id", right_on="id",
+                            suffixes=("", "_pti"))
+    prompts = prompts.sort_values(["participant_id", "task_id", "created_at"])
+
+    conversations = prompts.groupby(["participant_id", "task_id"], sort=False)
+    if sentence_memo:
+        # Conversation sentiment from the prompts' memoised sentence parts
+        from .scoring import shared_scorer
+
+        scorer = shared_scorer()
+        scores = scorer.score_groups(scorer.parts(prompts["content"].astype(str)), conversations.ngroup(),
+                                     conversations.ngroups)
+    else:
+        from .sentiment import textblob_scorer, vader_compound_scorer
+
+        vader, textblob = vader_compound_scorer(), textblob_scorer()
+    rows = []
+    for code, ((participant_id, task_id), conv) in enumerate(conversations):
+        texts = conv["content"].astype(str).tolist()
+        row = {"participant_id": participant_id, "task_id": task_id}
+        row.update(conversation_features(texts))
+        row["prompt_length"] = len(texts[0].split())
+        row["iteration_count"] = len(texts)
+        if sentence_memo:
+            row["sentiment"] = float(scores["compound"][code])
+            row["opinion_score"] = float(scores["subjectivity"][code])
+        else:
+            joined = " ".join(texts)
+            row["sentiment"] = vader(joined)
+            row["opinion_score"] = textblob(joined)["subjectivity"]
+        rows.append(row)
+
+    features = pd.DataFrame(rows)
+    gender = participants.set_index("id")["gender"].str.strip().str.lower()
+    features.insert(1, "gender", features["participant_id"].map(gender))
+    return features
+
+
+def load_feature_matrix(data_dir=DATA_DIR, cache_dir=CACHE_DIR, refresh=False, participant_map=None,
+                        sentence_memo=False):
+    """``build_conversation_features`` through the on-disk cache"""
+    key = input_hash(data_dir)
+    if participant_map is not None:
+        key = hashlib.sha256((key + repr(sorted(participant_map.items()))).encode()).hexdigest()
+    if sentence_memo:
+        key = hashlib.sha256((key + "sentence_memo").encode()).hexdigest()
+    path = Path(cache_dir) / f"conversations-{key[:16]}.pkl"
+    if path.exists() and not refresh:
+        return pd.read_pickle(path)
+    features = build_conversation_features(data_dir, participant_map, sentence_memo)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    features.to_pickle(path)
+    return features
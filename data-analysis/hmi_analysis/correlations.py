@@ -0,0 +1,161 @@
+"""Big Five traits x linguistic features: Pearson and Spearman matrices in one pass.
+
+The notebook merges ``personality_test.csv`` into ``grouped_full`` and calls
+``spearmanr`` pair by pair, and only for pairs whose Pearson ``|r|`` is above
+0.2. Here the five trait columns and all feature columns are standardised (for
+Spearman: ranked once, with average ties) and each method's full
+traits x features matrix is one matrix product. The p-values are vectorised
+from the t distribution, which gives the same values as ``pearsonr`` /
+``spearmanr``. BH-FDR is applied over all pairs of a method.
+
+Conversations are not independent: every conversation of a participant
+carries the same trait scores. The permutation test therefore shuffles trait
+vectors between participants, not between rows. It reports a per-pair p-value
+and a max-|r| p-value that controls the family-wise error over all pairs.
+Permutation ``i`` is seeded with ``(seed, i)`` and permutations run in chunks
+in a process pool, so results do not depend on ``n_jobs``.
+
+    python -m hmi_analysis correlations --permutations 5000 --n-jobs 4
+"""
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+TRAITS = ["extraversion_score", "agreeableness_score", "conscientiousness_score", "neuroticism_score",
+          "openness_score"]
+# Notebook feature list, mapped onto the conversation feature names; emo_* columns are added from the data
+FEATURES = ["prompt_length", "ttr", "sentence_count", "avg_sentence_length", "opinion_score", "sentiment",
+            "iteration_count", "first_person_pronouns", "second_person_pronouns", "third_person_pronouns"]
+METHODS = ("pearson", "spearman")
+
+_traits = _codes = _features = _observed = None
+
+
+def rank(values, axis=0):
+    """Average ranks along ``axis``, as ``spearmanr``"""
+    from scipy.stats import rankdata
+
+    return rankdata(values, axis=axis)
+
+
+def standardize(values, axis=0):
+    """Centre and scale to unit L2 norm along ``axis``; constant columns become NaN"""
+    centred = values - values.mean(axis=axis, keepdims=True)
+    norm = np.sqrt((centred ** 2).sum(axis=axis, keepdims=True))
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return centred / np.where(norm > 0, norm, np.nan)
+
+
+def correlation(a, b):
+    """Correlation matrix between the columns of ``a`` and of ``b`` (same rows)"""
+    return np.clip(standardize(a).T @ standardize(b), -1, 1)
+
+
+def p_values(r, n):
+    """Two-sided p-values of correlations ``r`` over ``n`` observations (t test with n - 2 df)"""
+    from scipy.stats import t
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        statistic = r * np.sqrt((n - 2) / ((1 - r) * (1 + r)))
+    return 2 * t.sf(np.abs(statistic), n - 2)
+
+
+def fdr(p):
+    """BH-adjusted p-values over all finite entries"""
+    from scipy.stats import false_discovery_control
+
+    p = np.asarray(p, dtype=float)
+    adjusted = np.full_like(p, np.nan)
+    finite = np.isfinite(p)
+    if finite.any():
+        adjusted[finite] = false_discovery_control(p[finite])
+    return adjusted
+
+
+def prepare(data, personality, traits=TRAITS, features=None, participant_map=None):
+    """Complete conversation rows with the participant's trait scores (first test per participant)"""
+    scores = personality[["participant_id", *traits]].copy()
+    if participant_map is not None:
+        scores["participant_id"] = scores["participant_id"].map(participant_map).fillna(scores["participant_id"])
+    scores = scores.drop_duplicates(subset=["participant_id"], keep="first")
+    if features is None:
+        features = [f for f in FEATURES if f in data.columns] + [c for c in data.columns if c.startswith("emo_")]
+    merged = data.merge(scores, on="participant_id", how="inner").dropna(subset=[*traits, *features])
+    return merged, list(traits), list(features)
+
+
+def _init_worker(traits, codes, features, observed):
+    global _traits, _codes, _features, _observed
+    _traits, _codes, _features, _observed = traits, codes, features, observed
+
+
+def _run_permutations(task):
+    """Exceedance counts per method: (pairwise, max-|r|) for a range of permutations"""
+    seed, permutations = task
+    order = np.stack([np.random.default_rng([seed, i]).permutation(len(_traits)) for i in permutations])
+    shuffled = _traits[order][:, _codes]                                    # permutations x rows x traits
+    counts = {}
+    for method in METHODS:
+        values = rank(shuffled, axis=1) if method == "spearman" else shuffled
+        r = np.abs(np.einsum("prt,rf->ptf", standardize(values, axis=1), _features[method]))
+        observed = np.abs(_observed[method]) - 1e-12
+        with np.errstate(invalid="ignore"):
+            pairwise = (r >= observed).sum(axis=0)
+            maximum = (np.nanmax(r, axis=(1, 2))[:, None, None] >= observed).sum(axis=0)
+        counts[method] = pairwise, maximum
+    return counts
+
+
+def correlate(merged, traits, features, n_permutations=1000, seed=42, n_jobs=1, chunk=100):
+    """Tidy Pearson and Spearman results for every trait x feature pair.
+
+    One row per method, trait and feature with r, the parametric p-value, its
+    BH adjustment and, with ``n_permutations``, the participant-level
+    permutation p-values (pairwise and max-|r|).
+    """
+    codes, participants = pd.factorize(merged["participant_id"])
+    # Trait scores are per participant; the permutations shuffle these rows
+    trait_rows = merged.groupby(codes)[traits].first().to_numpy(float)
+    values = {"pearson": (merged[traits].to_numpy(float), merged[features].to_numpy(float))}
+    values["spearman"] = tuple(rank(v) for v in values["pearson"])
+    n = len(merged)
+    observed = {method: correlation(*values[method]) for method in METHODS}
+
+    permuted = None
+    if n_permutations:
+        args = (trait_rows, codes, {m: standardize(values[m][1]) for m in METHODS}, observed)
+        tasks = [(seed, range(start, min(start + chunk, n_permutations))) for start in range(0, n_permutations, chunk)]
+        workers = n_jobs if n_jobs > 0 else os.cpu_count() or 1
+        if workers == 1:
+            _init_worker(*args)
+            results = [_run_permutations(task) for task in tasks]
+        else:
+            with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=args) as pool:
+                results = list(pool.map(_run_permutations, tasks))
+        permuted = {m: [(1 + sum(r[m][k] for r in results)) / (n_permutations + 1) for k in (0, 1)] for m in METHODS}
+
+    frames = []
+    for method in METHODS:
+        r = observed[method]
+        p = p_values(r, n)
+        frame = pd.DataFrame({
+            "method": method,
+            "trait": np.repeat(traits, len(features)),
+            "feature": np.tile(features, len(traits)),
+            "r": r.ravel(), "p_value": p.ravel(), "p_fdr": fdr(p.ravel()), "n": n,
+            "n_participants": len(participants),
+        })
+        if permuted is not None:
+            frame["p_perm"] = permuted[method][0].ravel()
+            frame["p_perm_max"] = permuted[method][1].ravel()
+        frames.append(frame)
+    return pd.concat(frames, ignore_index=True)
+
+
+def matrix(results, method="spearman", value="r"):
+    """traits x features table of one column of the tidy results (e.g. for a heatmap)"""
+    subset = results[results["method"] == method]
+    return subset.pivot(index="trait", columns="feature", values=value).reindex(
+        index=pd.unique(subset["trait"]), columns=pd.unique(subset["feature"]))
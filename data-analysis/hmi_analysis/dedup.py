@@ -0,0 +1,194 @@
+"""Near-duplicate prompt detection with MinHash + LSH banding.
+
+Participants paste the task text or re-send almost the same prompt while
+refining, which inflates message counts and deflates TTR. Comparing every pair
+of prompts is quadratic; here each prompt is reduced to character shingles, a
+MinHash signature and one bucket per LSH band, so only prompts that share a
+bucket are compared (exact Jaccard on the shingle sets). Work per insert is
+roughly constant, and the index grows one message at a time.
+
+    index = NearDuplicateIndex(threshold=0.8)
+    index.add(1, "a cosy room with plants")      # -> [] (nothing similar yet)
+    index.add(2, "A cosy room with plants!")     # -> [(1, 0.9...)]
+
+``flag_copies`` / ``CopyFilter`` turn this into the ``is_copy`` flag that the
+lexical and sentiment analyses use to optionally exclude copies.
+"""
+import zlib
+from collections import defaultdict
+
+import numpy as np
+import pandas as pd
+
+DEFAULT_THRESHOLD = 0.8
+SHINGLE_SIZE = 5
+NUM_PERM = 128
+MERSENNE_PRIME = np.uint64((1 << 61) - 1)
+MAX_HASH = np.uint64((1 << 32) - 1)
+
+
+def normalize(text):
+    return " ".join(str(text).lower().split()) if isinstance(text, str) else ""
+
+
+def shingles(text, k=SHINGLE_SIZE):
+    """CRC32 ids of the character k-grams of the normalised text"""
+    text = normalize(text)
+    if len(text) <= k:
+        return {zlib.crc32(text.encode("utf-8"))} if text else set()
+    encoded = text.encode("utf-8")
+    return {zlib.crc32(encoded[i:i + k]) for i in range(len(encoded) - k + 1)}
+
+
+def jaccard(a, b):
+    if not a or not b:
+        return 0.0
+    return len(a & b) / len(a | b)
+
+
+def choose_bands(threshold, num_perm=NUM_PERM, recall=0.99):
+    """(bands, rows) with the most rows per band -- the fewest candidate pairs -- that
+    still makes a pair at exactly ``threshold`` a candidate with probability >= ``recall``"""
+    for rows in range(num_perm, 0, -1):
+        bands = num_perm // rows
+        if 1 - (1 - threshold ** rows) ** bands >= recall:
+            return bands, rows
+    return num_perm, 1
+
+
+class MinHasher:
+    """``num_perm`` hash functions (a*x + b) mod p, truncated to 32 bits"""
+
+    def __init__(self, num_perm=NUM_PERM, seed=1):
+        rng = np.random.default_rng(seed)
+        self.num_perm = num_perm
+        self.a = rng.integers(1, MERSENNE_PRIME, num_perm, dtype=np.uint64)
+        self.b = rng.integers(0, MERSENNE_PRIME, num_perm, dtype=np.uint64)
+
+    def signature(self, shingle_ids):
+        ids = np.fromiter(shingle_ids, dtype=np.uint64, count=len(shingle_ids))
+        if not len(ids):
+            return np.full(self.num_perm, MAX_HASH, dtype=np.uint64)
+        # uint64 products wrap around; that only permutes the hash family, as in datasketch
+        hashes = (ids[:, None] * self.a + self.b) % MERSENNE_PRIME & MAX_HASH
+        return hashes.min(axis=0)
+
+
+class NearDuplicateIndex:
+    """Incremental MinHash/LSH index of texts keyed by message id"""
+
+    def __init__(self, threshold=DEFAULT_THRESHOLD, num_perm=NUM_PERM, shingle_size=SHINGLE_SIZE, seed=1):
+        self.threshold = threshold
+        self.shingle_size = shingle_size
+        self.bands, self.rows = choose_bands(threshold, num_perm)
+        self.hasher = MinHasher(num_perm, seed)
+        self._buckets = [defaultdict(list) for _ in range(self.bands)]
+        self._shingles = {}
+        self.groups = {}
+        self.comparisons = 0
+
+    def __len__(self):
+        return len(self._shingles)
+
+    def __contains__(self, key):
+        return key in self._shingles
+
+    def _band_keys(self, signature):
+        r = self.rows
+        return [signature[i * r:(i + 1) * r].tobytes() for i in range(self.bands)]
+
+    def _matches(self, shingle_set, band_keys):
+        candidates = set()
+        for bucket, band_key in zip(self._buckets, band_keys):
+            candidates.update(bucket.get(band_key, ()))
+        self.comparisons += len(candidates)
+        scored = ((key, jaccard(shingle_set, self._shingles[key])) for key in candidates)
+        return sorted((m for m in scored if m[1] >= self.threshold), key=lambda m: (-m[1], str(m[0])))
+
+    def query(self, text):
+        """Indexed keys whose Jaccard similarity to ``text`` is >= threshold, most similar first"""
+        shingle_set = shingles(text, self.shingle_size)
+        if not shingle_set:
+            return []
+        return self._matches(shingle_set, self._band_keys(self.hasher.signature(shingle_set)))
+
+    def add(self, key, text, group=None):
+        """Index ``text`` under ``key``; returns its matches among the texts indexed before it"""
+        if key in self._shingles:
+            raise ValueError(f"Key {key!r} is already indexed")
+        shingle_set = shingles(text, self.shingle_size)
+        if not shingle_set:
+            return []
+        band_keys = self._band_keys(self.hasher.signature(shingle_set))
+        matches = self._matches(shingle_set, band_keys)
+        for bucket, band_key in zip(self._buckets, band_keys):
+            bucket[band_key].append(key)
+        self._shingles[key] = frozenset(shingle_set)
+        self.groups[key] = group
+        return matches
+
+
+class CopyFilter:
+    """Streaming copy detector: feed messages in chronological order.
+
+    A message is a copy when it near-duplicates one of the ``references`` (e.g.
+    task descriptions, {key: text}) or an earlier message -- of the same group
+    (participant) with ``scope="group"``, of anyone with ``scope="any"``.
+    """
+
+    def __init__(self, threshold=DEFAULT_THRESHOLD, references=None, scope="group", **index_options):
+        if scope not in ("group", "any"):
+            raise ValueError("scope must be 'group' or 'any'")
+        self.scope = scope
+        self.index = NearDuplicateIndex(threshold, **index_options)
+        self.references = NearDuplicateIndex(threshold, **index_options)
+        for key, text in (references or {}).items():
+            self.references.add(key, text)
+        self.copies = 0
+
+    def check(self, key, text, group=None):
+        """(dup_of, copies_reference) for one message; both None for an original"""
+        reference = next((ref for ref, _ in self.references.query(text)), None)
+        matches = self.index.add(key, text, group)
+        if self.scope == "group":
+            matches = [m for m in matches if self.index.groups[m[0]] == group]
+        dup_of = matches[0][0] if matches else None
+        if dup_of is not None or reference is not None:
+            self.copies += 1
+        return dup_of, reference
+
+    def is_copy(self, key, text, group=None):
+        dup_of, reference = self.check(key, text, group)
+        return dup_of is not None or reference is not None
+
+
+def flag_copies(texts, keys=None, groups=None, references=None, threshold=DEFAULT_THRESHOLD, scope="group",
+                copy_filter=None):
+    """Per-message copy flags for texts in chronological order.
+
+    Returns a DataFrame on the same index with ``dup_of`` (key of the earlier
+    near-duplicate), ``copies_reference`` (matching reference key) and ``is_copy``.
+    An existing ``copy_filter`` replaces references/threshold/scope and keeps its state.
+    """
+    texts = pd.Series(texts)
+    keys = texts.index if keys is None else keys
+    groups = [None] * len(texts) if groups is None else groups
+    copy_filter = copy_filter or CopyFilter(threshold, references, scope)
+    rows = [copy_filter.check(key, text, group) for key, text, group in zip(keys, texts, groups)]
+    flags = pd.DataFrame(rows, index=texts.index, columns=["dup_of", "copies_reference"])
+    flags["is_copy"] = flags["dup_of"].notna() | flags["copies_reference"].notna()
+    return flags
+
+
+def find_pairs(texts, keys=None, groups=None, threshold=DEFAULT_THRESHOLD):
+    """All near-duplicate pairs (within and across groups) with their Jaccard similarity"""
+    texts = pd.Series(texts)
+    keys = texts.index if keys is None else keys
+    groups = [None] * len(texts) if groups is None else groups
+    index = NearDuplicateIndex(threshold)
+    pairs = []
+    for key, text, group in zip(keys, texts, groups):
+        for other, similarity in index.add(key, text, group):
+            other_group = index.groups[other]
+            pairs.append((other, key, round(similarity, 4), other_group, group, other_group == group))
+    return pd.DataFrame(pairs, columns=["key_a", "key_b", "jaccard", "group_a", "group_b", "same_group"])
@@ -0,0 +1,288 @@
+"""Image-task outputs: descriptors and perceptual hashes in an on-disk index.
+
+The two image tasks store their PNGs through ``save_base64_image``. The
+message content is then a ``/static/images/<file>.png`` path, which the text
+analyses filter out. ``ImageIndex.update`` finds those messages (CSV
+directory or Supabase JSONL dump) and passes the image paths to a process
+pool. Each worker opens one image and returns only a small row:
+
+* size: bytes, width, height and mode, plus the file's SHA-256;
+* grey-level entropy, mean RGB and a 4x4x4 RGB histogram (64 shares);
+* 64-bit pHash (DCT of a 32x32 grey thumbnail) and dHash (9x8 gradients).
+
+Entropy and histogram come from a thumbnail of at most ``THUMBNAIL`` pixels
+per side.
+
+Rows go into a SQLite table keyed by message id, so later joins to prompts and
+participants never reload an image. Re-running ``update`` only processes
+messages that are new or whose file changed (size or mtime).
+
+The pHash is also stored as four 16-bit bands, each with its own index. Two
+hashes within Hamming distance 3 share at least one band, so ``near`` and
+``duplicates`` look up candidates through the indexes. Larger distances scan
+all stored hashes with NumPy.
+
+    with ImageIndex() as index:                 # data/images.sqlite
+        index.update("data", image_dir="/home/ubuntu/static/images", n_jobs=4)
+        index.near(1234, max_distance=3)        # [(message_id, distance)]
+        pairs = index.duplicates()
+"""
+import hashlib
+import io
+import os
+import sqlite3
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import numpy as np
+
+from .search import DATA_DIR, _int, iter_rows
+
+DEFAULT_DB = DATA_DIR / "images.sqlite"
+# Same variable as the backend's upload folder
+IMAGE_DIR = Path(os.getenv("UPLOAD_FOLDER", DATA_DIR / "images"))
+IMAGE_PREFIX = "/static/images/"
+THUMBNAIL = 256
+HIST_BINS = 4
+BANDS = 4
+
+DESCRIPTORS = ("sha256", "bytes", "mtime", "width", "height", "mode", "entropy", "mean_r", "mean_g", "mean_b",
+               "phash", "dhash", "histogram", "error")
+SCHEMA = f"""
+CREATE TABLE IF NOT EXISTS image (
+    message_id INTEGER PRIMARY KEY, interaction_id INTEGER, created_at TEXT, path TEXT,
+    sha256 TEXT, bytes INTEGER, mtime REAL, width INTEGER, height INTEGER, mode TEXT,
+    entropy REAL, mean_r REAL, mean_g REAL, mean_b REAL, phash INTEGER, dhash INTEGER, histogram BLOB,
+    error TEXT, {", ".join(f"band{b} INTEGER" for b in range(BANDS))}
+);
+CREATE INDEX IF NOT EXISTS image_interaction ON image(interaction_id);
+CREATE INDEX IF NOT EXISTS image_sha256 ON image(sha256);
+{"".join(f"CREATE INDEX IF NOT EXISTS image_band{b} ON image(band{b});" for b in range(BANDS))}
+"""
+
+
+def _signed(value):
+    """64-bit hash as SQLite's signed INTEGER"""
+    return value - (1 << 64) if value >= 1 << 63 else value
+
+
+def _bits_to_int(bits):
+    return int(np.packbits(bits.ravel().astype(np.uint8)).view(">u8")[0])
+
+
+def bands(value):
+    """The ``BANDS`` 16-bit slices of a 64-bit hash"""
+    value &= (1 << 64) - 1
+    return [(value >> (16 * b)) & 0xFFFF for b in range(BANDS)]
+
+
+def hamming(a, b):
+    """Bit differences between a hash and an array of hashes (signed or unsigned 64-bit)"""
+    x = np.bitwise_xor(np.asarray(b, dtype=np.int64).view(np.uint64), np.uint64(a & ((1 << 64) - 1)))
+    return np.unpackbits(x.view(np.uint8).reshape(-1, 8), axis=1).sum(axis=1)
+
+
+def phash(grey):
+    """pHash of a PIL grey image: signs of the 8x8 low-frequency DCT block against its median"""
+    from PIL import Image
+    from scipy.fft import dctn
+
+    pixels = np.asarray(grey.resize((32, 32), Image.Resampling.LANCZOS), dtype=float)
+    low = dctn(pixels, norm="ortho")[:8, :8]
+    return _bits_to_int(low > np.median(low))
+
+
+def dhash(grey):
+    """dHash of a PIL grey image: is each pixel of a 9x8 thumbnail brighter than its right neighbour"""
+    from PIL import Image
+
+    pixels = np.asarray(grey.resize((9, 8), Image.Resampling.LANCZOS), dtype=float)
+    return _bits_to_int(pixels[:, :-1] > pixels[:, 1:])
+
+
+def describe(path):
+    """Descriptor row (``DESCRIPTORS``) of one image file; unreadable images set ``error``"""
+    from PIL import Image
+
+    stat = os.stat(path)
+    with open(path, "rb") as f:
+        data = f.read()
+    row = dict.fromkeys(DESCRIPTORS)
+    row.update(sha256=hashlib.sha256(data).hexdigest(), bytes=stat.st_size, mtime=stat.st_mtime)
+    try:
+        with Image.open(io.BytesIO(data)) as img:
+            row.update(width=img.width, height=img.height, mode=img.mode)
+            # Shrink before converting; palette images are converted first so colours stay exact
+            if img.mode not in ("RGB", "RGBA", "L"):
+                img = img.convert("RGB")
+            img.thumbnail((THUMBNAIL, THUMBNAIL), reducing_gap=2.0)
+            rgb = img.convert("RGB")
+    except (OSError, ValueError, Image.DecompressionBombError) as e:
+        row["error"] = type(e).__name__
+        return row
+    grey = rgb.convert("L")
+    pixels = np.asarray(rgb).reshape(-1, 3)
+    # Joint RGB histogram over HIST_BINS levels per channel
+    levels = pixels // (256 // HIST_BINS)
+    codes = (levels[:, 0] * HIST_BINS + levels[:, 1]) * HIST_BINS + levels[:, 2]
+    histogram = np.bincount(codes, minlength=HIST_BINS ** 3) / len(codes)
+    row.update(entropy=grey.entropy(), mean_r=float(pixels[:, 0].mean()), mean_g=float(pixels[:, 1].mean()),
+               mean_b=float(pixels[:, 2].mean()), phash=phash(grey), dhash=dhash(grey),
+               histogram=histogram.astype(np.float32).tobytes())
+    return row
+
+
+def histograms(blobs):
+    """(n, HIST_BINS ** 3) array from stored histogram blobs (NaN rows for missing ones)"""
+    out = np.full((len(blobs), HIST_BINS ** 3), np.nan, dtype=np.float32)
+    for i, blob in enumerate(blobs):
+        if blob is not None:
+            out[i] = np.frombuffer(blob, dtype=np.float32)
+    return out
+
+
+class ImageIndex:
+    def __init__(self, path=DEFAULT_DB):
+        self.path = Path(path)
+        self.db = sqlite3.connect(self.path)
+        self.db.executescript(SCHEMA)
+
+    def close(self):
+        self.db.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def __len__(self):
+        return self.db.execute("SELECT count(*) FROM image").fetchone()[0]
+
+    def pending(self, data_dir=DATA_DIR, image_dir=IMAGE_DIR):
+        """(message_id, interaction_id, created_at, file) of image messages not indexed or changed on disk.
+
+        Also returns the number of image messages whose file is missing.
+        """
+        known = {message_id: (size, mtime) for message_id, size, mtime in
+                 self.db.execute("SELECT message_id, bytes, mtime FROM image")}
+        todo, missing = [], 0
+        for r in iter_rows(data_dir, "message"):
+            content = (r.get("content") or "").strip()
+            if not content.startswith(IMAGE_PREFIX):
+                continue
+            file = Path(image_dir) / content[len(IMAGE_PREFIX):]
+            try:
+                stat = file.stat()
+            except OSError:
+                missing += 1
+                continue
+            message_id = _int(r["id"])
+            if known.get(message_id) != (stat.st_size, stat.st_mtime):
+                todo.append((message_id, _int(r.get("interaction_id")), r.get("created_at"), str(file)))
+        return todo, missing
+
+    def update(self, data_dir=DATA_DIR, image_dir=IMAGE_DIR, n_jobs=1, batch=256, progress=None):
+        """Describe new or changed images in a process pool; returns (#indexed, #missing files)"""
+        todo, missing = self.pending(data_dir, image_dir)
+        workers = n_jobs if n_jobs > 0 else os.cpu_count() or 1
+        columns = ("message_id", "interaction_id", "created_at", "path", *DESCRIPTORS,
+                   *(f"band{b}" for b in range(BANDS)))
+        sql = f"INSERT OR REPLACE INTO image({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))})"
+        pool = ProcessPoolExecutor(max_workers=workers) if workers > 1 and len(todo) > 1 else None
+        try:
+            paths = [item[3] for item in todo]
+            # map() yields rows in order while workers run ahead; rows are written in batches
+            rows = (pool.map(describe, paths, chunksize=max(1, min(batch, len(paths) // (4 * workers))))
+                    if pool else map(describe, paths))
+            buffer = []
+            for done, (item, row) in enumerate(zip(todo, rows), 1):
+                hashes = bands(row["phash"]) if row["phash"] is not None else [None] * BANDS
+                for key in ("phash", "dhash"):
+                    if row[key] is not None:
+                        row[key] = _signed(row[key])
+                buffer.append((*item, *(row[k] for k in DESCRIPTORS), *hashes))
+                if len(buffer) >= batch or done == len(todo):
+                    with self.db:
+                        self.db.executemany(sql, buffer)
+                    buffer.clear()
+                    if progress:
+                        progress(f"  {done}/{len(todo)} images")
+        finally:
+            if pool:
+                pool.shutdown()
+        return len(todo), missing
+
+    def _hashes(self, where="", params=()):
+        rows = self.db.execute(f"SELECT message_id, phash FROM image WHERE phash IS NOT NULL {where} "
+                               f"ORDER BY message_id", params).fetchall()
+        return (np.array([r[0] for r in rows], dtype=np.int64), np.array([r[1] for r in rows], dtype=np.int64))
+
+    def similar(self, value, max_distance=3, limit=None, exclude=None):
+        """[(message_id, distance)] of images within ``max_distance`` bits of pHash ``value``, closest first"""
+        if max_distance < BANDS:
+            # Pigeonhole: a match differs in at most max_distance bands, so it shares one exactly
+            where = "AND (" + " OR ".join(f"band{b} = ?" for b in range(BANDS)) + ")"
+            ids, hashes = self._hashes(where, bands(value))
+        else:
+            ids, hashes = self._hashes()
+        distance = hamming(value, hashes)
+        keep = (distance <= max_distance) & (ids != (exclude if exclude is not None else -1))
+        order = np.lexsort((ids[keep], distance[keep]))[:limit]
+        return [(int(i), int(d)) for i, d in zip(ids[keep][order], distance[keep][order])]
+
+    def near(self, message_id, max_distance=3, limit=None):
+        """``similar`` for the image of message ``message_id`` (excluding itself)"""
+        row = self.db.execute("SELECT phash FROM image WHERE message_id = ?", (message_id,)).fetchone()
+        if row is None or row[0] is None:
+            raise KeyError(f"No hashed image for message {message_id}")
+        return self.similar(row[0], max_distance, limit, exclude=message_id)
+
+    def duplicates(self, max_distance=3):
+        """Sorted pairs (message_id_a < message_id_b, distance) of near-duplicate images"""
+        if max_distance < BANDS:
+            sql = " UNION ".join(
+                f"SELECT a.message_id, b.message_id, a.phash, b.phash FROM image a "
+                f"JOIN image b ON b.band{b} = a.band{b} AND b.message_id > a.message_id" for b in range(BANDS))
+            rows = np.array(self.db.execute(sql).fetchall(), dtype=np.int64).reshape(-1, 4)
+            distance = hamming(0, np.bitwise_xor(rows[:, 2], rows[:, 3]))
+            keep = distance <= max_distance
+            return sorted(zip(rows[keep, 0].tolist(), rows[keep, 1].tolist(), distance[keep].tolist()))
+        # One vectorised scan per image against all later ones
+        ids, hashes = self._hashes()
+        pairs = []
+        for k in range(len(ids) - 1):
+            distance = hamming(int(hashes[k]), hashes[k + 1:])
+            keep = distance <= max_distance
+            pairs.extend(zip([int(ids[k])] * int(keep.sum()), ids[k + 1:][keep].tolist(), distance[keep].tolist()))
+        return pairs
+
+    def table(self):
+        """All indexed images as a DataFrame (no histogram blobs)"""
+        import pandas as pd
+
+        columns = [c for c in ("message_id", "interaction_id", "created_at", "path", *DESCRIPTORS) if c != "histogram"]
+        return pd.read_sql_query(f"SELECT {', '.join(columns)} FROM image ORDER BY message_id", self.db)
+
+
+def with_prompts(images, messages, participants, pti):
+    """Image rows with the prompt that produced them and the participant / task.
+
+    The prompt is the last user message of the same interaction sent before
+    the image message.
+    """
+    import pandas as pd
+
+    prompts = messages[messages["sender"] == "user"][["id", "interaction_id", "created_at", "content"]].rename(
+        columns={"id": "prompt_id", "content": "prompt", "created_at": "prompt_at"})
+    prompts = prompts[~prompts["prompt"].astype(str).str.startswith(IMAGE_PREFIX)]
+    left = images.assign(_at=pd.to_datetime(images["created_at"], utc=True, format="ISO8601"))
+    right = prompts.assign(_at=pd.to_datetime(prompts["prompt_at"], utc=True, format="ISO8601"))
+    left = left.dropna(subset=["_at"]).sort_values("_at")
+    merged = pd.merge_asof(left, right.dropna(subset=["_at"]).sort_values("_at"), on="_at",
+                           by="interaction_id", direction="backward", allow_exact_matches=True)
+    merged = merged.drop(columns="_at").merge(
+        pti[["id", "participant_id", "task_id"]].rename(columns={"id": "interaction_id"}),
+        on="interaction_id", how="left")
+    people = participants[["id", "gender", "age"]].rename(columns={"id": "participant_id"})
+    return merged.merge(people, on="participant_id", how="left").sort_values("message_id", ignore_index=True)
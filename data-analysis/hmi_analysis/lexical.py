@@ -0,0 +1,217 @@
+"""Lexical features (token count, TTR, pronoun and emotion words) compared by gender.
+
+Importing this module does no work: data is read by ``main``/``load_tables``,
+the NRC lexicon is loaded on the first feature call and scipy only when the
+significance tests run.
+"""
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from .features import FeatureAccumulator, load_nrc_lexicon, tokenize
+
+DATA_DIR = Path(__file__).resolve().parent.parent / "data"
+
+# ========= Load Data =========
+def read_csv_safe(path):
+    try:
+        return pd.read_csv(path)
+    except UnicodeDecodeError:
+        return pd.read_csv(path, encoding="utf-8-sig")
+
+def load_tables(data_dir=DATA_DIR):
+    data_dir = Path(data_dir)
+    messages = read_csv_safe(data_dir / "message.csv")
+    participants = read_csv_safe(data_dir / "participant.csv")
+    pti = read_csv_safe(data_dir / "participant_task_interaction.csv")
+    return messages, participants, pti
+
+# ========= Merge: Participant -> Interaction -> Message =========
+def merge_tables(messages, participants, pti):
+    merged = messages.merge(
+        pti, left_on="interaction_id", right_on="id", suffixes=("_msg", "_pti")
+    ).merge(
+        participants, left_on="participant_id", right_on="id", suffixes=("_pti", "_part")
+    )
+
+    # Keep only user messages with real text (exclude AI/image links)
+    user_msgs = merged[
+        (merged["sender"] == "user") &
+        (~merged["content"].str.contains(r"http|/static/", na=False))
+    ].copy()
+    return user_msgs
+
+# ========= Optional: drop pasted/re-sent prompts =========
+def drop_copies(user_msgs, data_dir=DATA_DIR, threshold=None):
+    """Remove user messages that near-duplicate the task text or the participant's earlier prompts"""
+    from .dedup import DEFAULT_THRESHOLD, flag_copies
+
+    tasks_path = Path(data_dir) / "tasks.csv"
+    tasks = read_csv_safe(tasks_path) if tasks_path.exists() else None
+    references = dict(zip(tasks["id"], tasks["description"])) if tasks is not None else None
+    ordered = user_msgs.sort_values("id_msg")
+    flags = flag_copies(ordered["content"], ordered["id_msg"], ordered["participant_id"], references,
+                        threshold=threshold or DEFAULT_THRESHOLD)
+    print(f"Excluding {int(flags['is_copy'].sum())} of {len(flags)} user messages as near-duplicate copies")
+    return user_msgs.loc[~flags["is_copy"].reindex(user_msgs.index)].copy()
+
+# ========= Simple Tokenizer =========
+def simple_tokenize(text: str):
+    return tokenize(text)
+
+# ========= Lexical features per message =========
+PRONOUNS = frozenset({
+    "i","you","he","she","we","they","me","him","her","us","them",
+    "my","your","our","their","mine","yours","ours","theirs"
+})
+EMOTION_WORDS = frozenset({
+    "happy","sad","angry","love","hate","fear","good","bad","better","worse",
+    "enjoy","dislike","like","beautiful","ugly"
+})
+LEXICONS = {"pronoun": PRONOUNS, "emotion": EMOTION_WORDS}
+
+def features_for_text(text: str):
+    f = FeatureAccumulator(LEXICONS, load_nrc_lexicon()).feed(text).to_dict()
+    return f["word_count"], f["ttr"], f["lex_pronoun"], f["lex_emotion"]
+
+def compute_features(user_msgs):
+    feat = pd.DataFrame(
+        [features_for_text(t) for t in user_msgs["content"]],
+        index=user_msgs.index,
+        columns=["token_count", "ttr", "pronoun_count", "emotion_count"],
+    )
+    user_msgs[feat.columns] = feat
+
+    # Keep only needed columns for analysis
+    per_msg = user_msgs[
+        ["participant_id", "gender", "content", "token_count", "ttr", "pronoun_count", "emotion_count"]
+    ].dropna(subset=["gender"]).copy()
+    return per_msg
+
+# ========= Group Summary (means/SDs by gender) =========
+def summarize_groups(per_msg):
+    return per_msg.groupby("gender").agg(
+        n=("content", "count"),
+        token_count_mean=("token_count", "mean"),
+        token_count_sd=("token_count", "std"),
+        ttr_mean=("ttr", "mean"),
+        ttr_sd=("ttr", "std"),
+        pronoun_count_mean=("pronoun_count", "mean"),
+        pronoun_count_sd=("pronoun_count", "std"),
+        emotion_count_mean=("emotion_count", "mean"),
+        emotion_count_sd=("emotion_count", "std"),
+    ).reset_index()
+
+# ========= Stats helpers =========
+def cohens_d(a, b):
+    a = np.asarray(a); b = np.asarray(b)
+    na, nb = len(a), len(b)
+    if na < 2 or nb < 2:
+        return np.nan
+    sa2, sb2 = np.var(a, ddof=1), np.var(b, ddof=1)
+    denom = ((na - 1)*sa2 + (nb - 1)*sb2) / (na + nb - 2) if (na+nb-2) > 0 else np.nan
+    if denom <= 0 or np.isnan(denom):
+        return np.nan
+    return (np.mean(a) - np.mean(b)) / np.sqrt(denom)
+
+def hedges_g(a, b):
+    d = cohens_d(a, b)
+    na, nb = len(a), len(b)
+    df = na + nb - 2
+    if df <= 0 or np.isnan(d):
+        return np.nan
+    J = 1 - (3 / (4*df - 1))
+    return d * J
+
+def cliffs_delta(a, b):
+    a = np.asarray(a, dtype=float); b = np.sort(np.asarray(b, dtype=float))
+    if len(a) == 0 or len(b) == 0:
+        return np.nan
+    # For each x in a: #b < x and #b > x via binary search (O(n log n) instead of all pairs)
+    greater = np.searchsorted(b, a, side="left").sum()
+    less = (len(b) - np.searchsorted(b, a, side="right")).sum()
+    n = len(a) * len(b)
+    return (greater - less) / n
+
+def run_tests(per_msg_df, metric, group_col="gender", group_a="female", group_b="male"):
+    from scipy import stats
+
+    a = per_msg_df.loc[per_msg_df[group_col] == group_a, metric].dropna().to_numpy()
+    b = per_msg_df.loc[per_msg_df[group_col] == group_b, metric].dropna().to_numpy()
+
+    result = {
+        "metric": metric,
+        "group_a": group_a,
+        "group_b": group_b,
+        "n_a": len(a),
+        "n_b": len(b),
+        "mean_a": np.mean(a) if len(a) else np.nan,
+        "mean_b": np.mean(b) if len(b) else np.nan,
+        "sd_a": np.std(a, ddof=1) if len(a) > 1 else np.nan,
+        "sd_b": np.std(b, ddof=1) if len(b) > 1 else np.nan,
+    }
+
+    # Welch's t-test
+    if len(a) > 1 and len(b) > 1:
+        t_stat, p_t = stats.ttest_ind(a, b, equal_var=False)
+    else:
+        t_stat, p_t = np.nan, np.nan
+
+    # Mann–Whitney U
+    if len(a) > 0 and len(b) > 0:
+        try:
+            u_stat, p_u = stats.mannwhitneyu(a, b, alternative="two-sided")
+        except ValueError:
+            u_stat, p_u = np.nan, np.nan
+    else:
+        u_stat, p_u = np.nan, np.nan
+
+    # Effect sizes
+    d = cohens_d(a, b) if len(a) > 1 and len(b) > 1 else np.nan
+    g = hedges_g(a, b) if len(a) > 1 and len(b) > 1 else np.nan
+    delta = cliffs_delta(a, b) if len(a) > 0 and len(b) > 0 else np.nan
+
+    result.update({
+        "t_stat_welch": t_stat,
+        "p_value_t": p_t,
+        "u_stat": u_stat,
+        "p_value_mw": p_u,
+        "cohens_d": d,
+        "hedges_g": g,
+        "cliffs_delta": delta
+    })
+    return result
+
+METRICS = ["token_count", "ttr", "pronoun_count", "emotion_count"]
+
+def run_all_tests(per_msg, metrics=METRICS):
+    return pd.DataFrame([run_tests(per_msg, m) for m in metrics])
+
+def main(data_dir=DATA_DIR, exclude_copies=False, dup_threshold=None):
+    messages, participants, pti = load_tables(data_dir)
+    user_msgs = merge_tables(messages, participants, pti)
+    if exclude_copies:
+        user_msgs = drop_copies(user_msgs, data_dir, dup_threshold)
+    per_msg = compute_features(user_msgs)
+    group_summary = summarize_groups(per_msg)
+    stats_df = run_all_tests(per_msg)
+
+    # ========= Save outputs (to project/search-metrics) =========
+    #OUTPUT_DIR.mkdir(parents=True, exist_ok=True)
+    #(per_msg).to_csv(OUTPUT_DIR / "lexical_per_message.csv", index=False)
+    #(group_summary).to_csv(OUTPUT_DIR / "lexical_group_summary.csv", index=False)
+
+    #with pd.ExcelWriter(OUTPUT_DIR / "lexical_stats_summary.xlsx", engine="openpyxl") as writer:
+    #    group_summary.to_excel(writer, sheet_name="Group Summary", index=False)
+    #    stats_df.to_excel(writer, sheet_name="Stat Tests", index=False)
+    #    per_msg.head(200).to_excel(writer, sheet_name="Sample Per-Message", index=False)
+
+    # ========= Print a compact console summary =========
+    print("\n=== Loaded from:", data_dir, "===")
+    print("\n=== Group Summary by Gender ===")
+    print(group_summary.to_string(index=False))
+    print("\n=== Statistical Tests (Female vs Male) ===")
+    print(stats_df.to_string(index=False))
+
+    return per_msg, group_summary, stats_df
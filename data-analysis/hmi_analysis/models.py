@@ -0,0 +1,199 @@
+"""Cross-validated gender classifier (Random Forest, optional PCA) on the conversation features.
+
+Replaces the notebook's single ``cross_val_score`` + refit with:
+
+* repeated stratified k-fold CV grouped by participant (no participant's
+  conversations on both sides of a split), seeded per repeat;
+* folds evaluated in a process pool (``n_jobs``); the feature matrix is sent
+  to each worker once, not per task;
+* every fitted fold cached on disk under a hash of the feature set, labels,
+  groups, parameters, repeat and fold indices, so re-runs and sweeps reuse them;
+* permutation importance computed on each fold's held-out part, inside the
+  same parallel fold tasks, with all shuffled copies predicted in one batch;
+* PCA fitted inside the training folds (``pca_components``), not on all data.
+
+    python -m hmi_analysis models --n-jobs 4
+    python -m hmi_analysis models --sweep --n-repeats 3
+"""
+import hashlib
+import itertools
+import json
+import os
+import pickle
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from .conversations import CACHE_DIR
+
+DEFAULT_PARAMS = {"n_estimators": 100, "max_depth": None, "min_samples_leaf": 1,
+                  "class_weight": None, "pca_components": 0}
+SWEEP_GRID = {"n_estimators": [100, 300], "max_depth": [None, 5], "min_samples_leaf": [1, 3],
+              "class_weight": [None, "balanced"]}
+
+_X = _y = None
+
+
+def feature_set_hash(X, y, groups, features):
+    digest = hashlib.sha256()
+    for array in (np.ascontiguousarray(X, dtype=float), np.asarray(y).astype(str), np.asarray(groups).astype(str)):
+        digest.update(array.tobytes())
+    digest.update(json.dumps(list(features)).encode())
+    return digest.hexdigest()
+
+
+def make_model(params, seed):
+    from sklearn.decomposition import PCA
+    from sklearn.ensemble import RandomForestClassifier
+    from sklearn.pipeline import make_pipeline
+    from sklearn.preprocessing import StandardScaler
+
+    forest = RandomForestClassifier(n_estimators=params["n_estimators"], max_depth=params["max_depth"],
+                                    min_samples_leaf=params["min_samples_leaf"],
+                                    class_weight=params["class_weight"], random_state=seed, n_jobs=1)
+    if params.get("pca_components"):
+        return make_pipeline(StandardScaler(), PCA(n_components=params["pca_components"], random_state=seed), forest)
+    return forest
+
+
+def cv_splits(y, groups, n_splits=5, n_repeats=5, seed=42):
+    """[(repeat, fold, train_idx, test_idx)] from StratifiedGroupKFold reshuffled per repeat"""
+    from sklearn.model_selection import StratifiedGroupKFold
+
+    splits = []
+    for repeat in range(n_repeats):
+        cv = StratifiedGroupKFold(n_splits=n_splits, shuffle=True, random_state=seed + repeat)
+        for fold, (train, test) in enumerate(cv.split(np.zeros(len(y)), y, groups)):
+            splits.append((repeat, fold, train, test))
+    return splits
+
+
+def permutation_importance(model, X, y, n_repeats=10, seed=0):
+    """Mean drop in balanced accuracy when each feature is shuffled.
+
+    Same estimate as ``sklearn.inspection.permutation_importance`` with
+    balanced-accuracy scoring, but all ``n_features x n_repeats`` shuffled
+    copies of ``X`` are stacked and predicted in one call: per-call forest
+    overhead dominates on folds of a few dozen rows.
+    """
+    rng = np.random.RandomState(seed)
+    n, n_features = X.shape
+    stacked = np.tile(X, (n_features * n_repeats + 1, 1))
+    for j in range(n_features):
+        for r in range(n_repeats):
+            block = (j * n_repeats + r) * n
+            stacked[block:block + n, j] = X[rng.permutation(n), j]
+    correct = (model.predict(stacked) == np.tile(y, n_features * n_repeats + 1)).reshape(-1, n)
+    # balanced accuracy of every copy at once: mean over classes of per-class recall
+    classes = np.unique(y)
+    recall = np.stack([correct[:, y == c].mean(axis=1) for c in classes]).mean(axis=0)
+    baseline, scores = recall[-1], recall[:-1].reshape(n_features, n_repeats)
+    return baseline - scores.mean(axis=1)
+
+
+def _init_worker(X, y):
+    global _X, _y
+    _X, _y = X, y
+
+
+def _fit_fold(task):
+    """Fit one fold (or load it from the cache); returns its scores and permutation importances"""
+    from sklearn.metrics import accuracy_score, balanced_accuracy_score, roc_auc_score
+
+    key, cache_path, params, seed, repeat, fold, train, test, n_permutations = task
+    if cache_path and os.path.exists(cache_path):
+        with open(cache_path, "rb") as f:
+            return pickle.load(f)
+
+    X_train, y_train, X_test, y_test = _X[train], _y[train], _X[test], _y[test]
+    model = make_model(params, seed + repeat).fit(X_train, y_train)
+    predicted = model.predict(X_test)
+    result = {"repeat": repeat, "fold": fold, "n_test": len(test),
+              "accuracy": accuracy_score(y_test, predicted),
+              "balanced_accuracy": balanced_accuracy_score(y_test, predicted)}
+    classes = list(model.classes_)
+    result["roc_auc"] = (roc_auc_score(y_test == classes[1], model.predict_proba(X_test)[:, 1])
+                         if len(set(y_test)) == 2 else np.nan)
+    result["importance"] = permutation_importance(model, X_test, y_test, n_permutations, seed + repeat)
+
+    if cache_path:
+        os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+        tmp = f"{cache_path}.{os.getpid()}.tmp"
+        with open(tmp, "wb") as f:
+            # scores first: cache hits unpickle only those, the fitted model stays on disk
+            pickle.dump(result, f)
+            pickle.dump({"key": key, "params": params, "train": train, "model": model}, f)
+        os.replace(tmp, cache_path)
+    return result
+
+
+def load_fold(cache_path):
+    """(scores, {"key", "params", "train", "model"}) of one cached fold"""
+    with open(cache_path, "rb") as f:
+        return pickle.load(f), pickle.load(f)
+
+
+def evaluate(X, y, groups, features, param_sets=(DEFAULT_PARAMS,), n_splits=5, n_repeats=5, seed=42,
+             n_jobs=1, n_permutations=10, cache_dir=CACHE_DIR):
+    """Repeated grouped stratified CV of every parameter set, all folds in one pool.
+
+    Returns ``(scores, importances)``: one row per parameter set and fold, and
+    mean permutation importance per parameter set and feature.
+    """
+    X, y, groups = np.asarray(X, dtype=float), np.asarray(y), np.asarray(groups)
+    data_key = feature_set_hash(X, y, groups, features)
+    splits = cv_splits(y, groups, n_splits, n_repeats, seed)
+    tasks, labels = [], []
+    for p, params in enumerate(param_sets):
+        params = {**DEFAULT_PARAMS, **params}
+        for repeat, fold, train, test in splits:
+            # repeat seeds the model and the permutations, and is stored in the result with fold
+            key = hashlib.sha256(json.dumps([data_key, params, seed, repeat, fold, n_permutations, test.tolist()],
+                                            sort_keys=True, default=str).encode()).hexdigest()
+            cache_path = str(Path(cache_dir) / "folds" / f"{key[:24]}.pkl") if cache_dir else None
+            tasks.append((key, cache_path, params, seed, repeat, fold, train, test, n_permutations))
+            labels.append(p)
+
+    workers = n_jobs if n_jobs > 0 else os.cpu_count() or 1
+    if workers == 1:
+        _init_worker(X, y)
+        results = [_fit_fold(task) for task in tasks]
+    else:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(X, y)) as pool:
+            results = list(pool.map(_fit_fold, tasks, chunksize=max(1, len(tasks) // (4 * workers))))
+
+    scores = pd.DataFrame([{**{k: v for k, v in r.items() if k != "importance"}, "param_set": p}
+                           for p, r in zip(labels, results)])
+    importance = np.zeros((len(param_sets), len(features)))
+    for p, r in zip(labels, results):
+        importance[p] += r["importance"] / len(splits)
+    importances = pd.DataFrame(importance, columns=list(features)).rename_axis("param_set")
+    return scores, importances
+
+
+def summarize(scores, param_sets):
+    """Mean and SD of each metric per parameter set, best balanced accuracy first"""
+    summary = scores.groupby("param_set")[["accuracy", "balanced_accuracy", "roc_auc"]].agg(["mean", "std"])
+    summary.columns = [f"{metric}_{stat}" for metric, stat in summary.columns]
+    params = pd.DataFrame([{**DEFAULT_PARAMS, **p} for p in param_sets], dtype=object).rename_axis("param_set")
+    return params.join(summary).sort_values("balanced_accuracy_mean", ascending=False)
+
+
+def pca_summary(X, features, n_components=10):
+    """Explained variance and loadings of a PCA on the standardised features (descriptive, all rows)"""
+    from sklearn.decomposition import PCA
+    from sklearn.preprocessing import StandardScaler
+
+    pca = PCA(n_components=min(n_components, len(features))).fit(StandardScaler().fit_transform(X))
+    names = [f"PC{i + 1}" for i in range(pca.n_components_)]
+    variance = pd.DataFrame({"explained": pca.explained_variance_ratio_,
+                             "cumulative": np.cumsum(pca.explained_variance_ratio_)}, index=names)
+    loadings = pd.DataFrame(pca.components_.T, index=list(features), columns=names)
+    return variance, loadings
+
+
+def sweep_grid(grid=SWEEP_GRID):
+    keys = list(grid)
+    return [dict(zip(keys, values)) for values in itertools.product(*(grid[k] for k in keys))]
@@ -0,0 +1,402 @@
+"""Incremental statistics for live study monitoring.
+
+Message rows are fed one at a time (from a Supabase ``created_at`` cursor or a
+tailed JSONL export) into an ``OnlineAggregator`` that keeps Welford running
+means/variances, ``sentiment_category`` count tables and P² streaming quantile
+sketches per group and metric. Each message costs O(#metrics) and a summary
+never touches past rows, so the cohort can be watched while the study runs.
+
+Usage:
+    python -m hmi_analysis.online --jsonl-dir supabase_dump_20250823_040945
+    python -m hmi_analysis.online --supabase --interval 30
+"""
+import argparse
+import json
+import math
+import os
+import re
+import time
+
+from .features import FeatureAccumulator, clean_text, load_nrc_lexicon
+from .sentiment import categorize_sentiment, vader_compound_scorer
+
+DEFAULT_METRICS = (
+    "word_count", "ttr", "sentence_count", "avg_sentence_length",
+    "first_person_pronouns", "second_person_pronouns", "third_person_pronouns",
+    "question_ratio", "exclamation_ratio",
+)
+DEFAULT_QUANTILES = (0.5, 0.9)
+SENTIMENT_CATEGORIES = ("Positive", "Neutral", "Negative")
+
+# Same exclusion as lexical_analysis.py: drop image links / URLs
+LINK_RE = re.compile(r"http|/static/")
+
+
+# ========= Streaming estimators =========
+class RunningStats:
+    """Welford running mean/variance"""
+
+    __slots__ = ("n", "mean", "m2")
+
+    def __init__(self):
+        self.n = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+
+    def add(self, x):
+        self.n += 1
+        delta = x - self.mean
+        self.mean += delta / self.n
+        self.m2 += delta * (x - self.mean)
+
+    def merge(self, n, mean, m2):
+        """Fold in the moments of another batch (Chan et al. parallel update)"""
+        if n == 0:
+            return
+        total = self.n + n
+        delta = mean - self.mean
+        self.mean += delta * n / total
+        self.m2 += m2 + delta * delta * self.n * n / total
+        self.n = total
+
+    @property
+    def variance(self):
+        return self.m2 / (self.n - 1) if self.n > 1 else math.nan
+
+    @property
+    def std(self):
+        return math.sqrt(self.variance) if self.n > 1 else math.nan
+
+
+class P2Quantile:
+    """P² streaming quantile estimate (Jain & Chlamtac) with five markers"""
+
+    __slots__ = ("p", "n", "heights", "positions", "desired", "increments")
+
+    def __init__(self, p):
+        self.p = p
+        self.n = 0
+        self.heights = []
+        self.positions = [1, 2, 3, 4, 5]
+        self.desired = [1, 1 + 2 * p, 1 + 4 * p, 3 + 2 * p, 5]
+        self.increments = [0, p / 2, p, (1 + p) / 2, 1]
+
+    def add(self, x):
+        q = self.heights
+        self.n += 1
+        if self.n <= 5:
+            q.append(x)
+            if self.n == 5:
+                q.sort()
+            return
+
+        if x < q[0]:
+            q[0] = x
+            k = 0
+        elif x >= q[4]:
+            q[4] = x
+            k = 3
+        else:
+            k = 0
+            while x >= q[k + 1]:
+                k += 1
+
+        pos = self.positions
+        for i in range(k + 1, 5):
+            pos[i] += 1
+        for i in range(5):
+            self.desired[i] += self.increments[i]
+
+        for i in (1, 2, 3):
+            d = self.desired[i] - pos[i]
+            if (d >= 1 and pos[i + 1] - pos[i] > 1) or (d <= -1 and pos[i - 1] - pos[i] < -1):
+                d = 1 if d > 0 else -1
+                candidate = self._parabolic(i, d)
+                if q[i - 1] < candidate < q[i + 1]:
+                    q[i] = candidate
+                else:
+                    q[i] = q[i] + d * (q[i + d] - q[i]) / (pos[i + d] - pos[i])
+                pos[i] += d
+
+    def _parabolic(self, i, d):
+        q, pos = self.heights, self.positions
+        return q[i] + d / (pos[i + 1] - pos[i - 1]) * (
+            (pos[i] - pos[i - 1] + d) * (q[i + 1] - q[i]) / (pos[i + 1] - pos[i])
+            + (pos[i + 1] - pos[i] - d) * (q[i] - q[i - 1]) / (pos[i] - pos[i - 1])
+        )
+
+    @property
+    def value(self):
+        if self.n == 0:
+            return math.nan
+        if self.n < 5:
+            ordered = sorted(self.heights)
+            return ordered[round(self.p * (len(ordered) - 1))]
+        return self.heights[2]
+
+
+class MetricSketch:
+    """Running stats plus quantile sketches for one metric in one group"""
+
+    __slots__ = ("stats", "quantiles")
+
+    def __init__(self, quantiles=DEFAULT_QUANTILES):
+        self.stats = RunningStats()
+        self.quantiles = {p: P2Quantile(p) for p in quantiles}
+
+    def add(self, x):
+        if x is None or x != x:
+            return
+        self.stats.add(x)
+        for sketch in self.quantiles.values():
+            sketch.add(x)
+
+    def summary(self):
+        out = {"n": self.stats.n, "mean": self.stats.mean if self.stats.n else math.nan,
+               "std": self.stats.std}
+        for p, sketch in self.quantiles.items():
+            out[f"p{round(p * 100)}"] = sketch.value
+        return out
+
+
+# ========= Aggregator =========
+class OnlineAggregator:
+    """Per-group running summaries of user messages.
+
+    Participants and interactions are registered as they arrive so every
+    message can be attributed to ``group_col`` (gender by default). Messages
+    whose interaction/participant is not known yet wait in a buffer of at most
+    ``max_pending`` rows; a message that would overflow it raises instead of
+    silently evicting an older one.
+    """
+
+    def __init__(self, metrics=DEFAULT_METRICS, quantiles=DEFAULT_QUANTILES,
+                 group_col="gender", scorer=None, max_pending=10000):
+        self.metrics = tuple(metrics)
+        self.quantiles = tuple(quantiles)
+        self.group_col = group_col
+        self.scorer = scorer
+        if scorer is not None:
+            self.metrics += ("vader_compound",)
+        self.nrc = load_nrc_lexicon()
+        self.participant_groups = {}
+        self.interaction_participants = {}
+        self.sketches = {}
+        self.sentiment_counts = {}
+        self.pending = []
+        self.max_pending = max_pending
+        self.messages_seen = 0
+
+    def add_participant(self, row):
+        group = row.get(self.group_col)
+        if isinstance(group, str):
+            group = group.strip().lower()
+        self.participant_groups[row["id"]] = group
+
+    def add_interaction(self, row):
+        self.interaction_participants[row["id"]] = row.get("participant_id")
+
+    def add_message(self, row):
+        """Feed one ``message`` row; returns False if it is buffered or skipped"""
+        if row.get("sender") != "user":
+            return False
+        content = row.get("content")
+        if not isinstance(content, str) or LINK_RE.search(content):
+            return False
+        participant_id = self.interaction_participants.get(row.get("interaction_id"))
+        if participant_id is None or participant_id not in self.participant_groups:
+            if len(self.pending) >= self.max_pending:
+                raise RuntimeError(
+                    f"{len(self.pending)} messages are waiting for an unknown interaction/participant "
+                    f"(message {row.get('id')}); check the interaction source or raise max_pending"
+                )
+            self.pending.append(row)
+            return False
+        group = self.participant_groups[participant_id]
+        if group is None:
+            return False
+        self._update(group, content)
+        return True
+
+    def flush_pending(self):
+        """Retry buffered messages after new participants/interactions arrived"""
+        waiting, self.pending = self.pending, []
+        resolved = 0
+        for row in waiting:
+            resolved += self.add_message(row)
+        return resolved
+
+    def _update(self, group, content):
+        cleaned = clean_text(content)
+        features = FeatureAccumulator(nrc_lexicon=self.nrc).feed(cleaned).to_dict()
+        if self.scorer is not None:
+            compound = self.scorer(cleaned)
+            features["vader_compound"] = compound
+            for key in (group, "all"):
+                counts = self.sentiment_counts.setdefault(key, dict.fromkeys(SENTIMENT_CATEGORIES, 0))
+                counts[categorize_sentiment(compound)] += 1
+
+        for key in (group, "all"):
+            sketches = self.sketches.get(key)
+            if sketches is None:
+                sketches = self.sketches[key] = {m: MetricSketch(self.quantiles) for m in self.metrics}
+            for metric, sketch in sketches.items():
+                sketch.add(features.get(metric))
+        self.messages_seen += 1
+
+    def summary(self):
+        """Current per-group summaries (independent of the number of messages seen)"""
+        return {
+            "messages": self.messages_seen,
+            "pending": len(self.pending),
+            "groups": {
+                group: {metric: sketch.summary() for metric, sketch in sketches.items()}
+                for group, sketches in self.sketches.items()
+            },
+            "sentiment_category": {group: dict(c) for group, c in self.sentiment_counts.items()},
+        }
+
+    def format_summary(self):
+        """Compact console table of the current summary"""
+        lines = [f"=== {self.messages_seen} user messages ({len(self.pending)} pending) ==="]
+        for group, sketches in sorted(self.sketches.items(), key=lambda kv: str(kv[0])):
+            lines.append(f"\n[{group}]")
+            for metric, sketch in sketches.items():
+                s = sketch.summary()
+                qs = " ".join(f"{k}={v:.3f}" for k, v in s.items() if k.startswith("p"))
+                lines.append(f"  {metric:<24} n={s['n']:<6} mean={s['mean']:.3f} sd={s['std']:.3f} {qs}")
+            if group in self.sentiment_counts:
+                lines.append(f"  sentiment_category       {self.sentiment_counts[group]}")
+        return "\n".join(lines)
+
+
+# ========= Sources =========
+class JsonlTail:
+    """Non-blocking reader that returns rows appended to a JSONL file since the last call"""
+
+    def __init__(self, path):
+        self.path = path
+        self.offset = 0
+        self.partial = b""
+
+    def read_new(self):
+        if not os.path.exists(self.path):
+            return []
+        if os.path.getsize(self.path) < self.offset:
+            # File was truncated/rotated: start over
+            self.offset, self.partial = 0, b""
+        with open(self.path, "rb") as f:
+            f.seek(self.offset)
+            chunk = f.read()
+            self.offset = f.tell()
+        lines = (self.partial + chunk).split(b"\n")
+        self.partial = lines.pop()
+        return [json.loads(line) for line in lines if line.strip()]
+
+
+class SupabasePoller:
+    """Fetch rows of one table after a ``(cursor_col, id)`` keyset cursor via PostgREST.
+
+    Pages are ordered by ``cursor_col, id`` and each request asks for rows
+    strictly after the last one returned, so any number of rows sharing a
+    timestamp are paged through without being lost or repeated. A starting
+    ``cursor`` (timestamp only) includes rows at that timestamp. Rows with a
+    null ``cursor_col`` are never returned.
+    """
+
+    def __init__(self, table, cursor_col="created_at", url=None, key=None,
+                 cursor=None, page_size=1000):
+        self.table = table
+        self.cursor_col = cursor_col
+        self.url = url or os.getenv("SUPABASE_URL")
+        key = key or os.getenv("SUPABASE_SERVICE_ROLE_KEY")
+        self.headers = {"apikey": key, "Authorization": f"Bearer {key}", "Accept": "application/json"}
+        self.cursor = cursor
+        self.last_id = None
+        self.page_size = page_size
+
+    def _params(self):
+        params = {"select": "*", "order": f"{self.cursor_col}.asc,id.asc", "limit": self.page_size}
+        col = self.cursor_col
+        if self.cursor is None:
+            params[col] = "not.is.null"
+        elif self.last_id is None:
+            params[col] = f"gte.{self.cursor}"
+        else:
+            # Timestamps contain ':' and '+', so they are quoted inside the or=() list
+            params["or"] = f'({col}.gt."{self.cursor}",and({col}.eq."{self.cursor}",id.gt.{self.last_id}))'
+        return params
+
+    def read_new(self):
+        import requests
+
+        rows = []
+        while True:
+            response = requests.get(f"{self.url}/rest/v1/{self.table}", headers=self.headers, params=self._params())
+            if response.status_code != 200:
+                raise Exception(f"Error fetching {self.table}: {response.status_code} {response.text}")
+            page = response.json()
+            if page:
+                self.cursor, self.last_id = page[-1][self.cursor_col], page[-1]["id"]
+            rows.extend(page)
+            if len(page) < self.page_size:
+                return rows
+
+
+def monitor(aggregator, participants, interactions, messages, interval=10.0, once=False):
+    """Poll the three sources and print the summary whenever new messages arrive"""
+    while True:
+        for row in participants.read_new():
+            aggregator.add_participant(row)
+        for row in interactions.read_new():
+            aggregator.add_interaction(row)
+        added = aggregator.flush_pending()
+        added += sum(aggregator.add_message(row) for row in messages.read_new())
+        if added or once:
+            print(aggregator.format_summary(), flush=True)
+        if once:
+            return aggregator
+        time.sleep(interval)
+
+
+def vader_or_none():
+    try:
+        return vader_compound_scorer()
+    except ImportError:
+        print("vaderSentiment not installed; sentiment_category counts disabled")
+        return None
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Live gender comparison over incoming messages")
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument("--jsonl-dir", help="Directory with message/participant/participant_task_interaction .jsonl")
+    source.add_argument("--supabase", action="store_true", help="Poll Supabase (SUPABASE_URL / SUPABASE_SERVICE_ROLE_KEY)")
+    parser.add_argument("--since", help="Only count messages created at/after this timestamp (Supabase)")
+    parser.add_argument("--interval", type=float, default=10.0, help="Seconds between polls")
+    parser.add_argument("--group-col", default="gender")
+    parser.add_argument("--no-sentiment", action="store_true", help="Skip VADER scoring")
+    parser.add_argument("--once", action="store_true", help="Read what is available, print, exit")
+    parser.add_argument("--max-pending", type=int, default=10000,
+                        help="Messages that may wait for their interaction/participant before erroring")
+    args = parser.parse_args(argv)
+
+    if args.jsonl_dir:
+        participants = JsonlTail(os.path.join(args.jsonl_dir, "participant.jsonl"))
+        interactions = JsonlTail(os.path.join(args.jsonl_dir, "participant_task_interaction.jsonl"))
+        messages = JsonlTail(os.path.join(args.jsonl_dir, "message.jsonl"))
+    else:
+        participants = SupabasePoller("participant")
+        interactions = SupabasePoller("participant_task_interaction", cursor_col="started_at")
+        messages = SupabasePoller("message", cursor=args.since)
+
+    scorer = None if args.no_sentiment else vader_or_none()
+    aggregator = OnlineAggregator(group_col=args.group_col, scorer=scorer, max_pending=args.max_pending)
+    try:
+        monitor(aggregator, participants, interactions, messages, interval=args.interval, once=args.once)
+    except KeyboardInterrupt:
+        print("\n" + aggregator.format_summary())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,186 @@
+"""Repeat registrations: canonical participant ids via blocking and fuzzy matching.
+
+The notebook merges participants only when the lower-cased, stripped email
+matches exactly, so "Jane Q. Doe / jdoe123@example.com" and
+"Jane Doe / jane.doe@example.org" (same age and nationality) stay
+two people. Here each registration emits a few blocking keys, and only
+registrations that share a key are compared:
+
+* the normalised email, and the email local part without dots, digits and
+  ``+tags``;
+* a Soundex code per name token, combined with the age;
+* character 4-grams of the compact name, combined with the nationality.
+
+Oversized blocks (common names) are skipped, so the number of candidate pairs
+stays close to linear in the number of registrations. Candidates are scored in
+one vectorised pass: cosine similarity of character-trigram vectors of the
+names and email local parts, name-token containment, plus equal age /
+nationality / gender.
+
+Matches are merged with union-find. Each cluster maps to its earliest
+registration (``created_at``, then ``id``), as in the notebook, so the
+mapping is stable when later registrations are added.
+
+    python -m hmi_analysis participants --output data/participant_map.csv
+"""
+import re
+import unicodedata
+from itertools import combinations
+
+import numpy as np
+import pandas as pd
+from scipy import sparse
+
+NAME_THRESHOLD = 0.75
+EMAIL_THRESHOLD = 0.85
+MAX_BLOCK = 50
+
+SOUNDEX_CODES = {c: str(d) for d, letters in enumerate(("aeiouyhw", "bfpv", "cgjkqsxz", "dt", "l", "mn", "r"))
+                 for c in letters}
+
+
+def normalize_name(name):
+    """ASCII, lower-case, letters and single spaces only"""
+    name = unicodedata.normalize("NFKD", name if isinstance(name, str) else "").encode("ascii", "ignore").decode()
+    return " ".join(re.findall(r"[a-z]+", name.lower()))
+
+
+def normalize_email(email):
+    """(email, local-part key): lower-cased email, local part without dots, digits and +tags"""
+    email = email.strip().lower() if isinstance(email, str) else ""
+    local = email.split("@", 1)[0].split("+", 1)[0]
+    return email, re.sub(r"[^a-z]", "", local)
+
+
+def soundex(word):
+    if not word:
+        return ""
+    codes = [SOUNDEX_CODES.get(c, "") for c in word]
+    out, last = [], codes[0]
+    for c, code in zip(word[1:], codes[1:]):
+        if code and code != "0" and code != last:
+            out.append(code)
+        # h and w do not separate letters with the same code; vowels do
+        if c not in "hw":
+            last = code
+    return (word[0] + "".join(out) + "000")[:4]
+
+
+def blocking_keys(name, local, email, age, nationality):
+    keys = {("email", email)} if email else set()
+    if len(local) >= 4:
+        keys.add(("local", local))
+    for token in name.split():
+        if len(token) >= 2:
+            keys.add(("soundex", soundex(token), age))
+    compact = name.replace(" ", "")
+    keys.update(("ngram", compact[i:i + 4], nationality) for i in range(len(compact) - 3))
+    return keys
+
+
+def candidate_pairs(keys_per_row, max_block=MAX_BLOCK):
+    """(i, j) index arrays, i < j, of rows sharing a key in a block of at most ``max_block`` rows"""
+    blocks = {}
+    for row, keys in enumerate(keys_per_row):
+        for key in keys:
+            blocks.setdefault(key, []).append(row)
+    pairs = set()
+    for rows in blocks.values():
+        if 1 < len(rows) <= max_block:
+            pairs.update(combinations(rows, 2))
+    pairs = np.array(sorted(pairs), dtype=np.int64).reshape(-1, 2)
+    return pairs[:, 0], pairs[:, 1]
+
+
+def set_vectors(sets):
+    """Binary CSR matrix, one row per set of strings"""
+    vocabulary, indptr, indices = {}, [0], []
+    for items in sets:
+        indices.extend(vocabulary.setdefault(item, len(vocabulary)) for item in items)
+        indptr.append(len(indices))
+    return sparse.csr_matrix((np.ones(len(indices)), indices, indptr), shape=(len(indptr) - 1, max(len(vocabulary), 1)))
+
+
+def trigram_vectors(strings):
+    """L2-normalised binary matrix of padded character trigrams"""
+    matrix = set_vectors({f"  {s} "[k:k + 3] for k in range(len(s) + 1)} if s else () for s in strings)
+    norms = np.sqrt(np.asarray(matrix.sum(axis=1)).ravel())
+    norms[norms == 0] = 1
+    return sparse.diags(1 / norms) @ matrix
+
+
+def pair_dot(vectors, i, j):
+    return np.asarray(vectors[i].multiply(vectors[j]).sum(axis=1)).ravel()
+
+
+def score_pairs(table, i, j):
+    """Similarity features and match decision for candidate pairs ``(i, j)`` of a normalised table"""
+    name_sim = pair_dot(trigram_vectors(table["name_norm"]), i, j)
+    email_sim = pair_dot(trigram_vectors(table["local"]), i, j)
+    # Share of the shorter name's tokens found in the other name ("Jane Doe" in "Jane Q. Doe")
+    tokens = set_vectors(set(name.split()) for name in table["name_norm"])
+    n_tokens = np.asarray(tokens.sum(axis=1)).ravel()
+    shorter = np.minimum(n_tokens[i], n_tokens[j])
+    containment = np.where(shorter > 0, pair_dot(tokens, i, j) / np.maximum(shorter, 1), 0.0)
+    same = {col: (table[col].to_numpy()[i] == table[col].to_numpy()[j]) & table[col].notna().to_numpy()[i]
+            for col in ("email_norm", "age", "nationality", "gender")}
+    same["email_norm"] &= table["email_norm"].to_numpy()[i] != ""
+    fuzzy = same["age"] & same["gender"]
+    by_name = fuzzy & same["nationality"] & ((name_sim >= NAME_THRESHOLD) | ((containment == 1) & (shorter >= 2)))
+    by_email = fuzzy & (email_sim >= EMAIL_THRESHOLD)
+    return pd.DataFrame({
+        "i": i, "j": j, "name_sim": name_sim, "name_containment": containment, "email_sim": email_sim,
+        **{f"same_{col.replace('_norm', '')}": v for col, v in same.items()},
+        "match": same["email_norm"] | by_name | by_email,
+        "reason": np.select([same["email_norm"], by_name, by_email], ["email", "name", "email_local"], ""),
+    })
+
+
+def _find(parent, x):
+    while parent[x] != x:
+        parent[x] = parent[parent[x]]
+        x = parent[x]
+    return x
+
+
+def canonical_ids(participants, max_block=MAX_BLOCK):
+    """Map every participant id to the earliest registration of the same person.
+
+    Returns ``(mapping, pairs)``: one row per participant (``participant_id``,
+    ``canonical_id``, ``cluster_size``) and the scored candidate pairs.
+    """
+    table = participants.sort_values(["created_at", "id"], kind="stable").reset_index(drop=True)
+    table["name_norm"] = table["name"].map(normalize_name)
+    emails = table["email"].map(normalize_email)
+    table["email_norm"] = emails.str[0]
+    table["local"] = emails.str[1]
+    table["age"] = pd.to_numeric(table["age"], errors="coerce")
+    table["nationality"] = table["nationality"].str.strip().str.lower()
+    table["gender"] = table["gender"].str.strip().str.lower()
+
+    keys = [blocking_keys(*row) for row in
+            zip(table["name_norm"], table["local"], table["email_norm"], table["age"], table["nationality"])]
+    i, j = candidate_pairs(keys, max_block)
+    pairs = score_pairs(table, i, j)
+
+    # Union-find; rows are in registration order, so the smaller root is the earliest registration
+    parent = list(range(len(table)))
+    for a, b in zip(pairs.loc[pairs["match"], "i"], pairs.loc[pairs["match"], "j"]):
+        ra, rb = _find(parent, a), _find(parent, b)
+        if ra != rb:
+            parent[max(ra, rb)] = min(ra, rb)
+    roots = np.array([_find(parent, x) for x in range(len(table))])
+    ids = table["id"].to_numpy()
+    mapping = pd.DataFrame({"participant_id": ids, "canonical_id": ids[roots]})
+    mapping["cluster_size"] = mapping.groupby("canonical_id")["participant_id"].transform("size")
+    pairs.insert(0, "id_a", ids[pairs["i"]])
+    pairs.insert(1, "id_b", ids[pairs["j"]])
+    return mapping.sort_values("participant_id", ignore_index=True), pairs.drop(columns=["i", "j"])
+
+
+def participant_map(data_dir):
+    """{participant_id: canonical_id} for the ``participant.csv`` in ``data_dir``"""
+    from .lexical import read_csv_safe
+
+    mapping, _ = canonical_ids(read_csv_safe(f"{data_dir}/participant.csv"))
+    return dict(zip(mapping["participant_id"], mapping["canonical_id"]))
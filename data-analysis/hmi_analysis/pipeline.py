@@ -0,0 +1,199 @@
+"""Small memoised DAG runner for analysis stages.
+
+Each stage is a function with named inputs (other stages) and parameters:
+
+    pipe = Pipeline()
+    pipe.add("messages", load_jsonl, params={"path": Path("dump/message.jsonl")})
+    pipe.add("scored", score, inputs=["messages"])
+    pipe.add("tests", run_tests, inputs=["scored"], params={"alpha": 0.05})
+    results = pipe.run(["tests"])
+
+A stage's key is the hash of its name, ``version``, function source,
+parameters (``Path`` parameters by file content) and the content digests of
+its inputs' outputs. Outputs are pickled once under their own SHA-256
+(``objects/``), and ``keys/`` maps stage keys to output digests. A stage
+whose key is already known does not run, and its output is only unpickled if
+a stage that does run needs it. A stage that re-runs but produces the same
+output leaves everything downstream cached. So changing a test's parameters
+re-runs only that test and the report, not the sentiment scoring.
+
+Stages whose inputs are ready run concurrently in a thread pool (``jobs``).
+The function source covers the stage function itself only; bump ``version``
+when a helper it calls changes.
+"""
+import hashlib
+import inspect
+import os
+import pickle
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from pathlib import Path
+
+from .conversations import CACHE_DIR
+
+
+def file_digest(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _source(func):
+    try:
+        return inspect.getsource(func)
+    except (OSError, TypeError):
+        code = getattr(func, "__code__", None)
+        return code.co_code.hex() if code is not None else repr(func)
+
+
+def _param_token(value):
+    if isinstance(value, Path):
+        return f"file:{file_digest(value)}" if value.exists() else f"missing:{value}"
+    return repr(value)
+
+
+class Stage:
+    def __init__(self, name, func, inputs=(), params=None, version="1", cache=True):
+        self.name = name
+        self.func = func
+        self.inputs = list(inputs)
+        self.params = dict(params or {})
+        self.version = str(version)
+        # Stages with side effects only (writing files) run every time
+        self.cache = cache
+
+    def key(self, input_digests):
+        digest = hashlib.sha256()
+        for part in (self.name, self.version, _source(self.func),
+                     *(f"{k}={_param_token(v)}" for k, v in sorted(self.params.items())),
+                     *(f"{name}@{input_digests[name]}" for name in self.inputs)):
+            digest.update(part.encode())
+            digest.update(b"\0")
+        return digest.hexdigest()
+
+
+class Pipeline:
+    def __init__(self, cache_dir=Path(CACHE_DIR) / "pipeline", jobs=1, log=print):
+        self.cache_dir = Path(cache_dir)
+        self.jobs = jobs
+        self.log = log
+        self.stages = {}
+
+    def add(self, name, func, inputs=(), params=None, version="1", cache=True):
+        for dependency in inputs:
+            if dependency not in self.stages:
+                raise ValueError(f"Stage {name!r} depends on unknown stage {dependency!r}")
+        self.stages[name] = Stage(name, func, inputs, params, version, cache)
+        return self.stages[name]
+
+    def stage(self, name=None, inputs=(), params=None, version="1", cache=True):
+        """Decorator form of ``add``"""
+        def register(func):
+            self.add(name or func.__name__, func, inputs, params, version, cache)
+            return func
+        return register
+
+    # --- content-addressed store ---
+
+    def _object_path(self, digest):
+        return self.cache_dir / "objects" / digest[:2] / f"{digest}.pkl"
+
+    def _key_path(self, key):
+        return self.cache_dir / "keys" / key
+
+    def _lookup(self, key):
+        path = self._key_path(key)
+        if path.exists():
+            digest = path.read_text().strip()
+            if self._object_path(digest).exists():
+                return digest
+        return None
+
+    @staticmethod
+    def _write(path, content):
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+        tmp.write_bytes(content)
+        os.replace(tmp, path)
+
+    def _store(self, key, value):
+        data = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+        digest = hashlib.sha256(data).hexdigest()
+        if not self._object_path(digest).exists():
+            self._write(self._object_path(digest), data)
+        self._write(self._key_path(key), digest.encode())
+        return digest
+
+    def _load(self, digest):
+        with open(self._object_path(digest), "rb") as f:
+            return pickle.load(f)
+
+    # --- execution ---
+
+    def _closure(self, targets):
+        needed, todo = set(), list(targets)
+        while todo:
+            name = todo.pop()
+            if name not in needed:
+                needed.add(name)
+                todo.extend(self.stages[name].inputs)
+        return needed
+
+    def run(self, targets=None, force=()):
+        """Run (or reuse) ``targets`` and everything they depend on; returns {stage: output}.
+
+        ``force`` names stages to re-execute even if cached.
+        """
+        targets = list(targets or self.stages)
+        needed = self._closure(targets)
+        digests, values, status = {}, {}, {}
+
+        def value(name):
+            if name not in values:
+                values[name] = self._load(digests[name])
+            return values[name]
+
+        def execute(stage):
+            start = time.perf_counter()
+            result = stage.func(*(value(name) for name in stage.inputs), **stage.params)
+            return result, time.perf_counter() - start
+
+        pending, running = set(needed), {}
+        with ThreadPoolExecutor(max_workers=max(1, self.jobs)) as pool:
+            while pending or running:
+                ready = [name for name in sorted(pending) if all(d in digests for d in self.stages[name].inputs)]
+                for name in ready:
+                    pending.discard(name)
+                    stage = self.stages[name]
+                    key = stage.key(digests)
+                    cached = self._lookup(key) if stage.cache and name not in force else None
+                    if cached is not None:
+                        digests[name] = cached
+                        status[name] = "cached"
+                        continue
+                    # Inputs are unpickled here, in the scheduler thread, before the stage starts
+                    for dependency in stage.inputs:
+                        value(dependency)
+                    running[pool.submit(execute, stage)] = (name, key)
+                if ready and not running:
+                    continue
+                if not running:
+                    raise RuntimeError(f"Unsatisfiable stages: {sorted(pending)}")
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    name, key = running.pop(future)
+                    result, elapsed = future.result()
+                    values[name] = result
+                    digests[name] = self._store(key, result) if self.stages[name].cache else key
+                    status[name] = f"ran {elapsed:.2f}s"
+                    if self.log:
+                        self.log(f"  {name}: {status[name]}")
+
+        self.status = status
+        if self.log:
+            cached = sorted(n for n, s in status.items() if s == "cached")
+            if cached:
+                self.log(f"  cached: {', '.join(cached)}")
+        return {name: value(name) for name in targets}
@@ -0,0 +1,226 @@
+"""Cached, parallel report rendering for the sentiment analysis.
+
+Plotting is split into two stages:
+
+1. ``compute_plot_aggregates(df)`` reduces the per-message results to the small
+   tables each panel needs (crosstabs, group means, box-plot stats, histograms).
+2. ``render_panels(aggregates, output_dir)`` draws every panel as its own
+   figure in worker processes. Panels whose aggregates (and render settings)
+   hash the same as in the last run are skipped.
+
+Figures are drawn on their own Agg canvases under a temporary style context,
+so neither stage switches the pyplot backend or changes rcParams of the
+calling process.
+
+Output formats are any matplotlib supports (``png``, ``svg``, ``pdf``); a
+low-dpi ``preview`` PNG can be written alongside.
+"""
+import hashlib
+import json
+import os
+import pickle
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+CACHE_FILE = '.plot_cache.json'
+STYLE = 'seaborn-v0_8'
+
+EMOTION_COLS = ['positive_words', 'negative_words', 'uncertainty_words', 'tentative_words']
+PRONOUN_COLS = ['first_person_pronouns', 'second_person_pronouns', 'third_person_pronouns']
+CORRELATION_COLS = ['textblob_polarity', 'textblob_subjectivity', 'vader_compound',
+                    'vader_positive', 'vader_negative', 'word_count']
+
+
+# ========= Stage 1: aggregates =========
+def _box_stats(df, column, group_col='gender'):
+    from matplotlib import cbook
+
+    stats = []
+    for group, values in df.groupby(group_col)[column]:
+        values = values.dropna().to_numpy()
+        if len(values):
+            stats.extend(cbook.boxplot_stats(values, labels=[group]))
+    return stats
+
+
+def _histograms(df, column, group_col='gender', bins=20):
+    values = df[column].dropna()
+    if values.empty:
+        return {}
+    edges = np.histogram_bin_edges(values, bins=bins)
+    if group_col not in df.columns:
+        return {None: (np.histogram(values, bins=edges)[0], edges)}
+    return {
+        group: (np.histogram(subset.dropna(), bins=edges)[0], edges)
+        for group, subset in df.groupby(group_col)[column]
+    }
+
+
+def compute_plot_aggregates(df):
+    """Reduce per-message results to the small tables each panel draws"""
+    has_gender = 'gender' in df.columns
+    aggregates = {'sentiment_pie': df['sentiment_category'].value_counts()}
+    if has_gender:
+        aggregates['sentiment_by_gender'] = pd.crosstab(df['gender'], df['sentiment_category'])
+        aggregates['vader_by_gender'] = _box_stats(df, 'vader_compound')
+        aggregates['polarity_by_gender'] = _box_stats(df, 'textblob_polarity')
+    aggregates['word_count_hist'] = _histograms(df, 'word_count', 'gender' if has_gender else None)
+    if has_gender:
+        aggregates['emotion_words'] = df.groupby('gender')[EMOTION_COLS].mean()
+        aggregates['pronouns'] = df.groupby('gender')[PRONOUN_COLS].mean()
+        aggregates['sentence_length'] = _box_stats(df, 'avg_sentence_length')
+        aggregates['punctuation'] = df.groupby('gender')[['question_ratio', 'exclamation_ratio']].mean()
+        aggregates['subjectivity_by_gender'] = _box_stats(df, 'textblob_subjectivity')
+    aggregates['correlation'] = df[CORRELATION_COLS].corr()
+    if 'created_at' in df.columns:
+        created = pd.to_datetime(df['created_at'], errors='coerce', utc=True)
+        aggregates['daily_sentiment'] = df['vader_compound'].groupby(created.dt.date).mean()
+    return aggregates
+
+
+# ========= Stage 2: panel renderers (ax, data) =========
+def _pie(ax, data):
+    ax.pie(data.values, labels=data.index, autopct='%1.1f%%')
+
+
+def _bars(ax, data, legend_title=None, outside_legend=False, ylabel=None):
+    data.plot(kind='bar', ax=ax)
+    ax.tick_params(axis='x', labelrotation=0)
+    if outside_legend:
+        ax.legend(bbox_to_anchor=(1.05, 1), loc='upper left')
+    elif legend_title:
+        ax.legend(title=legend_title)
+    if ylabel:
+        ax.set_ylabel(ylabel)
+
+
+def _box(ax, data):
+    if data:
+        ax.bxp(data)
+
+
+def _hist(ax, data):
+    for group, (counts, edges) in data.items():
+        ax.stairs(counts, edges, fill=True, alpha=0.7, label=group)
+    ax.set_xlabel('Word Count')
+    ax.set_ylabel('Frequency')
+    if any(group is not None for group in data):
+        ax.legend()
+
+
+def _heatmap(ax, data):
+    import seaborn as sns
+
+    sns.heatmap(data, annot=True, cmap='coolwarm', center=0, ax=ax)
+
+
+def _timeline(ax, data):
+    data.plot(ax=ax)
+    ax.tick_params(axis='x', labelrotation=45)
+
+
+PANELS = {
+    'sentiment_pie': ('Overall Sentiment Distribution', _pie),
+    'sentiment_by_gender': ('Sentiment Distribution by Gender', lambda ax, d: _bars(ax, d, legend_title='Sentiment')),
+    'vader_by_gender': ('VADER Compound Scores by Gender', _box),
+    'polarity_by_gender': ('TextBlob Polarity by Gender', _box),
+    'word_count_hist': ('Word Count Distribution by Gender', _hist),
+    'emotion_words': ('Average Emotion Words Usage by Gender', lambda ax, d: _bars(ax, d, outside_legend=True)),
+    'pronouns': ('Average Pronoun Usage by Gender', lambda ax, d: _bars(ax, d, outside_legend=True)),
+    'sentence_length': ('Average Sentence Length by Gender', _box),
+    'punctuation': ('Question and Exclamation Usage by Gender', lambda ax, d: _bars(ax, d, ylabel='Ratio per word')),
+    'subjectivity_by_gender': ('TextBlob Subjectivity by Gender', _box),
+    'correlation': ('Sentiment Metrics Correlation', _heatmap),
+    'daily_sentiment': ('Average Daily Sentiment', _timeline),
+}
+
+
+def _agg_figure(figsize):
+    """A figure on its own Agg canvas, outside pyplot's figure manager"""
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    from matplotlib.figure import Figure
+
+    fig = Figure(figsize=figsize)
+    FigureCanvasAgg(fig)
+    return fig
+
+
+def _draw(ax, name, data):
+    title, renderer = PANELS[name]
+    renderer(ax, data)
+    ax.set_title(title)
+
+
+def _render_panel(name, data, paths, figsize, dpi, preview_dpi):
+    """Worker: draw one panel into its own figure and save every requested format"""
+    from matplotlib import style
+
+    with style.context(STYLE):
+        fig = _agg_figure(figsize)
+        _draw(fig.add_subplot(), name, data)
+        fig.tight_layout()
+        for path in paths:
+            is_preview = path.endswith('.preview.png')
+            fig.savefig(path, dpi=preview_dpi if is_preview else dpi, bbox_inches='tight')
+    return name
+
+
+def _digest(data, settings):
+    return hashlib.sha256(pickle.dumps((data, settings), protocol=4)).hexdigest()
+
+
+def render_panels(aggregates, output_dir, formats=('png',), dpi=300, preview=False, preview_dpi=60,
+                  figsize=(7, 6), jobs=None, force=False):
+    """Render every panel in parallel, skipping panels whose inputs are unchanged.
+
+    Returns ``{panel: [paths]}`` for all panels and the list of panels that were
+    actually re-rendered.
+    """
+    output_dir = Path(output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    cache_path = output_dir / CACHE_FILE
+    try:
+        cache = json.loads(cache_path.read_text())
+    except (OSError, ValueError):
+        cache = {}
+
+    settings = (tuple(formats), dpi, preview, preview_dpi, tuple(figsize), STYLE)
+    outputs, todo = {}, []
+    for name, data in aggregates.items():
+        if name not in PANELS:
+            continue
+        paths = [str(output_dir / f'{name}.{fmt}') for fmt in formats]
+        if preview:
+            paths.append(str(output_dir / f'{name}.preview.png'))
+        outputs[name] = paths
+        digest = _digest(data, settings)
+        if force or cache.get(name) != digest or not all(os.path.exists(p) for p in paths):
+            todo.append((name, data, paths, digest))
+
+    if todo:
+        with ProcessPoolExecutor(max_workers=jobs) as pool:
+            futures = [pool.submit(_render_panel, name, data, paths, figsize, dpi, preview_dpi)
+                       for name, data, paths, _ in todo]
+            for future in futures:
+                future.result()
+        cache.update({name: digest for name, _, _, digest in todo})
+        cache_path.write_text(json.dumps(cache, indent=2))
+
+    return outputs, [name for name, _, _, _ in todo]
+
+
+def render_composite(aggregates, path, dpi=300):
+    """Draw all panels into the original 4x3 overview figure"""
+    from matplotlib import style
+
+    with style.context(STYLE):
+        fig = _agg_figure((20, 24))
+        for i, name in enumerate(PANELS, start=1):
+            if name in aggregates:
+                _draw(fig.add_subplot(4, 3, i), name, aggregates[name])
+        fig.tight_layout()
+        fig.savefig(path, dpi=dpi, bbox_inches='tight')
+    return path
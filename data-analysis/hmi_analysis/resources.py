@@ -0,0 +1,55 @@
+"""Offline resolution of NLTK corpora from a local ``data-analysis/nltk_data`` cache.
+
+The cache is not committed to the repository; fetch it once before the first
+run with ``python -m hmi_analysis fetch-nltk``. Nothing is downloaded
+implicitly: a missing resource raises a ``LookupError`` that names that command.
+"""
+import os
+from pathlib import Path
+
+NLTK_DATA_DIR = Path(os.environ.get('HMI_NLTK_DATA', Path(__file__).resolve().parent.parent / 'nltk_data'))
+RESOURCES = {
+    'stopwords': 'corpora/stopwords',
+    'punkt': 'tokenizers/punkt',
+    'punkt_tab': 'tokenizers/punkt_tab',
+}
+
+
+def nltk_data():
+    """``nltk.data`` with the local cache searched first"""
+    import nltk
+
+    cache = str(NLTK_DATA_DIR)
+    if cache not in nltk.data.path:
+        nltk.data.path.insert(0, cache)
+    return nltk.data
+
+
+def find(name):
+    """Path of a cached NLTK resource (never downloads)"""
+    data = nltk_data()
+    try:
+        return data.find(RESOURCES.get(name, name))
+    except LookupError:
+        raise LookupError(
+            f"NLTK resource '{name}' is not in the local cache, which is not shipped with the repository. "
+            f"Fetch it first with:\n"
+            f"    python -m hmi_analysis fetch-nltk {name}\n"
+            f"(cache: {NLTK_DATA_DIR}; override with HMI_NLTK_DATA)"
+        ) from None
+
+
+def stopwords(language='english'):
+    """Stopword list for ``language`` from the local cache"""
+    find('stopwords')
+    from nltk.corpus import stopwords as corpus
+
+    return corpus.words(language)
+
+
+def fetch(names=tuple(RESOURCES)):
+    """Download resources into the local cache (the only networked step)"""
+    import nltk
+
+    NLTK_DATA_DIR.mkdir(parents=True, exist_ok=True)
+    return {name: nltk.download(name, download_dir=str(NLTK_DATA_DIR), quiet=True) for name in names}
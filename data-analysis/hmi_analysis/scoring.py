@@ -0,0 +1,203 @@
+"""Batched VADER / TextBlob scoring with a per-sentence memo.
+
+Each sentence is run through VADER and TextBlob once, and its parts are kept:
+
+* VADER's word valences before the contrastive "but" rule, and the position
+  of its first "but";
+* its ``!`` / ``?`` counts;
+* TextBlob's polarity and subjectivity sums and number of assessments.
+
+A message's parts are its sentences' parts concatenated. A conversation's
+parts are its messages' parts concatenated, so conversations reuse
+message-level work instead of re-scoring the joined text. Per text, VADER's
+own ``_but_check`` runs on the concatenated valences. The final scores come
+from one vectorised pass: VADER's punctuation amplifier, normalisation and
+rounding, and TextBlob's averages.
+
+Sentence parts sit in a bounded LRU keyed by the whitespace-normalised
+sentence, shared by everything using ``shared_scorer()``. Scores equal
+whole-text scoring except where VADER's three-word look-back, its ALL-CAPS
+check, or a TextBlob negation/modifier reaches across a sentence boundary
+(about 0.6% of compound and 0.2% of TextBlob scores on the study prompts).
+That is why the analyses only use it on request (``--sentence-memo``); the
+default remains exact per-message scoring.
+
+The scorer depends on VADER internals (``polarity_scores`` ending in
+``_but_check`` and ``score_valence``). On first use it checks itself against
+``polarity_scores`` and TextBlob on ``PROBES`` and raises ``RuntimeError`` if
+an installed version behaves differently.
+
+    scorer = shared_scorer()
+    parts = scorer.parts(messages)
+    scores = scorer.finalize(scorer.rows(parts))        # {"compound": array, ...}
+    by_conversation = scorer.score_groups(parts, codes)
+"""
+import re
+from collections import OrderedDict
+
+import numpy as np
+
+# Every character lands in exactly one segment, so ! and ? counts add up
+SEGMENT_RE = re.compile(r"[^.!?]*[.!?]+|[^.!?]+$")
+
+COMPONENTS = ("vader_sum", "vader_pos", "vader_neg", "vader_neu", "vader_n", "exclamations", "questions",
+              "textblob_polarity", "textblob_subjectivity", "textblob_n")
+EMPTY = (np.zeros(0), -1, 0, 0, 0.0, 0.0, 0)
+# Single sentences that exercise the "but" rule, negation, boosters, caps and punctuation
+PROBES = ("The room is nice but the bed is awful!", "I do not like it at all??", "This is VERY good, really great.",
+          "Not bad, but not great either...", "kind of sad :(", "")
+
+
+def concat(parts):
+    """Parts of several texts (in order) as the parts of their concatenation"""
+    parts = list(parts)
+    if not parts:
+        return EMPTY
+    offsets = np.cumsum([0] + [len(p[0]) for p in parts[:-1]])
+    but_at = next((offset + p[1] for offset, p in zip(offsets, parts) if p[1] >= 0), -1)
+    return (np.concatenate([p[0] for p in parts]), int(but_at), *(sum(p[k] for p in parts) for k in range(2, 7)))
+
+
+class SentenceScorer:
+    def __init__(self, maxsize=100_000):
+        self.maxsize = maxsize
+        self._memo = OrderedDict()
+        self._vader = None
+        self._textblob = None
+        self._but_check = None
+        self.hits = self.misses = 0
+
+    def _analyzers(self):
+        if self._vader is None:
+            from textblob.en import sentiment as pattern_sentiment
+            from vaderSentiment.vaderSentiment import SentimentIntensityAnalyzer
+
+            class ValenceCapture(SentimentIntensityAnalyzer):
+                # polarity_scores() ends with _but_check() and score_valence(): keep the raw valences
+                @staticmethod
+                def _but_check(words_and_emoticons, sentiments):
+                    return sentiments
+
+                def score_valence(self, sentiments, text):
+                    return sentiments, text
+
+            self._vader = ValenceCapture()
+            self._textblob = pattern_sentiment
+            self._but_check = SentimentIntensityAnalyzer._but_check
+            try:
+                self._check_versions()
+            except Exception:
+                self._vader = None
+                raise
+        return self._vader, self._textblob
+
+    def _check_versions(self):
+        """Raise if the installed VADER / TextBlob no longer match what the capture relies on"""
+        from textblob import TextBlob
+        from vaderSentiment.vaderSentiment import SentimentIntensityAnalyzer
+
+        reference = SentimentIntensityAnalyzer()
+        try:
+            scores = self.finalize(self.rows([self._score_sentence(p) if p else EMPTY for p in PROBES]))
+        except (TypeError, ValueError) as e:
+            raise RuntimeError(f"vaderSentiment internals changed; SentenceScorer cannot be used: {e}") from e
+        for i, probe in enumerate(PROBES):
+            expected = (reference.polarity_scores(probe) if probe
+                        else {"compound": 0.0, "pos": 0.0, "neu": 0.0, "neg": 0.0})
+            blob = TextBlob(probe).sentiment
+            got = (scores["compound"][i], scores["positive"][i], scores["neutral"][i], scores["negative"][i],
+                   scores["polarity"][i], scores["subjectivity"][i])
+            if not np.allclose(got, (expected["compound"], expected["pos"], expected["neu"], expected["neg"],
+                                     blob.polarity, blob.subjectivity)):
+                raise RuntimeError(f"SentenceScorer disagrees with VADER/TextBlob on {probe!r}; "
+                                   f"the installed versions are not supported")
+
+    def _score_sentence(self, sentence):
+        from vaderSentiment.vaderSentiment import SentiText
+
+        vader, textblob = self._analyzers()
+        sentiments, text = vader.polarity_scores(sentence)
+        words = [w.lower() for w in SentiText(text).words_and_emoticons]
+        assessments = textblob(sentence).assessments
+        return (np.asarray(sentiments, dtype=float), words.index("but") if "but" in words else -1,
+                text.count("!"), text.count("?"),
+                sum(a[1] for a in assessments), sum(a[2] for a in assessments), len(assessments))
+
+    def sentence(self, sentence):
+        """Parts of one sentence, through the LRU"""
+        key = " ".join(sentence.split())
+        parts = self._memo.get(key)
+        if parts is not None:
+            self.hits += 1
+            self._memo.move_to_end(key)
+            return parts
+        self.misses += 1
+        parts = self._memo[key] = self._score_sentence(key) if key else EMPTY
+        if len(self._memo) > self.maxsize:
+            self._memo.popitem(last=False)
+        return parts
+
+    def parts(self, texts):
+        """Parts per text (non-strings score as empty)"""
+        return [concat(self.sentence(s) for s in SEGMENT_RE.findall(text)) if isinstance(text, str) else EMPTY
+                for text in texts]
+
+    def rows(self, parts):
+        """(len(parts), len(COMPONENTS)) array of summed components, after VADER's "but" rule"""
+        self._analyzers()
+        out = np.zeros((len(parts), len(COMPONENTS)))
+        for i, (valences, but_at, excl, quest, polarity, subjectivity, n_assessments) in enumerate(parts):
+            if but_at >= 0:
+                # VADER's own rule (including its list.index quirks) on the whole text's valences
+                words = [""] * len(valences)
+                words[but_at] = "but"
+                valences = np.asarray(self._but_check(words, valences.tolist()))
+            out[i] = (valences.sum(), (valences[valences > 0] + 1).sum(), (valences[valences < 0] - 1).sum(),
+                      (valences == 0).sum(), len(valences), excl, quest, polarity, subjectivity, n_assessments)
+        return out
+
+    @staticmethod
+    def finalize(rows):
+        """{score: array} from component rows, as VADER's score_valence / TextBlob's averages"""
+        c = dict(zip(COMPONENTS, np.asarray(rows, dtype=float).T))
+        excl, quest = c["exclamations"], c["questions"]
+        amplifier = np.minimum(excl, 4) * 0.292 + np.where(quest > 1, np.where(quest <= 3, quest * 0.18, 0.96), 0)
+        total_sum = c["vader_sum"] + np.sign(c["vader_sum"]) * amplifier
+        compound = np.clip(total_sum / np.sqrt(total_sum ** 2 + 15), -1, 1)
+        pos, neg, neu = c["vader_pos"], c["vader_neg"], c["vader_neu"]
+        pos, neg = (pos + np.where(pos > np.abs(neg), amplifier, 0),
+                    neg - np.where(pos < np.abs(neg), amplifier, 0))
+        total = np.where(c["vader_n"] > 0, pos + np.abs(neg) + neu, 1)
+        has_words = c["vader_n"] > 0
+        n_assessments = np.maximum(c["textblob_n"], 1)
+        return {
+            "compound": np.where(has_words, np.round(compound, 4), 0.0),
+            "positive": np.where(has_words, np.round(np.abs(pos / total), 3), 0.0),
+            "neutral": np.where(has_words, np.round(np.abs(neu / total), 3), 0.0),
+            "negative": np.where(has_words, np.round(np.abs(neg / total), 3), 0.0),
+            "polarity": c["textblob_polarity"] / n_assessments,
+            "subjectivity": c["textblob_subjectivity"] / n_assessments,
+        }
+
+    def score(self, texts):
+        return self.finalize(self.rows(self.parts(texts)))
+
+    def score_groups(self, parts, codes, n_groups=None):
+        """Scores of each group's texts joined in order (e.g. messages -> conversations), without re-scoring"""
+        codes = np.asarray(codes)
+        n_groups = n_groups if n_groups is not None else int(codes.max()) + 1 if len(codes) else 0
+        members = [[] for _ in range(n_groups)]
+        for code, p in zip(codes, parts):
+            members[code].append(p)
+        return self.finalize(self.rows([concat(group) for group in members]))
+
+
+_shared = None
+
+
+def shared_scorer():
+    """Process-wide scorer, so message and conversation scoring share one memo"""
+    global _shared
+    if _shared is None:
+        _shared = SentenceScorer()
+    return _shared
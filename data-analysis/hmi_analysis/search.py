@@ -0,0 +1,156 @@
+"""On-disk full-text index of study messages (SQLite FTS5).
+
+Messages are indexed once into an FTS5 table; participants, interactions and
+tasks live in small side tables, so every hit can be counted by gender, task,
+task type or participant without rescanning ``message.csv``. Re-running
+``update`` on a newer dump (CSV directory or Supabase JSONL dump) adds only
+the messages not indexed yet and refreshes the side tables.
+
+Queries use FTS5 syntax:
+
+    cosy                      word
+    "natural light"           phrase
+    bohem*                    prefix
+    cat AND (dog OR puppy)    boolean; NOT excludes, NEAR(a b, 5) for proximity
+
+    index = MessageIndex()                 # data/messages.sqlite
+    index.update("data")
+    index.counts('"natural light"', by="gender")
+"""
+import csv
+import json
+import sqlite3
+from pathlib import Path
+
+DATA_DIR = Path(__file__).resolve().parent.parent / "data"
+DEFAULT_DB = DATA_DIR / "messages.sqlite"
+
+GROUPS = {
+    "gender": "p.gender",
+    "participant": "i.participant_id",
+    "task": "t.title",
+    "task_id": "i.task_id",
+    "task_type": "t.task_type",
+    "sender": "m.sender",
+}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS message (
+    id INTEGER PRIMARY KEY, interaction_id INTEGER, sender TEXT, created_at TEXT, content TEXT
+);
+CREATE INDEX IF NOT EXISTS message_interaction ON message(interaction_id);
+CREATE VIRTUAL TABLE IF NOT EXISTS message_fts USING fts5(
+    content, content='message', content_rowid='id', tokenize='unicode61 remove_diacritics 2'
+);
+CREATE TRIGGER IF NOT EXISTS message_ai AFTER INSERT ON message BEGIN
+    INSERT INTO message_fts(rowid, content) VALUES (new.id, new.content);
+END;
+CREATE TABLE IF NOT EXISTS participant (id INTEGER PRIMARY KEY, gender TEXT, age INTEGER);
+CREATE TABLE IF NOT EXISTS interaction (id INTEGER PRIMARY KEY, participant_id INTEGER, task_id INTEGER);
+CREATE TABLE IF NOT EXISTS task (id INTEGER PRIMARY KEY, title TEXT, task_type TEXT, category TEXT);
+"""
+
+JOIN = """
+FROM message_fts f
+JOIN message m ON m.id = f.rowid
+LEFT JOIN interaction i ON i.id = m.interaction_id
+LEFT JOIN participant p ON p.id = i.participant_id
+LEFT JOIN task t ON t.id = i.task_id
+"""
+
+
+def iter_rows(data_dir, *names):
+    """Rows of the first ``<name>.jsonl`` or ``<name>.csv`` found in ``data_dir``"""
+    data_dir = Path(data_dir)
+    for name in names:
+        jsonl, csv_path = data_dir / f"{name}.jsonl", data_dir / f"{name}.csv"
+        if jsonl.exists():
+            with open(jsonl, encoding="utf-8") as f:
+                yield from (json.loads(line) for line in f if line.strip())
+            return
+        if csv_path.exists():
+            with open(csv_path, encoding="utf-8-sig", newline="") as f:
+                yield from csv.DictReader(f)
+            return
+    raise FileNotFoundError(f"No {' / '.join(names)} .jsonl or .csv in {data_dir}")
+
+
+def _int(value):
+    return int(value) if value not in (None, "") else None
+
+
+class MessageIndex:
+    def __init__(self, path=DEFAULT_DB):
+        self.path = Path(path)
+        self.db = sqlite3.connect(self.path)
+        self.db.executescript(SCHEMA)
+
+    def close(self):
+        self.db.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def __len__(self):
+        return self.db.execute("SELECT count(*) FROM message").fetchone()[0]
+
+    def update(self, data_dir=DATA_DIR):
+        """Index messages not seen yet and refresh participants/interactions/tasks; returns #new messages"""
+        with self.db:
+            before = len(self)
+            self.db.executemany(
+                "INSERT OR IGNORE INTO message(id, interaction_id, sender, created_at, content) VALUES (?, ?, ?, ?, ?)",
+                ((_int(r["id"]), _int(r.get("interaction_id")), r.get("sender"), r.get("created_at"),
+                  r.get("content") or "") for r in iter_rows(data_dir, "message")))
+            self.db.executemany(
+                "INSERT OR REPLACE INTO participant(id, gender, age) VALUES (?, ?, ?)",
+                ((_int(r["id"]), r.get("gender") or None, _int(r.get("age"))) for r in iter_rows(data_dir, "participant")))
+            self.db.executemany(
+                "INSERT OR REPLACE INTO interaction(id, participant_id, task_id) VALUES (?, ?, ?)",
+                ((_int(r["id"]), _int(r.get("participant_id")), _int(r.get("task_id")))
+                 for r in iter_rows(data_dir, "participant_task_interaction")))
+            self.db.executemany(
+                "INSERT OR REPLACE INTO task(id, title, task_type, category) VALUES (?, ?, ?, ?)",
+                ((_int(r["id"]), r.get("title"), r.get("task_type"), r.get("category"))
+                 for r in iter_rows(data_dir, "task", "tasks")))
+            added = len(self) - before
+        if added:
+            self.db.execute("INSERT INTO message_fts(message_fts) VALUES ('optimize')")
+            self.db.commit()
+        return added
+
+    def _execute(self, sql, params):
+        try:
+            return self.db.execute(sql, params).fetchall()
+        except sqlite3.OperationalError as e:
+            # FTS5 reports malformed queries as OperationalError
+            raise ValueError(f"Bad query {params[0]!r}: {e}") from None
+
+    @staticmethod
+    def _filter(sender):
+        return ("AND m.sender = ?", (sender,)) if sender else ("", ())
+
+    def search(self, query, sender="user", limit=20):
+        """Best-matching messages (bm25) as dicts with a highlighted snippet"""
+        where, params = self._filter(sender)
+        rows = self._execute(
+            f"SELECT m.id, i.participant_id, p.gender, t.title, "
+            f"snippet(message_fts, 0, '[', ']', '...', 12) {JOIN} "
+            f"WHERE message_fts MATCH ? {where} ORDER BY bm25(message_fts) LIMIT ?",
+            (query, *params, limit))
+        return [dict(zip(("id", "participant_id", "gender", "task", "snippet"), row)) for row in rows]
+
+    def counts(self, query, by="gender", sender="user"):
+        """{group: (matching messages, all messages, share)} for one query"""
+        column = GROUPS[by]
+        where, params = self._filter(sender)
+        hits = dict(self._execute(
+            f"SELECT {column}, count(*) {JOIN} WHERE message_fts MATCH ? {where} GROUP BY 1", (query, *params)))
+        totals = self.db.execute(
+            f"SELECT {column}, count(*) FROM message m LEFT JOIN interaction i ON i.id = m.interaction_id "
+            f"LEFT JOIN participant p ON p.id = i.participant_id LEFT JOIN task t ON t.id = i.task_id "
+            f"WHERE 1 {where} GROUP BY 1", params).fetchall()
+        return {group: (hits.get(group, 0), total, hits.get(group, 0) / total) for group, total in totals if total}
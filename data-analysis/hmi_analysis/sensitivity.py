@@ -0,0 +1,150 @@
+"""Stability of the gender tests across many balanced participant subsamples.
+
+The notebook draws one gender-balanced participant set (all women, as many
+randomly chosen men) and repeats every Mann-Whitney test on it, so the
+"subsampled" results hang on a single draw. Here the per-conversation features
+are loaded once (``conversations.load_feature_matrix``) and ``n_draws``
+balanced subsamples are tested instead. Draw ``i`` is seeded with
+``(seed, i)``, so results do not depend on the number of workers. Each worker
+gets the DV matrix once and tests its share of the draws with one vectorised
+``mannwhitneyu`` call per draw.
+
+For every DV the report gives the share of draws that are significant (raw
+and BH-corrected within the hypothesis family, as in the notebook) and the
+median / IQR of the rank-biserial correlation and r, next to the full-data
+result.
+
+    python -m hmi_analysis subsample --draws 500 --n-jobs 4
+"""
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+# Notebook hypotheses with the DVs mapped onto the conversation feature names
+# (pron_first -> first_person_pronouns, sentence_length -> avg_sentence_length)
+HYPOTHESES = {
+    "A": ["ttr", "emo_anger", "emo_anticipation", "emo_disgust", "emo_fear", "emo_joy", "emo_negative",
+          "emo_positive", "emo_sadness", "emo_surprise", "emo_trust",
+          "first_person_pronouns", "second_person_pronouns", "third_person_pronouns"],
+    "B": ["sentence_count", "avg_sentence_length"],
+    "C": ["sentiment", "opinion_score"],
+    "D": ["iteration_count"],
+}
+
+_values = _is_male = _participant_codes = _males = _females = _families = None
+
+
+def mann_whitney(values, is_male, families):
+    """Notebook ``mann_whitney_test`` for all columns of ``values`` at once (men vs. women).
+
+    Returns (u, p, p_bh, rank_biserial_r, effect_size_r) arrays; BH is applied
+    within each family (list of column index arrays).
+    """
+    from scipy.stats import false_discovery_control, mannwhitneyu
+
+    male, female = values[is_male], values[~is_male]
+    u, p = mannwhitneyu(male, female, alternative="two-sided", axis=0)
+    n1, n2 = len(male), len(female)
+    rbc = 1 - 2 * u / (n1 * n2)
+    z = (u - n1 * n2 / 2) / np.sqrt(n1 * n2 * (n1 + n2 + 1) / 12)
+    r = np.abs(z) / np.sqrt(n1 + n2)
+    p_bh = np.empty_like(p)
+    for columns in families:
+        p_bh[columns] = false_discovery_control(p[columns])
+    return u, p, p_bh, rbc, r
+
+
+def balanced_draw(draw, seed, males, females):
+    """Participant codes of draw ``draw``: every member of the smaller group, as many of the larger"""
+    rng = np.random.default_rng([seed, draw])
+    small, large = (females, males) if len(females) <= len(males) else (males, females)
+    return np.concatenate([small, rng.choice(large, size=len(small), replace=False)])
+
+
+def _init_worker(values, is_male, participant_codes, males, females, families):
+    global _values, _is_male, _participant_codes, _males, _females, _families
+    _values, _is_male, _participant_codes = values, is_male, participant_codes
+    _males, _females, _families = males, females, families
+
+
+def _run_draws(task):
+    """(p, p_bh, rank_biserial_r, effect_size_r), each draws x DVs, for a range of draws"""
+    seed, draws = task
+    out = np.empty((4, len(draws), _values.shape[1]))
+    for i, draw in enumerate(draws):
+        rows = np.isin(_participant_codes, balanced_draw(draw, seed, _males, _females))
+        _, p, p_bh, rbc, r = mann_whitney(_values[rows], _is_male[rows], _families)
+        out[:, i] = p, p_bh, rbc, r
+    return out
+
+
+def prepare(data, hypotheses=HYPOTHESES):
+    """DV matrix, gender mask, participant codes and BH families from a conversation feature frame"""
+    data = data[data["gender"].isin(["male", "female"])]
+    dvs = [dv for dvs in hypotheses.values() for dv in dvs if dv in data.columns]
+    data = data.dropna(subset=dvs)
+    codes, participants = pd.factorize(data["participant_id"])
+    gender = data.groupby(codes)["gender"].first()
+    families = [np.array([dvs.index(dv) for dv in family if dv in dvs]) for family in hypotheses.values()]
+    families = [f for f in families if len(f)]
+    return (dvs, data[dvs].to_numpy(float), (data["gender"] == "male").to_numpy(), codes,
+            gender.index[gender == "male"].to_numpy(), gender.index[gender == "female"].to_numpy(), families)
+
+
+def run(data, n_draws=500, seed=42, n_jobs=1, hypotheses=HYPOTHESES, chunk=25):
+    """Test the full data and ``n_draws`` balanced subsamples.
+
+    Returns ``(full, draws)``: the full-data results per DV, and a long frame
+    with one row per draw and DV (p, p_bh, rank_biserial_r, effect_size_r).
+    """
+    dvs, values, is_male, codes, males, females, families = prepare(data, hypotheses)
+    u, p, p_bh, rbc, r = mann_whitney(values, is_male, families)
+    hypothesis = {dv: name for name, names in hypotheses.items() for dv in names}
+    full = pd.DataFrame({"hypothesis": [hypothesis[dv] for dv in dvs], "u_statistic": u, "p_value": p,
+                         "p_corrected_bh": p_bh, "rank_biserial_r": rbc, "effect_size_r": r,
+                         "male_n": int(is_male.sum()), "female_n": int((~is_male).sum())},
+                        index=pd.Index(dvs, name="variable"))
+
+    args = (values, is_male, codes, males, females, families)
+    tasks = [(seed, range(start, min(start + chunk, n_draws))) for start in range(0, n_draws, chunk)]
+    workers = n_jobs if n_jobs > 0 else os.cpu_count() or 1
+    if workers == 1:
+        _init_worker(*args)
+        results = [_run_draws(task) for task in tasks]
+    else:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=args) as pool:
+            results = list(pool.map(_run_draws, tasks))
+    stacked = np.concatenate(results, axis=1)
+
+    draws = pd.DataFrame({
+        "draw": np.repeat(np.arange(n_draws), len(dvs)),
+        "variable": np.tile(dvs, n_draws),
+        **{name: stacked[k].ravel() for k, name in
+           enumerate(("p_value", "p_corrected_bh", "rank_biserial_r", "effect_size_r"))},
+    })
+    return full, draws
+
+
+def stability(full, draws, alpha=0.05):
+    """Per DV: full-data result next to the share of significant draws and effect-size spread"""
+    grouped = draws.groupby("variable", sort=False)
+    rbc = grouped["rank_biserial_r"]
+    summary = pd.DataFrame({
+        "share_sig": grouped["p_value"].apply(lambda p: (p < alpha).mean()),
+        "share_sig_bh": grouped["p_corrected_bh"].apply(lambda p: (p < alpha).mean()),
+        "median_p": grouped["p_value"].median(),
+        "rbc_median": rbc.median(),
+        "rbc_q25": rbc.quantile(0.25),
+        "rbc_q75": rbc.quantile(0.75),
+        "r_median": grouped["effect_size_r"].median(),
+    })
+    # Share of draws whose effect points the same way as in the full data
+    sign = np.sign(full["rank_biserial_r"])
+    summary["same_sign"] = (np.sign(draws["rank_biserial_r"].to_numpy()) == sign.reindex(draws["variable"]).to_numpy()
+                            ).reshape(-1, len(full)).mean(axis=0)
+    full_cols = full[["hypothesis", "p_value", "p_corrected_bh", "rank_biserial_r", "effect_size_r"]].rename(
+        columns={"p_value": "full_p", "p_corrected_bh": "full_p_bh", "rank_biserial_r": "full_rbc",
+                 "effect_size_r": "full_r"})
+    return full_cols.join(summary)
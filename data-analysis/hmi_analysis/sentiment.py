@@ -0,0 +1,56 @@
+"""Sentiment scoring helpers shared by the batch and online analyses."""
+
+
+def categorize_sentiment(compound_score):
+    """Categorize sentiment based on VADER compound score"""
+    if compound_score >= 0.05:
+        return 'Positive'
+    elif compound_score <= -0.05:
+        return 'Negative'
+    else:
+        return 'Neutral'
+
+
+def vader_compound_scorer():
+    """Return a text -> VADER compound callable (imports VADER on first use)"""
+    from vaderSentiment.vaderSentiment import SentimentIntensityAnalyzer
+
+    analyzer = SentimentIntensityAnalyzer()
+
+    def score(text):
+        return analyzer.polarity_scores(text)['compound'] if text else 0.0
+
+    return score
+
+
+def vader_scorer():
+    """Return a text -> VADER scores dict callable (imports VADER on first use)"""
+    from vaderSentiment.vaderSentiment import SentimentIntensityAnalyzer
+
+    analyzer = SentimentIntensityAnalyzer()
+
+    def score(text):
+        if not text:
+            return {'compound': 0, 'positive': 0, 'neutral': 0, 'negative': 0}
+        scores = analyzer.polarity_scores(text)
+        return {
+            'compound': scores['compound'],
+            'positive': scores['pos'],
+            'neutral': scores['neu'],
+            'negative': scores['neg']
+        }
+
+    return score
+
+
+def textblob_scorer():
+    """Return a text -> TextBlob polarity/subjectivity callable (imports TextBlob on first use)"""
+    from textblob import TextBlob
+
+    def score(text):
+        if not text:
+            return {'polarity': 0, 'subjectivity': 0}
+        sentiment = TextBlob(text).sentiment
+        return {'polarity': sentiment.polarity, 'subjectivity': sentiment.subjectivity}
+
+    return score
@@ -0,0 +1,527 @@
+"""Sentiment and linguistic-feature analysis of study prompts (SentimentAnalyzer).
+
+Heavy dependencies are imported on first use: VADER when a message is first
+scored, TextBlob on first polarity call, matplotlib/seaborn only when plots are
+rendered and NLTK stopwords only when requested (from the local cache, see ``fetch-nltk``).
+"""
+import json
+import os
+
+import pandas as pd
+
+from .features import clean_text, extract_features
+from .sentiment import categorize_sentiment
+
+# Message-level gender tests of the memoised pipeline, one stage per family
+MESSAGE_HYPOTHESES = {
+    'sentiment': ['vader_compound', 'textblob_polarity', 'textblob_subjectivity'],
+    'length': ['word_count', 'sentence_count', 'avg_sentence_length'],
+    'pronouns': ['first_person_pronouns', 'second_person_pronouns', 'third_person_pronouns'],
+    'hedging': ['uncertainty_words', 'tentative_words', 'question_ratio'],
+}
+
+
+class SentimentAnalyzer:
+    def __init__(self, exclude_copies=False, dup_threshold=None, sentence_memo=False):
+        self._analyzer = None
+        self._stop_words = None
+        # Skip prompts that near-duplicate the task text or the participant's earlier prompts
+        self.exclude_copies = exclude_copies
+        self.dup_threshold = dup_threshold
+        # Opt-in batch scoring through scoring.SentenceScorer (not bit-identical to per-message scores)
+        self.sentence_memo = sentence_memo
+    
+    @property
+    def analyzer(self):
+        """VADER analyzer, created on first use"""
+        if self._analyzer is None:
+            from vaderSentiment.vaderSentiment import SentimentIntensityAnalyzer
+            self._analyzer = SentimentIntensityAnalyzer()
+        return self._analyzer
+    
+    @property
+    def scorer(self):
+        """Batch scorer with a sentence memo (scoring.SentenceScorer), shared across analyzers"""
+        from .scoring import shared_scorer
+        return shared_scorer()
+    
+    @property
+    def stop_words(self):
+        """English stopwords from the local NLTK cache, loaded on first use"""
+        if self._stop_words is None:
+            from .resources import stopwords
+            self._stop_words = set(stopwords('english'))
+        return self._stop_words
+        
+    def load_data(self, messages_file, participants_file, tasks_file, interactions_file=None):
+        """Load all data files"""
+        self.messages_df = self.load_jsonl(messages_file)
+        self.participants_df = self.load_jsonl(participants_file)
+        self.tasks_df = self.load_jsonl(tasks_file)
+        if interactions_file:
+            self.interactions_df = self.load_jsonl(interactions_file)
+        
+    def load_jsonl(self, file_path):
+        """Load JSONL file into DataFrame"""
+        data = []
+        with open(file_path, 'r', encoding='utf-8') as file:
+            for line in file:
+                data.append(json.loads(line))
+        return pd.DataFrame(data)
+    
+    def preprocess_text(self, text):
+        """Clean and preprocess text"""
+        # URLs, mentions, hashtags and symbols are removed with precompiled patterns;
+        # punctuation is kept for sentiment
+        return clean_text(text)
+    
+    def extract_linguistic_features(self, text):
+        """Extract linguistic features for gender analysis
+
+        ``word_count`` and the emotion/uncertainty/tentative word counts are
+        defined differently from the pre-kernel script (no punctuation tokens;
+        marker occurrences instead of all words); see ``features``.
+        """
+        if not text:
+            return {}
+        
+        # One tokenisation pass shared with the other analysis scripts
+        features = extract_features(text)
+        features['sentence_count'] = max(features['sentence_count'], 1)
+        
+        return features
+    
+    def analyze_sentiment_textblob(self, text):
+        """Analyze sentiment using TextBlob"""
+        if not text:
+            return {'polarity': 0, 'subjectivity': 0}
+        
+        from textblob import TextBlob
+        
+        blob = TextBlob(text)
+        return {
+            'polarity': blob.sentiment.polarity,
+            'subjectivity': blob.sentiment.subjectivity
+        }
+    
+    def analyze_sentiment_vader(self, text):
+        """Analyze sentiment using VADER"""
+        if not text:
+            return {'compound': 0, 'positive': 0, 'neutral': 0, 'negative': 0}
+        
+        scores = self.analyzer.polarity_scores(text)
+        return {
+            'compound': scores['compound'],
+            'positive': scores['pos'],
+            'neutral': scores['neu'],
+            'negative': scores['neg']
+        }
+    
+    def categorize_sentiment(self, compound_score):
+        """Categorize sentiment based on VADER compound score"""
+        return categorize_sentiment(compound_score)
+    
+    def analyze_all_messages(self):
+        """Perform comprehensive sentiment analysis on all user messages"""
+        # Filter for user messages only
+        user_messages = self.messages_df[self.messages_df['sender'] == 'user']
+        if self.exclude_copies:
+            user_messages = user_messages[~self.flag_copies(user_messages)['is_copy']]
+        
+        print(f"Analyzing {len(user_messages)} user messages...")
+        
+        from .streaming import score_message, score_messages
+        
+        rows = user_messages.to_dict('records')
+        if self.sentence_memo:
+            # One batch: every distinct sentence scored once, scores finished in one vectorised pass
+            records = score_messages(rows, self.scorer)
+        else:
+            # One pass per message (preprocess -> sentiment -> features) into a single
+            # DataFrame, instead of per-column apply passes and a final concat copy
+            records = [
+                score_message(row, self.analyze_sentiment_vader, self.analyze_sentiment_textblob)
+                for row in rows
+            ]
+        result_df = pd.DataFrame.from_records(records)
+        
+        return result_df
+    
+    def copy_filter(self):
+        """dedup.CopyFilter seeded with the task descriptions (when tasks are loaded)"""
+        from .dedup import DEFAULT_THRESHOLD, CopyFilter
+        
+        references = None
+        tasks = getattr(self, 'tasks_df', None)
+        if tasks is not None and 'description' in tasks.columns:
+            references = dict(zip(tasks['id'], tasks['description']))
+        return CopyFilter(self.dup_threshold or DEFAULT_THRESHOLD, references)
+    
+    def flag_copies(self, user_messages):
+        """Near-duplicate flags for user messages, grouped by participant (or interaction)"""
+        from .dedup import flag_copies
+        
+        ordered = user_messages.sort_values('created_at' if 'created_at' in user_messages.columns else 'id')
+        groups = ordered['interaction_id']
+        if hasattr(self, 'interactions_df'):
+            groups = groups.map(self.interactions_df.set_index('id')['participant_id'])
+        flags = flag_copies(ordered['content'], ordered['id'], groups.tolist(), copy_filter=self.copy_filter())
+        print(f"Excluding {int(flags['is_copy'].sum())} of {len(flags)} user messages as near-duplicate copies")
+        return flags.reindex(user_messages.index)
+    
+    def merge_with_participant_data(self, sentiment_df):
+        """Merge sentiment analysis with participant demographic data"""
+        # Get interaction data if available
+        if hasattr(self, 'interactions_df'):
+            # Merge with interactions to get participant_id
+            sentiment_df = sentiment_df.merge(
+                self.interactions_df[['id', 'participant_id']], 
+                left_on='interaction_id', 
+                right_on='id', 
+                how='left',
+                suffixes=('', '_interaction')
+            )
+        
+        # Merge with participant data
+        final_df = sentiment_df.merge(
+            self.participants_df, 
+            left_on='participant_id', 
+            right_on='id', 
+            how='left',
+            suffixes=('', '_participant')
+        )
+        
+        return final_df
+    
+    def generate_gender_comparison(self, df):
+        """Generate comprehensive gender-based comparison"""
+        if 'gender' not in df.columns:
+            print("Gender information not available for comparison")
+            return None
+        
+        # Group by gender
+        gender_groups = df.groupby('gender')
+        
+        # Sentiment metrics
+        sentiment_metrics = [
+            'textblob_polarity', 'textblob_subjectivity',
+            'vader_compound', 'vader_positive', 'vader_neutral', 'vader_negative'
+        ]
+        
+        # Linguistic features
+        linguistic_features = [
+            'word_count', 'sentence_count', 'avg_sentence_length',
+            'question_marks', 'exclamation_marks', 'question_ratio', 'exclamation_ratio',
+            'positive_words', 'negative_words', 'uncertainty_words', 'tentative_words',
+            'first_person_pronouns', 'second_person_pronouns', 'third_person_pronouns'
+        ]
+        
+        # Calculate statistics
+        comparison_results = {}
+        
+        for metric in sentiment_metrics + linguistic_features:
+            if metric in df.columns:
+                stats = gender_groups[metric].agg(['mean', 'std', 'median', 'count'])
+                comparison_results[metric] = stats
+        
+        # Sentiment category distribution
+        sentiment_dist = pd.crosstab(df['gender'], df['sentiment_category'], normalize='index') * 100
+        comparison_results['sentiment_distribution'] = sentiment_dist
+        
+        return comparison_results
+    
+    def create_visualizations(self, df, comparison_results, output_dir='sentiment_plots',
+                              formats=('png',), dpi=300, preview=True, composite=True, jobs=None):
+        """Create comprehensive visualizations (headless; unchanged panels are skipped)"""
+        from .plots import compute_plot_aggregates, render_composite, render_panels
+        
+        # Crosstabs/groupbys are computed once here; rendering only sees these small tables
+        aggregates = compute_plot_aggregates(df)
+        
+        outputs, rendered = render_panels(aggregates, output_dir, formats=formats, dpi=dpi,
+                                          preview=preview, jobs=jobs)
+        print(f"Rendered {len(rendered)} of {len(outputs)} panels into {output_dir}/ "
+              f"({len(outputs) - len(rendered)} unchanged)")
+        
+        composite_path = 'sentiment_analysis_comprehensive.png'
+        if composite and (rendered or not os.path.exists(composite_path)):
+            render_composite(aggregates, composite_path, dpi=dpi)
+        
+        return outputs
+    
+    def generate_report(self, df, comparison_results):
+        """Generate a comprehensive text report"""
+        report = []
+        report.append("=" * 80)
+        report.append("COMPREHENSIVE SENTIMENT ANALYSIS REPORT")
+        report.append("=" * 80)
+        
+        # Overall statistics
+        report.append(f"\nOVERALL STATISTICS:")
+        report.append(f"Total messages analyzed: {len(df)}")
+        report.append(f"Average VADER compound score: {df['vader_compound'].mean():.3f}")
+        report.append(f"Average TextBlob polarity: {df['textblob_polarity'].mean():.3f}")
+        report.append(f"Average TextBlob subjectivity: {df['textblob_subjectivity'].mean():.3f}")
+        
+        # Sentiment distribution
+        sentiment_dist = df['sentiment_category'].value_counts()
+        report.append(f"\nSENTIMENT DISTRIBUTION:")
+        for sentiment, count in sentiment_dist.items():
+            percentage = (count / len(df)) * 100
+            report.append(f"- {sentiment}: {count} ({percentage:.1f}%)")
+        
+        # Linguistic features summary
+        report.append(f"\nLINGUISTIC FEATURES SUMMARY:")
+        report.append(f"Average word count per message: {df['word_count'].mean():.1f}")
+        report.append(f"Average sentence length: {df['avg_sentence_length'].mean():.1f}")
+        report.append(f"Average questions per message: {df['question_marks'].mean():.2f}")
+        report.append(f"Average exclamations per message: {df['exclamation_marks'].mean():.2f}")
+        
+        # Gender comparison (if available)
+        if comparison_results and 'gender' in df.columns:
+            report.append(f"\nGENDER-BASED COMPARISON:")
+            report.append("-" * 40)
+            
+            for gender in df['gender'].unique():
+                if pd.notna(gender):
+                    gender_data = df[df['gender'] == gender]
+                    report.append(f"\n{gender.upper()} USERS (n={len(gender_data)}):")
+                    report.append(f"- Average VADER compound: {gender_data['vader_compound'].mean():.3f}")
+                    report.append(f"- Average TextBlob polarity: {gender_data['textblob_polarity'].mean():.3f}")
+                    report.append(f"- Average word count: {gender_data['word_count'].mean():.1f}")
+                    report.append(f"- Average sentence length: {gender_data['avg_sentence_length'].mean():.1f}")
+                    
+                    # Emotion words
+                    if 'positive_words' in gender_data.columns:
+                        report.append(f"- Positive words per message: {gender_data['positive_words'].mean():.2f}")
+                        report.append(f"- Negative words per message: {gender_data['negative_words'].mean():.2f}")
+                        report.append(f"- Uncertainty words per message: {gender_data['uncertainty_words'].mean():.2f}")
+                        report.append(f"- Tentative words per message: {gender_data['tentative_words'].mean():.2f}")
+            
+            # Statistical significance testing (basic)
+            from scipy import stats
+            if len(df['gender'].unique()) == 2:
+                genders = df['gender'].unique()
+                group1 = df[df['gender'] == genders[0]]['vader_compound']
+                group2 = df[df['gender'] == genders[1]]['vader_compound']
+                
+                if len(group1) > 0 and len(group2) > 0:
+                    t_stat, p_value = stats.ttest_ind(group1, group2)
+                    report.append(f"\nSTATISTICAL SIGNIFICANCE TEST (VADER Compound):")
+                    report.append(f"T-statistic: {t_stat:.3f}")
+                    report.append(f"P-value: {p_value:.3f}")
+                    if p_value < 0.05:
+                        report.append("Result: Statistically significant difference (p < 0.05)")
+                    else:
+                        report.append("Result: No statistically significant difference (p >= 0.05)")
+        
+        # Key findings
+        report.append(f"\nKEY FINDINGS:")
+        report.append("- " + "Most messages have neutral sentiment" if df['sentiment_category'].mode()[0] == 'Neutral' else f"Most messages are {df['sentiment_category'].mode()[0].lower()}")
+        
+        if df['textblob_subjectivity'].mean() > 0.5:
+            report.append("- Messages tend to be more subjective than objective")
+        else:
+            report.append("- Messages tend to be more objective than subjective")
+        
+        if 'gender' in df.columns and len(df['gender'].unique()) > 1:
+            # Compare average word counts between genders
+            gender_word_counts = df.groupby('gender')['word_count'].mean()
+            if len(gender_word_counts) == 2:
+                genders = list(gender_word_counts.index)
+                if gender_word_counts[genders[0]] > gender_word_counts[genders[1]]:
+                    report.append(f"- {genders[0]} users write longer messages on average")
+                else:
+                    report.append(f"- {genders[1]} users write longer messages on average")
+        
+        return "\n".join(report)
+    
+    def run_complete_analysis(self, messages_file, participants_file, tasks_file, interactions_file=None,
+                              plots=True):
+        """Run the complete sentiment analysis pipeline"""
+        print("Loading data...")
+        self.load_data(messages_file, participants_file, tasks_file, interactions_file)
+        
+        print("Analyzing sentiment...")
+        sentiment_df = self.analyze_all_messages()
+        
+        print("Merging with participant data...")
+        final_df = self.merge_with_participant_data(sentiment_df)
+        
+        print("Generating gender comparison...")
+        comparison_results = self.generate_gender_comparison(final_df)
+        
+        if plots:
+            print("Creating visualizations...")
+            self.create_visualizations(final_df, comparison_results)
+        
+        print("Generating report...")
+        report = self.generate_report(final_df, comparison_results)
+        
+        # Save results
+        final_df.to_csv('sentiment_analysis_results.csv', index=False)
+        
+        with open('sentiment_analysis_report.txt', 'w', encoding='utf-8') as f:
+            f.write(report)
+        
+        print("Analysis complete! Results saved to:")
+        print("- sentiment_analysis_results.csv")
+        print("- sentiment_analysis_report.txt")
+        if plots:
+            print("- sentiment_analysis_comprehensive.png")
+            print("- sentiment_plots/ (one file per panel)")
+        
+        return final_df, comparison_results, report
+    
+    def build_pipeline(self, messages_file, participants_file, tasks_file, interactions_file=None,
+                       plots=True, alpha=0.05, hypotheses=MESSAGE_HYPOTHESES, jobs=2, cache_dir=None):
+        """The ``run_complete_analysis`` steps as a memoised ``pipeline.Pipeline``"""
+        from pathlib import Path
+
+        from .conversations import FEATURE_VERSION
+        from .pipeline import Pipeline
+
+        pipe = Pipeline(**({'cache_dir': cache_dir} if cache_dir else {}), jobs=jobs)
+        pipe.add('messages', _load_jsonl, params={'path': Path(messages_file)})
+        pipe.add('participants', _load_jsonl, params={'path': Path(participants_file)})
+        pipe.add('tasks', _load_jsonl, params={'path': Path(tasks_file)})
+        joins = ['participants']
+        if interactions_file:
+            pipe.add('interactions', _load_jsonl, params={'path': Path(interactions_file)})
+            joins.append('interactions')
+        pipe.add('scored', _score_stage, inputs=['messages', 'tasks'] + joins[1:],
+                 params={'exclude_copies': self.exclude_copies, 'dup_threshold': self.dup_threshold,
+                         'sentence_memo': self.sentence_memo},
+                 # the scored rows carry the kernel's features: re-run when their definitions change
+                 version=f'2.{FEATURE_VERSION}')
+        pipe.add('merged', _merge_stage, inputs=['scored'] + joins)
+        pipe.add('comparison', _comparison_stage, inputs=['merged'])
+        tests = []
+        for name, dvs in hypotheses.items():
+            pipe.add(f'tests_{name}', _gender_tests_stage, inputs=['merged'], params={'dvs': dvs, 'alpha': alpha})
+            tests.append(f'tests_{name}')
+        pipe.add('report', _report_stage, inputs=['merged', 'comparison'] + tests)
+        pipe.add('save', _save_stage, inputs=['merged', 'report'], cache=False)
+        if plots:
+            pipe.add('plots', _plots_stage, inputs=['merged', 'comparison'], cache=False)
+        return pipe
+
+    def run_pipeline_analysis(self, messages_file, participants_file, tasks_file, interactions_file=None,
+                              plots=True, jobs=2):
+        """``run_complete_analysis`` through the memoised stage DAG: unchanged stages are reused"""
+        pipe = self.build_pipeline(messages_file, participants_file, tasks_file, interactions_file,
+                                   plots=plots, jobs=jobs)
+        results = pipe.run(['merged', 'comparison', 'save'] + (['plots'] if plots else []))
+        print("Analysis complete! Results saved to:")
+        print("- sentiment_analysis_results.csv")
+        print("- sentiment_analysis_report.txt")
+        return results['merged'], results['comparison'], results['save']
+
+    def generate_streaming_report(self, n_messages, comparison_results):
+        """Generate a text report from streamed aggregates (no per-message data needed)"""
+        report = []
+        report.append("=" * 80)
+        report.append("STREAMING SENTIMENT ANALYSIS REPORT")
+        report.append("=" * 80)
+        report.append(f"\nTotal messages analyzed: {n_messages}")
+        
+        if 'sentiment_distribution' in comparison_results:
+            report.append(f"\nSENTIMENT DISTRIBUTION BY GROUP (%):")
+            report.append(comparison_results['sentiment_distribution'].round(1).to_string())
+        
+        report.append(f"\nGROUP COMPARISON (mean / std / count):")
+        for metric, stats in comparison_results.items():
+            if metric == 'sentiment_distribution':
+                continue
+            report.append(f"\n{metric}:")
+            report.append(stats.round(3).to_string())
+        
+        return "\n".join(report)
+    
+    def run_streaming_analysis(self, messages_file, participants_file, interactions_file=None,
+                               output_file='sentiment_analysis_results.parquet', chunk_size=5000):
+        """Run the pipeline in bounded-size chunks for dumps too large to load at once"""
+        from .streaming import stream_analysis
+        
+        print(f"Streaming analysis in chunks of {chunk_size} messages...")
+        aggregates, n_messages = stream_analysis(
+            messages_file, participants_file, output_file,
+            interactions_file=interactions_file,
+            vader=self.analyze_sentiment_vader,
+            textblob=self.analyze_sentiment_textblob,
+            scorer=self.scorer if self.sentence_memo else None,
+            chunk_size=chunk_size,
+            copy_filter=self.copy_filter() if self.exclude_copies else None
+        )
+        
+        comparison_results = aggregates.comparison()
+        report = self.generate_streaming_report(n_messages, comparison_results)
+        
+        with open('sentiment_analysis_report.txt', 'w', encoding='utf-8') as f:
+            f.write(report)
+        
+        print("Analysis complete! Results saved to:")
+        print(f"- {output_file}")
+        print("- sentiment_analysis_report.txt")
+        
+        return comparison_results, report
+
+
+# Pipeline stages: module-level so the runner can hash their source
+
+def _load_jsonl(path):
+    return SentimentAnalyzer().load_jsonl(path)
+
+
+def _score_stage(messages, tasks, interactions=None, exclude_copies=False, dup_threshold=None,
+                 sentence_memo=False):
+    analyzer = SentimentAnalyzer(exclude_copies, dup_threshold, sentence_memo)
+    analyzer.messages_df, analyzer.tasks_df = messages, tasks
+    if interactions is not None:
+        analyzer.interactions_df = interactions
+    return analyzer.analyze_all_messages()
+
+
+def _merge_stage(scored, participants, interactions=None):
+    analyzer = SentimentAnalyzer()
+    analyzer.participants_df = participants
+    if interactions is not None:
+        analyzer.interactions_df = interactions
+    return analyzer.merge_with_participant_data(scored)
+
+
+def _comparison_stage(merged):
+    return SentimentAnalyzer().generate_gender_comparison(merged)
+
+
+def _gender_tests_stage(merged, dvs, alpha):
+    """Mann-Whitney men vs. women per DV, BH-corrected within the family"""
+    from .sensitivity import mann_whitney
+
+    dvs = [dv for dv in dvs if dv in merged.columns]
+    gender = merged['gender'].astype('string').str.strip().str.lower()
+    data = merged.loc[gender.isin(['male', 'female']), dvs].assign(gender=gender).dropna()
+    is_male = (data['gender'] == 'male').to_numpy()
+    u, p, p_bh, rbc, r = mann_whitney(data[dvs].to_numpy(float), is_male, [list(range(len(dvs)))])
+    return pd.DataFrame({'u_statistic': u, 'p_value': p, 'p_corrected_bh': p_bh, 'rank_biserial_r': rbc,
+                         'effect_size_r': r, 'significant_bh': p_bh < alpha},
+                        index=pd.Index(dvs, name='variable'))
+
+
+def _report_stage(merged, comparison, *tests):
+    report = SentimentAnalyzer().generate_report(merged, comparison)
+    sections = ["\nGENDER TESTS (Mann-Whitney U, BH within each family):"]
+    for table in tests:
+        sections.append(table.round(4).to_string())
+    return report + "\n" + "\n\n".join(sections)
+
+
+def _save_stage(merged, report):
+    merged.to_csv('sentiment_analysis_results.csv', index=False)
+    with open('sentiment_analysis_report.txt', 'w', encoding='utf-8') as f:
+        f.write(report)
+    return report
+
+
+def _plots_stage(merged, comparison):
+    return SentimentAnalyzer().create_visualizations(merged, comparison)
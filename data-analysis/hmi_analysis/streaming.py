@@ -0,0 +1,254 @@
+"""Bounded-memory streaming mode for very large message dumps.
+
+Messages are read lazily from JSONL and flow through
+preprocess -> sentiment -> features -> merge -> aggregate in chunks of
+``chunk_size`` rows. Each scored chunk is appended to a CSV/Parquet file and
+dropped; only the participant/interaction lookups (small) and running
+per-group moments stay in memory, so peak memory is bounded by the chunk size
+rather than the dump size.
+"""
+import json
+from itertools import islice
+
+import pandas as pd
+
+from .features import clean_text, extract_features
+from .online import RunningStats
+from .sentiment import categorize_sentiment
+
+SENTIMENT_METRICS = [
+    'textblob_polarity', 'textblob_subjectivity',
+    'vader_compound', 'vader_positive', 'vader_neutral', 'vader_negative'
+]
+LINGUISTIC_METRICS = [
+    'word_count', 'sentence_count', 'avg_sentence_length',
+    'question_marks', 'exclamation_marks', 'question_ratio', 'exclamation_ratio',
+    'positive_words', 'negative_words', 'uncertainty_words', 'tentative_words',
+    'first_person_pronouns', 'second_person_pronouns', 'third_person_pronouns'
+]
+PARTICIPANT_COLUMNS = ('gender', 'age', 'education', 'occupation', 'nationality')
+
+
+def iter_jsonl(file_path):
+    """Yield one parsed row per non-empty JSONL line"""
+    with open(file_path, 'r', encoding='utf-8') as file:
+        for line in file:
+            if line.strip():
+                yield json.loads(line)
+
+
+def iter_chunks(rows, chunk_size):
+    """Group an iterator into lists of at most ``chunk_size`` items"""
+    rows = iter(rows)
+    while True:
+        chunk = list(islice(rows, chunk_size))
+        if not chunk:
+            return
+        yield chunk
+
+
+class ResultWriter:
+    """Append DataFrame chunks to a CSV or Parquet file (by extension)"""
+
+    def __init__(self, output_file):
+        self.output_file = str(output_file)
+        self.parquet = self.output_file.endswith('.parquet')
+        self._writer = None
+        self.columns = None
+
+    def write(self, df):
+        # Later chunks follow the first chunk's column layout (the CSV header / Parquet
+        # schema is already written): missing columns are written as nulls, new ones raise
+        first = self.columns is None
+        if first:
+            self.columns = list(df.columns)
+        else:
+            extra = [col for col in df.columns if col not in self.columns]
+            if extra:
+                raise ValueError(f"{self.output_file}: columns {extra} are not in the layout of the first chunk")
+            df = df.reindex(columns=self.columns)
+        if self.parquet:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+
+            table = pa.Table.from_pandas(df, preserve_index=False)
+            if first:
+                self._writer = pq.ParquetWriter(self.output_file, table.schema)
+            else:
+                table = table.cast(self._writer.schema)
+            self._writer.write_table(table)
+        else:
+            df.to_csv(self.output_file, mode='w' if first else 'a', header=first, index=False)
+
+    def close(self):
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+
+
+class GroupAggregates:
+    """Running count/mean/std per (group, metric) plus sentiment category counts"""
+
+    def __init__(self, metrics, group_col='gender'):
+        self.metrics = list(metrics)
+        self.group_col = group_col
+        self.stats = {}
+        self.category_counts = {}
+        self.total = 0
+
+    def update(self, df):
+        """Fold one scored chunk in with vectorised per-group moments"""
+        self.total += len(df)
+        metrics = [m for m in self.metrics if m in df.columns]
+        groups = df[self.group_col].fillna('unknown') if self.group_col in df.columns else pd.Series('all', index=df.index)
+        grouped = df[metrics].groupby(groups)
+        counts, means = grouped.count(), grouped.mean()
+        m2 = grouped.var(ddof=0).fillna(0.0) * counts
+        for group in counts.index:
+            for metric in metrics:
+                n = int(counts.at[group, metric])
+                self.stats.setdefault((group, metric), RunningStats()).merge(
+                    n, float(means.at[group, metric]) if n else 0.0, float(m2.at[group, metric])
+                )
+        for key, n in pd.crosstab(groups, df['sentiment_category']).stack().items():
+            self.category_counts[key] = self.category_counts.get(key, 0) + int(n)
+
+    def comparison(self):
+        """Per-metric DataFrames (index: group; columns: mean, std, count) plus sentiment distribution"""
+        results = {}
+        for metric in self.metrics:
+            rows = {group: {'mean': s.mean, 'std': s.std, 'count': s.n}
+                    for (group, m), s in self.stats.items() if m == metric}
+            if rows:
+                results[metric] = pd.DataFrame.from_dict(rows, orient='index').rename_axis(self.group_col)
+        if self.category_counts:
+            counts = pd.Series(self.category_counts).unstack(fill_value=0)
+            counts.index.name, counts.columns.name = self.group_col, 'sentiment_category'
+            results['sentiment_distribution'] = counts.div(counts.sum(axis=1), axis=0) * 100
+        return results
+
+
+def score_message(row, vader, textblob):
+    """Preprocess, score and featurise one user message row (single pass per stage)"""
+    cleaned = clean_text(row.get('content'))
+    tb = textblob(cleaned)
+    vs = vader(cleaned)
+    record = dict(row)
+    record['cleaned_content'] = cleaned
+    record['textblob_polarity'] = tb['polarity']
+    record['textblob_subjectivity'] = tb['subjectivity']
+    record['vader_compound'] = vs['compound']
+    record['vader_positive'] = vs['positive']
+    record['vader_neutral'] = vs['neutral']
+    record['vader_negative'] = vs['negative']
+    record['sentiment_category'] = categorize_sentiment(vs['compound'])
+    record.update(_linguistic_features(cleaned))
+    return record
+
+
+def _linguistic_features(cleaned):
+    # Empty messages get the same columns (as nulls), so every chunk has one layout
+    if not cleaned:
+        return dict.fromkeys(extract_features(''))
+    features = extract_features(cleaned)
+    features['sentence_count'] = max(features['sentence_count'], 1)
+    return features
+
+
+def score_messages(rows, scorer=None):
+    """``score_message`` for a batch of rows, scored with a ``scoring.SentenceScorer``
+
+    Sentences repeated across messages (and across batches sharing the scorer)
+    are scored once; the VADER/TextBlob scores come out of one vectorised pass.
+    Opt-in: scores can differ slightly from per-message scoring (see ``scoring``).
+    """
+    from .scoring import shared_scorer
+
+    scorer = scorer or shared_scorer()
+    cleaned = [clean_text(row.get('content')) for row in rows]
+    scores = scorer.score(cleaned)
+    records = []
+    for i, (row, text) in enumerate(zip(rows, cleaned)):
+        record = dict(row)
+        record['cleaned_content'] = text
+        record['textblob_polarity'] = float(scores['polarity'][i])
+        record['textblob_subjectivity'] = float(scores['subjectivity'][i])
+        record['vader_compound'] = float(scores['compound'][i])
+        record['vader_positive'] = float(scores['positive'][i])
+        record['vader_neutral'] = float(scores['neutral'][i])
+        record['vader_negative'] = float(scores['negative'][i])
+        record['sentiment_category'] = categorize_sentiment(record['vader_compound'])
+        record.update(_linguistic_features(text))
+        records.append(record)
+    return records
+
+
+def stream_analysis(messages_file, participants_file, output_file, interactions_file=None,
+                    vader=None, textblob=None, chunk_size=5000,
+                    metrics=SENTIMENT_METRICS + LINGUISTIC_METRICS,
+                    participant_columns=PARTICIPANT_COLUMNS, progress=print, copy_filter=None,
+                    scorer=None):
+    """Score a message dump chunk by chunk, writing rows out and keeping only aggregates.
+
+    With a ``dedup.CopyFilter``, near-duplicate prompts are skipped as they stream
+    past (grouped by participant, or by interaction without an interactions file).
+    Messages are scored one at a time with ``vader`` / ``textblob`` (exact,
+    the default) or, with a ``scoring.SentenceScorer``, chunk by chunk through
+    its sentence memo.
+    Returns ``(aggregates, n_messages)``; the per-message results are in ``output_file``.
+    """
+    if scorer is None and (vader is None or textblob is None):
+        from .sentiment import textblob_scorer, vader_scorer
+        vader = vader or vader_scorer()
+        textblob = textblob or textblob_scorer()
+
+    # Lookups are small (one row per participant / interaction): keep only what the merge needs
+    participants = {
+        row['id']: {col: None if row.get(col) is None else str(row[col]) for col in participant_columns}
+        for row in iter_jsonl(participants_file)
+    }
+    interactions = None
+    if interactions_file:
+        interactions = {row['id']: row.get('participant_id') for row in iter_jsonl(interactions_file)}
+
+    aggregates = GroupAggregates(metrics)
+    writer = ResultWriter(output_file)
+    empty_participant = dict.fromkeys(participant_columns)
+    n_messages = 0
+    try:
+        user_rows = (row for row in iter_jsonl(messages_file) if row.get('sender') == 'user')
+        for chunk in iter_chunks(user_rows, chunk_size):
+            kept = []
+            for row in chunk:
+                if copy_filter is not None:
+                    group = row.get('interaction_id')
+                    if interactions is not None:
+                        group = interactions.get(group)
+                    if copy_filter.is_copy(row.get('id'), row.get('content'), group):
+                        continue
+                kept.append(row)
+            if scorer is not None:
+                records = score_messages(kept, scorer)
+            else:
+                records = [score_message(row, vader, textblob) for row in kept]
+            for record in records:
+                if interactions is not None:
+                    record['participant_id'] = interactions.get(record.get('interaction_id'))
+                record.update(participants.get(record.get('participant_id'), empty_participant))
+
+            if not records:
+                continue
+            df = pd.DataFrame.from_records(records)
+            # Only real text columns; object booleans (has_phatic with nulls) keep their type
+            for col in df.columns[df.dtypes == object]:
+                if pd.api.types.infer_dtype(df[col], skipna=True) == 'string':
+                    df[col] = df[col].astype('string')
+            writer.write(df)
+            aggregates.update(df)
+            n_messages += len(df)
+            if progress:
+                progress(f"  processed {n_messages} user messages")
+    finally:
+        writer.close()
+
+    return aggregates, n_messages
@@ -0,0 +1,171 @@
+"""Synthetic study datasets matching the Supabase export schema in ``data/*.csv``.
+
+Rows are generated deterministically from a seed and streamed straight to CSV
+and JSONL, so even the 1M-message dataset never sits in memory. User prompts
+are drawn from the vocabulary of the real ``message.csv`` (if present) so that
+token, lexicon and sentiment hit rates stay realistic.
+"""
+import csv
+import json
+import random
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+from .features import tokenize
+
+DATA_DIR = Path(__file__).resolve().parent.parent / "data"
+
+PARTICIPANT_COLUMNS = [
+    "id", "created_at", "name", "password", "email", "age", "gender", "education", "occupation",
+    "nationality", "frequency_usage", "english_fluency", "ai_usage", "consent", "familiarity",
+]
+TASK_COLUMNS = ["id", "description", "task_type", "category", "title"]
+INTERACTION_COLUMNS = ["id", "started_at", "ended_at", "ai_tool", "participant_id", "task_id"]
+MESSAGE_COLUMNS = ["id", "created_at", "interaction_id", "sender", "content"]
+
+IMAGE_TASKS = {1, 2}
+N_TASKS = 11
+FALLBACK_VOCABULARY = (
+    "i want you to write a short story about my holiday please make it happy and "
+    "describe the room with soft light can you help me plan a trip for our family "
+    "thank you this is great but maybe make it more formal they liked the idea"
+).split()
+
+
+def load_vocabulary(message_file=DATA_DIR / "message.csv"):
+    """Words of real user prompts, with repetition (sampling keeps real frequencies)"""
+    try:
+        with open(message_file, newline="", encoding="utf-8") as f:
+            words = [w for row in csv.DictReader(f) if row["sender"] == "user"
+                     and "/static/" not in row["content"] for w in tokenize(row["content"])]
+    except OSError:
+        words = []
+    return words or list(FALLBACK_VOCABULARY)
+
+
+def _timestamp(base, seconds):
+    return (base + timedelta(seconds=seconds)).isoformat()
+
+
+def _prompt(rng, vocabulary):
+    n_words = max(1, int(rng.lognormvariate(2.9, 0.8)))
+    words = rng.choices(vocabulary, k=n_words)
+    sentences, i = [], 0
+    while i < len(words):
+        length = rng.randint(5, 16)
+        sentence = " ".join(words[i:i + length])
+        sentences.append(sentence[:1].upper() + sentence[1:] + rng.choice(".....?!"))
+        i += length
+    return " ".join(sentences)
+
+
+class _Sink:
+    """Write the same rows to a CSV and a JSONL file"""
+
+    def __init__(self, stem, columns):
+        self.csv_file = open(f"{stem}.csv", "w", newline="", encoding="utf-8")
+        self.jsonl_file = open(f"{stem}.jsonl", "w", encoding="utf-8")
+        self.writer = csv.DictWriter(self.csv_file, fieldnames=columns)
+        self.writer.writeheader()
+
+    def write(self, row):
+        self.writer.writerow(row)
+        self.jsonl_file.write(json.dumps(row) + "\n")
+
+    def close(self):
+        self.csv_file.close()
+        self.jsonl_file.close()
+
+
+def generate_dataset(n_messages, out_dir, seed=42, vocabulary=None):
+    """Write tasks / participant / participant_task_interaction / message tables.
+
+    Every table is written as ``<table>.csv`` and ``<table>.jsonl`` into the
+    returned directory. Proportions follow the real export: ~2 messages per
+    interaction (user prompt then AI reply) and ~11 messages per participant.
+    An existing complete dataset for the same size and seed is reused.
+    """
+    out_dir = Path(out_dir) / f"synthetic_{n_messages}_seed{seed}"
+    marker = out_dir / ".complete"
+    if marker.exists():
+        return out_dir
+    out_dir.mkdir(parents=True, exist_ok=True)
+    paths = {table: out_dir / table
+             for table in ("tasks", "participant", "participant_task_interaction", "message")}
+
+    rng = random.Random(seed)
+    vocabulary = vocabulary or load_vocabulary()
+    base = datetime(2025, 8, 11, 16, 0, tzinfo=timezone.utc)
+    n_interactions = (n_messages + 1) // 2
+    n_participants = max(2, n_messages // 11)
+
+    sink = _Sink(paths["tasks"], TASK_COLUMNS)
+    for tid in range(1, N_TASKS + 1):
+        image = tid in IMAGE_TASKS
+        sink.write({
+            "id": tid,
+            "description": f"Synthetic task {tid}",
+            "task_type": "image" if image else "text",
+            "category": "Image Generation" if image else "Text Generation",
+            "title": f"Task {tid}",
+        })
+    sink.close()
+
+    sink = _Sink(paths["participant"], PARTICIPANT_COLUMNS)
+    for pid in range(1, n_participants + 1):
+        sink.write({
+            "id": pid,
+            "created_at": _timestamp(base, pid * 60),
+            "name": f"Participant {pid}",
+            "password": "$2b$12$" + "".join(rng.choices("abcdefghijklmnopqrstuvwxyz0123456789", k=53)),
+            "email": f"participant{pid}@example.com",
+            "age": rng.randint(18, 60),
+            "gender": "female" if rng.random() < 0.25 else "male",
+            "education": rng.choice(["university", "high-school", "phd"]),
+            "occupation": rng.choice(["social", "technical", "business", "student"]),
+            "nationality": rng.choice(["germany", "pakistan", "india", "turkey"]),
+            "frequency_usage": rng.choice(["daily", "weekly", "multiple-times"]),
+            "english_fluency": rng.choice(["fluent-c1", "native", "intermediate-b2"]),
+            "ai_usage": "[{'label': 'Writing', 'value': 'writing'}]",
+            "consent": True,
+            "familiarity": "{}",
+        })
+    sink.close()
+
+    task_of = {}
+    sink = _Sink(paths["participant_task_interaction"], INTERACTION_COLUMNS)
+    for iid in range(1, n_interactions + 1):
+        task_id = rng.randint(1, N_TASKS)
+        task_of[iid] = task_id
+        started = iid * 30
+        sink.write({
+            "id": iid,
+            "started_at": _timestamp(base, started),
+            "ended_at": _timestamp(base, started + 25) if rng.random() < 0.5 else "",
+            "ai_tool": "GPT-4o",
+            "participant_id": rng.randint(1, n_participants),
+            "task_id": task_id,
+        })
+    sink.close()
+
+    sink = _Sink(paths["message"], MESSAGE_COLUMNS)
+    for mid in range(1, n_messages + 1):
+        iid = (mid + 1) // 2
+        sender = "user" if mid % 2 else "ai"
+        if sender == "user":
+            content = _prompt(rng, vocabulary)
+        elif task_of[iid] in IMAGE_TASKS:
+            content = f"/static/images/image_{mid:08d}_{rng.getrandbits(64):016x}.png"
+        else:
+            content = " ".join(_prompt(rng, vocabulary) for _ in range(3))
+        sink.write({
+            "id": mid,
+            "created_at": _timestamp(base, iid * 30 + (mid + 1) % 2 * 5),
+            "interaction_id": iid,
+            "sender": sender,
+            "content": content,
+        })
+    sink.close()
+
+    marker.touch()
+    return out_dir